@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Query
 from typing import Optional
 from app.services.nppes_api import fetch_physicians_near
+from app.services.physician_index import add_physicians
 
 router = APIRouter()
 
@@ -10,18 +11,22 @@ async def get_physicians(
     state: Optional[str] = Query(None),
     condition: Optional[str] = Query(None),
     specialty: Optional[str] = Query(None),
+    precise: bool = Query(False, description="Rooftop geocodes instead of ZIP centroids"),
 ):
     physicians = await fetch_physicians_near(
         city=city,
         state=state,
         condition=condition,
+        precise=precise,
     )
+    add_physicians(physicians)
     return {
         "filters": {
             "city": city,
             "state": state,
             "condition": condition,
             "specialty": specialty,
+            "precise": precise,
         },
         "count": len(physicians),
         "results": physicians,
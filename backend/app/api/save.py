@@ -9,8 +9,10 @@ from fastapi import APIRouter, HTTPException
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+import asyncio
 import os
 from app.db.duckdb_client import save_results, get_duckdb, get_saved_searches, close_connection, DB_PATH
+from app.services.clinicaltrials_api import fetch_trial_detail_async, normalize_nct_id
 
 router = APIRouter(prefix="/api/save", tags=["save"])
 
@@ -35,6 +37,24 @@ class SaveResponse(BaseModel):
     error: Optional[str] = None
 
 
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+async def _with_details(trials: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Search results are summaries; fill in description, criteria, contact and
+    all sites from the detail cache so saved rows (and the text index) are
+    complete. Trials whose detail can't be fetched are saved as sent.
+    """
+    async def hydrate(trial: Dict[str, Any]) -> Dict[str, Any]:
+        nct_id = normalize_nct_id(trial.get("nctId", ""))
+        if "description" in trial or not nct_id:
+            return trial
+        detail = await fetch_trial_detail_async(nct_id)
+        return {**trial, **detail} if detail else trial
+
+    return list(await asyncio.gather(*(hydrate(t) for t in trials)))
+
+
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @router.post("/", response_model=SaveResponse)
@@ -49,7 +69,7 @@ async def save_to_db(req: SaveRequest):
 
     result = save_results(
         save_mode=req.save_mode,
-        trials=req.trials,
+        trials=await _with_details(req.trials),
         physicians_map=req.physicians_map,
         search_condition=req.search_condition,
         search_filters=req.search_filters,
@@ -1,6 +1,13 @@
-from fastapi import APIRouter, Query
-from app.services.clinicaltrials_api import fetch_trials_with_filters
-import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from app.services.clinicaltrials_api import (
+    fetch_trials_with_filters_async,
+    fetch_trial_detail_async,
+    normalize_nct_id,
+    prefetch_next_page,
+)
+from app.services.trial_facets import FACET_SOURCES, fetch_trial_facets
+from app.services.trial_physicians import fetch_trial_physicians
 
 router = APIRouter()
 
@@ -13,6 +20,9 @@ async def get_trials(
     specialty: str = Query(""),
     status: str = Query(""),
     phase: str = Query(""),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=500),
     limit: int = Query(10, ge=1),
     offset: int = Query(0, ge=0),
 ):
@@ -23,11 +33,15 @@ async def get_trials(
     if specialty.strip(): filters["specialty"] = specialty.strip()
     if status.strip():    filters["status"]    = status.strip()
     if phase.strip():     filters["phase"]     = phase.strip()
+    # Radius mode: trials with a site within radius_km of (lat, lon), nearest first
+    if lat is not None and lon is not None:
+        filters["lat"], filters["lon"] = lat, lon
+        if radius_km is not None:
+            filters["radius_km"] = radius_km
 
-    loop = asyncio.get_running_loop()
-    trials, total_count = await loop.run_in_executor(
-        None, fetch_trials_with_filters, filters, limit, offset
-    )
+    trials, total_count, complete = await fetch_trials_with_filters_async(filters, limit, offset)
+    # Users almost always click "next" — warm it while they read this page
+    prefetch_next_page(filters, limit, offset, total_count)
 
     return {
         "filters": {
@@ -37,6 +51,9 @@ async def get_trials(
             "specialty": specialty,
             "status": status,
             "phase": phase,
+            "lat": lat,
+            "lon": lon,
+            "radius_km": radius_km,
         },
         "trials": trials,
         "pagination": {
@@ -45,5 +62,48 @@ async def get_trials(
             "total": total_count,
             "page": (offset // limit) + 1 if limit > 0 else 1,
             "has_more": (offset + limit) < total_count,
+            # False when a radius search hit its scan cap — the ranking may miss trials
+            "complete": complete,
         },
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/facets")
+async def get_trial_facets(
+    condition: str = Query(""),
+    us_only: bool = Query(True),
+    source: str = Query("auto"),
+):
+    """Status / phase / state / sponsor counts for a condition, in one pass."""
+    if source not in FACET_SOURCES:
+        raise HTTPException(status_code=400, detail=f"source must be one of {', '.join(FACET_SOURCES)}")
+    return await fetch_trial_facets(condition.strip(), us_only, source)
+
+
+@router.get("/{nct_id}")
+async def get_trial(nct_id: str):
+    """One trial's full record — description, criteria, contact and every site."""
+    normalized = normalize_nct_id(nct_id)
+    if not normalized:
+        raise HTTPException(status_code=400, detail=f"Invalid NCT id: {nct_id}")
+    trial = await fetch_trial_detail_async(normalized)
+    if not trial:
+        raise HTTPException(status_code=404, detail=f"Trial {normalized} not found")
+    return trial
+
+
+@router.get("/{nct_id}/physicians")
+async def get_trial_physicians(
+    nct_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    max_km: Optional[float] = Query(None, gt=0),
+    precise: bool = Query(False, description="Rooftop geocodes instead of ZIP centroids"),
+):
+    """Physicians near every US site of a trial, deduped by NPI, nearest site first."""
+    normalized = normalize_nct_id(nct_id)
+    if not normalized:
+        raise HTTPException(status_code=400, detail=f"Invalid NCT id: {nct_id}")
+    result = await fetch_trial_physicians(normalized, limit, max_km, precise)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Trial {normalized} not found")
+    return result
@@ -1,7 +1,8 @@
 import duckdb
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import re
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -74,9 +75,177 @@ def get_duckdb():
     conn.execute("CREATE INDEX IF NOT EXISTS idx_physicians_nct    ON physicians(nct_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_physicians_npi    ON physicians(npi)")
 
+    # ── Full-text index ───────────────────────────────────────────────────────
+    # Inverted index over title, conditions, description and criteria.
+    # One row per (term, trial) with a field-weighted term frequency, plus the
+    # weighted document length for BM25 normalisation. Maintained by
+    # insert_trials; see index_trials_text below.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS trial_terms (
+        term            TEXT NOT NULL,
+        nct_id          TEXT NOT NULL,
+        tf              DOUBLE
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS trial_doc_stats (
+        nct_id          TEXT PRIMARY KEY,
+        doc_len         DOUBLE
+    )
+    """)
+    _backfill_text_index(conn)
+
     return conn
 
 
+# ── Full-text search ──────────────────────────────────────────────────────────
+#
+# `conditions LIKE '%x%'` over a JSON text column is a full scan with no
+# ranking. Instead each trial is tokenised once on save and searched with
+# BM25 — all query terms must match, best matches first. Built in plain SQL
+# tables rather than the DuckDB fts extension so it works offline and stays
+# current on every upsert without a full index rebuild.
+
+FTS_FIELD_WEIGHTS = {
+    "title":              3.0,
+    "conditions":         3.0,
+    "description":        1.0,
+    "inclusion_criteria": 1.0,
+    "exclusion_criteria": 1.0,
+}
+BM25_K1 = 1.2
+BM25_B  = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "that", "the", "to", "with", "who", "will", "not",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords dropped and plural 's' folded."""
+    tokens = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        if tok in _STOPWORDS:
+            continue
+        if len(tok) > 4 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+def _tokens_cte(where: str) -> str:
+    """
+    CTE `toks(nct_id, weight, term)` over every indexed field of the saved
+    trials matching `where`. Tokenising runs inside DuckDB with the same
+    rules as tokenize() — binding large Python term lists into a query is
+    far slower than letting the engine split the text itself.
+    """
+    weighted_fields = " UNION ALL ".join(
+        f"SELECT nct_id, {weight} AS weight, {field} AS txt FROM trials WHERE {where}"
+        for field, weight in FTS_FIELD_WEIGHTS.items()
+    )
+    stopwords = ", ".join(f"'{w}'" for w in sorted(_STOPWORDS))
+    return f"""
+    WITH raw AS (
+        SELECT nct_id, weight,
+               unnest(regexp_extract_all(lower(COALESCE(txt, '')), '[a-z0-9]+')) AS tok
+        FROM ({weighted_fields})
+    ),
+    toks AS (
+        SELECT nct_id, weight,
+               CASE WHEN length(tok) > 4 AND suffix(tok, 's') AND NOT suffix(tok, 'ss')
+                    THEN left(tok, -1) ELSE tok END AS term
+        FROM raw
+        WHERE tok NOT IN ({stopwords})
+    )
+    """
+
+
+def _reindex(conn, where: str, params: List[Any]) -> None:
+    """Rebuild term rows and doc stats for the saved trials matching `where`."""
+    conn.execute(f"DELETE FROM trial_terms WHERE nct_id IN (SELECT nct_id FROM trials WHERE {where})", params)
+    conn.execute(_tokens_cte(where) + """
+    INSERT INTO trial_terms
+    SELECT term, nct_id, SUM(weight) FROM toks GROUP BY term, nct_id
+    """, params * len(FTS_FIELD_WEIGHTS))
+    # Every reindexed trial gets a stats row, even one with no indexable
+    # text, so the backfill doesn't keep revisiting it.
+    conn.execute(f"""
+    INSERT INTO trial_doc_stats (nct_id, doc_len)
+    SELECT t.nct_id, COALESCE(SUM(tt.tf), 0)
+    FROM (SELECT nct_id FROM trials WHERE {where}) t
+    LEFT JOIN trial_terms tt USING (nct_id)
+    GROUP BY t.nct_id
+    ON CONFLICT (nct_id) DO UPDATE SET doc_len = excluded.doc_len
+    """, params)
+
+
+def index_trials_text(conn, nct_ids: List[str]) -> None:
+    """(Re)index the given saved trials from their current rows in `trials`."""
+    if nct_ids:
+        _reindex(conn, "nct_id IN (SELECT unnest(?::TEXT[]))", [list(nct_ids)])
+
+
+def _backfill_text_index(conn) -> None:
+    """Index any saved trials that predate the full-text tables."""
+    where = "nct_id NOT IN (SELECT nct_id FROM trial_doc_stats)"
+    missing = conn.execute(f"SELECT COUNT(*) FROM trials WHERE {where}").fetchone()[0]
+    if not missing:
+        return
+    _reindex(conn, where, [])
+    logger.info(f"Full-text index backfilled for {missing} trials")
+
+
+def _fts_scores_cte(terms: List[str]) -> Tuple[str, List[Any]]:
+    """
+    CTE yielding (nct_id, score) for trials containing every term, scored
+    with Okapi BM25 over the field-weighted term frequencies.
+    """
+    sql = f"""
+    WITH q AS (SELECT DISTINCT unnest(?::TEXT[]) AS term),
+    corpus AS (SELECT COUNT(*) AS n, AVG(doc_len) AS avgdl FROM trial_doc_stats),
+    df AS (
+        SELECT tt.term, COUNT(*) AS df
+        FROM trial_terms tt JOIN q USING (term)
+        GROUP BY tt.term
+    ),
+    fts AS (
+        SELECT tt.nct_id,
+               SUM(
+                   ln(1 + (corpus.n - df.df + 0.5) / (df.df + 0.5))
+                   * tt.tf * ({BM25_K1} + 1)
+                   / (tt.tf + {BM25_K1} * (1 - {BM25_B} + {BM25_B} * ds.doc_len / corpus.avgdl))
+               ) AS score
+        FROM trial_terms tt
+        JOIN df USING (term)
+        JOIN trial_doc_stats ds USING (nct_id)
+        CROSS JOIN corpus
+        GROUP BY tt.nct_id
+        HAVING COUNT(*) = (SELECT COUNT(*) FROM q)
+    )
+    """
+    return sql, [terms]
+
+
+def _condition_query(condition: str, select: str) -> Tuple[str, List[Any]]:
+    """
+    Base `SELECT <select> FROM trials t ... WHERE 1=1` for a condition search.
+    Ranked full-text match when the condition has indexable terms; a plain
+    substring match when it is only stopwords (so "the" doesn't match all
+    trials); every trial when it is empty. `score` is NULL outside FTS.
+    """
+    terms = tokenize(condition)
+    if terms:
+        cte, params = _fts_scores_cte(terms)
+        return cte + f" SELECT {select} FROM trials t JOIN fts USING (nct_id) WHERE 1=1", params
+    base = f"SELECT {select} FROM (SELECT *, NULL::DOUBLE AS score FROM trials) t WHERE 1=1"
+    if condition and condition.strip():
+        return base + " AND t.conditions ILIKE ?", [f"%{condition.strip()}%"]
+    return base, []
+
+
 # ── Trial helpers ─────────────────────────────────────────────────────────────
 
 def insert_trials(
@@ -87,6 +256,7 @@ def insert_trials(
 ) -> int:
     """Upsert trials into DuckDB. Returns count of rows inserted/updated."""
     count = 0
+    indexed = []
     for trial in trials:
         try:
             conn.execute("""
@@ -127,6 +297,9 @@ def insert_trials(
             count += 1
         except Exception as e:
             logger.error(f"Error inserting trial {trial.get('nctId')}: {e}")
+            continue
+        indexed.append(trial.get('nctId'))
+    index_trials_text(conn, indexed)
     return count
 
 
@@ -293,27 +466,50 @@ def get_trials_by_condition(
     limit: int = 20,
     offset: int = 0,
 ) -> List[Dict]:
-    query = "SELECT * FROM trials WHERE 1=1"
-    params = []
-    if condition:
-        query += " AND conditions LIKE ?"
-        params.append(f"%{condition}%")
+    """
+    Saved trials matching a free-text condition, best BM25 match first
+    (newest first when no condition is given). Each row carries a `score`.
+    """
+    query, params = _condition_query(condition, "t.*, score")
     if status:
-        query += " AND status = ?"
+        query += " AND t.status = ?"
         params.append(status)
     if phase:
-        query += " AND phase = ?"
+        query += " AND t.phase = ?"
         params.append(phase)
     if location:
-        query += " AND locations LIKE ?"
+        query += " AND t.locations LIKE ?"
         params.append(f"%{location}%")
-    query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+    query += " ORDER BY score DESC NULLS LAST, t.created_at DESC LIMIT ? OFFSET ?"
     params.extend([limit, offset])
     results = conn.execute(query, params).fetchall()
     columns = [col[0] for col in conn.description]
     return [dict(zip(columns, row)) for row in results]
 
 
+def iter_trials_by_condition(conn, condition: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the facet-relevant fields of every saved trial matching a
+    condition (same matching as get_trials_by_condition), one batch at a time.
+    """
+    query, params = _condition_query(condition, "t.nct_id, t.title, t.status, t.phase, t.sponsor, t.conditions, t.locations")
+    cursor = conn.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        for nct_id, title, status, phase, sponsor, conditions, locations in rows:
+            yield {
+                "nctId": nct_id,
+                "title": title,
+                "status": status,
+                "phases": [phase] if phase else [],
+                "sponsor": sponsor,
+                "conditions": json.loads(conditions or "[]"),
+                "locations": json.loads(locations or "[]"),
+            }
+
+
 def get_physicians_for_trial(conn, nct_id: str) -> List[Dict]:
     """Retrieve all saved physicians linked to a trial."""
     results = conn.execute(
@@ -335,16 +531,12 @@ def get_saved_searches(conn, limit: int = 20) -> List[Dict]:
 
 
 def get_trial_count(conn, condition: str = "", status: str = "", phase: str = "") -> int:
-    query = "SELECT COUNT(*) FROM trials WHERE 1=1"
-    params = []
-    if condition:
-        query += " AND conditions LIKE ?"
-        params.append(f"%{condition}%")
+    query, params = _condition_query(condition, "COUNT(*)")
     if status:
-        query += " AND status = ?"
+        query += " AND t.status = ?"
         params.append(status)
     if phase:
-        query += " AND phase = ?"
+        query += " AND t.phase = ?"
         params.append(phase)
     result = conn.execute(query, params).fetchone()
     return result[0] if result else 0
@@ -0,0 +1,112 @@
+"""
+backend/app/db/geocode_cache.py
+
+Durable geocode cache: one row per normalized street address, so a clinic
+geocoded once is never sent to Geoapify again until its entry ages out.
+
+SQLite rather than DuckDB because every uvicorn worker writes here: SQLite
+in WAL mode lets several processes share the file, while DuckDB allows one
+read-write process per database. Addresses that geocode to nothing are
+stored too (found = 0) with a shorter TTL, so a bad address costs one
+upstream call per GEOCODE_MISS_TTL_DAYS instead of one per search.
+"""
+import logging
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_DB_PATH = os.getenv("GEOCODE_CACHE_PATH", "geocodes.sqlite")
+GEOCODE_HIT_TTL_DAYS = float(os.getenv("GEOCODE_HIT_TTL_DAYS", "180"))
+GEOCODE_MISS_TTL_DAYS = float(os.getenv("GEOCODE_MISS_TTL_DAYS", "7"))
+
+# SQLite caps bound parameters per statement; stay well below it
+_LOOKUP_CHUNK = 500
+
+# "Suite 200", "Ste. 4B", "Apt 3", "Unit C", "Floor 2", "Rm 101", "# 12" — not "Fl",
+# which would also eat the Florida state code. The designator must be followed
+# by a unit number (something with a digit, or a single letter), so place
+# names such as "Ste Genevieve" are left alone.
+_UNIT_RE = re.compile(
+    r"\b(?:suite|ste|apt|apartment|unit|floor|rm|room|bldg|building)\b\.?\s*(?:[\w-]*\d[\w-]*|[a-z])\b"
+    r"|#\s*[\w-]+"
+)
+_ZIP4_RE = re.compile(r"\b(\d{5})-?\d{4}\b")
+_PUNCT_RE = re.compile(r"[.,;]")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Cache key for an address: case-folded, ZIP+4 cut to five digits,
+    suite/unit designators dropped (they share the building's coordinates),
+    punctuation and whitespace collapsed.
+    """
+    key = (address or "").casefold()
+    key = _ZIP4_RE.sub(r"\1", key)
+    key = _UNIT_RE.sub(" ", key)
+    key = _PUNCT_RE.sub(" ", key)
+    return " ".join(key.split())
+
+
+def get_geocode_db(path: Optional[str] = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(path or GEOCODE_DB_PATH, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS geocodes (
+        address_key TEXT PRIMARY KEY,
+        lat         REAL,
+        lon         REAL,
+        found       INTEGER NOT NULL,
+        cached_at   REAL NOT NULL       -- unix time
+    )
+    """)
+    return conn
+
+
+def get_geocodes(conn: sqlite3.Connection, keys: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Unexpired entries for the given normalized keys, in one query per 500
+    keys. Cached misses come back as {"lat": None, "lon": None}.
+    """
+    keys = list(dict.fromkeys(keys))
+    now = time.time()
+    hit_after = now - GEOCODE_HIT_TTL_DAYS * 86400
+    miss_after = now - GEOCODE_MISS_TTL_DAYS * 86400
+    found: Dict[str, Dict] = {}
+    for i in range(0, len(keys), _LOOKUP_CHUNK):
+        chunk = keys[i:i + _LOOKUP_CHUNK]
+        rows = conn.execute(
+            f"""
+            SELECT address_key, lat, lon FROM geocodes
+            WHERE address_key IN ({",".join("?" * len(chunk))})
+              AND cached_at > CASE WHEN found THEN ? ELSE ? END
+            """,
+            [*chunk, hit_after, miss_after],
+        ).fetchall()
+        for key, lat, lon in rows:
+            found[key] = {"lat": lat, "lon": lon}
+    return found
+
+
+def put_geocodes(conn: sqlite3.Connection, items: List[Tuple[str, Optional[float], Optional[float]]]) -> None:
+    """Upsert (key, lat, lon) rows; a None lat records a miss."""
+    now = time.time()
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO geocodes (address_key, lat, lon, found, cached_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (address_key) DO UPDATE SET
+                lat = excluded.lat, lon = excluded.lon,
+                found = excluded.found, cached_at = excluded.cached_at
+            """,
+            [(key, lat, lon, int(lat is not None), now) for key, lat, lon in items],
+        )
+
+
+def close_geocode_connection(conn):
+    if conn:
+        conn.close()
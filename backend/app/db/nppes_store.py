@@ -0,0 +1,305 @@
+"""
+backend/app/db/nppes_store.py
+
+Offline copy of the NPPES registry in a sibling DuckDB file, built from the
+CMS monthly dissemination CSV and its weekly deltas.
+
+Only individual providers (NPI-1) with at least one physician taxonomy are
+kept — the same rule _is_physician applies to live API results. Addresses
+are normalized on load (city upper-cased with whitespace collapsed, state
+upper-cased, ZIP cut to five digits) so lookups are plain equality matches
+on the (taxonomy, state, city) index. Populated by app/services/nppes_sync.py;
+read by fetch_physicians_near when PHYSICIAN_SOURCE=local.
+
+Like the trial mirror, loads write a staging copy that is swapped in when
+done, so the API server can keep a read-only connection open throughout.
+"""
+import duckdb
+import logging
+import os
+import shutil
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+NPPES_DB_PATH = os.getenv("NPPES_STORE_PATH", "nppes.duckdb")
+NPPES_TAXONOMY_SLOTS = 15   # Healthcare Provider Taxonomy Code_1 .. _15
+
+_PHYSICIAN_COLUMNS = (
+    "npi, first_name, last_name, credential, address_1, city, state, postal_code, primary_taxonomy"
+)
+
+
+def _staging_path() -> str:
+    return NPPES_DB_PATH + ".staging"
+
+
+def get_nppes_db(read_only: bool = False, path: Optional[str] = None):
+    """
+    Get a connection to the NPPES store, creating the schema if needed.
+    Read-only opens never create the file — a missing store raises
+    FileNotFoundError so callers can fall back to the live API.
+    """
+    path = path or NPPES_DB_PATH
+    if read_only:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"NPPES store not found: {path}")
+        return duckdb.connect(path, read_only=True)
+
+    conn = duckdb.connect(path)
+
+    # ── Physicians ────────────────────────────────────────────────────────────
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS nppes_physicians (
+        npi                 TEXT PRIMARY KEY,
+        first_name          TEXT,
+        last_name           TEXT,
+        credential          TEXT,
+        address_1           TEXT,
+        city                TEXT,   -- normalized: upper-case, single spaces
+        state               TEXT,   -- two-letter code
+        postal_code         TEXT,   -- five-digit ZIP
+        primary_taxonomy    TEXT
+    )
+    """)
+
+    # ── (taxonomy, state, city) index ─────────────────────────────────────────
+    # One row per taxonomy a physician holds, carrying the practice location
+    # so each ladder tier is a single index range.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS nppes_taxonomies (
+        taxonomy    TEXT,
+        state       TEXT,
+        city        TEXT,
+        npi         TEXT
+    )
+    """)
+
+    # ── Loaded files ──────────────────────────────────────────────────────────
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS nppes_sync_state (
+        source          TEXT PRIMARY KEY,   -- file basename
+        kind            TEXT,               -- 'full' | 'delta'
+        row_count       INTEGER,
+        loaded_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_nppes_tax_loc   ON nppes_taxonomies(taxonomy, state, city)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_nppes_tax_npi   ON nppes_taxonomies(npi)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_nppes_phys_loc  ON nppes_physicians(state, city)")
+    return conn
+
+
+def normalize_city(city: str) -> str:
+    return " ".join((city or "").split()).upper()
+
+
+# ── Staged loads ──────────────────────────────────────────────────────────────
+
+def _remove_staging() -> None:
+    for path in (_staging_path(), _staging_path() + ".wal"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def open_nppes_staging():
+    """Start a load on a copy of the served store (if any)."""
+    _remove_staging()
+    if os.path.exists(NPPES_DB_PATH):
+        shutil.copyfile(NPPES_DB_PATH, _staging_path())
+    return get_nppes_db(path=_staging_path())
+
+
+def publish_nppes_staging(conn) -> None:
+    """Flush and close the staging connection, then atomically replace the served file."""
+    conn.execute("CHECKPOINT")
+    conn.close()
+    os.replace(_staging_path(), NPPES_DB_PATH)
+    logger.info(f"NPPES store published: {NPPES_DB_PATH}")
+
+
+def discard_nppes_staging(conn) -> None:
+    conn.close()
+    _remove_staging()
+
+
+# ── Writes ────────────────────────────────────────────────────────────────────
+
+def _csv_source_sql(columns: List[str]) -> str:
+    """
+    Project the dissemination file down to the columns we keep, normalized.
+    DuckDB streams the CSV and only materializes these columns, so the
+    ~330-column monthly file never has to fit in memory.
+    """
+    slots = [
+        n for n in range(1, NPPES_TAXONOMY_SLOTS + 1)
+        if f"Healthcare Provider Taxonomy Code_{n}" in columns
+    ]
+    codes = ", ".join(f'nullif(trim("Healthcare Provider Taxonomy Code_{n}"), \'\')' for n in slots)
+    primary = " ".join(
+        f'WHEN "Healthcare Provider Primary Taxonomy Switch_{n}" = \'Y\' '
+        f'THEN nullif(trim("Healthcare Provider Taxonomy Code_{n}"), \'\')'
+        for n in slots if f"Healthcare Provider Primary Taxonomy Switch_{n}" in columns
+    )
+    deactivated = "nullif(trim(\"NPI Deactivation Date\"), '')" if "NPI Deactivation Date" in columns else "NULL"
+    reactivated = "nullif(trim(\"NPI Reactivation Date\"), '')" if "NPI Reactivation Date" in columns else "NULL"
+    return f"""
+    SELECT
+        trim("NPI")                                                             AS npi,
+        trim("Entity Type Code")                                                AS entity_type,
+        trim("Provider First Name")                                             AS first_name,
+        trim("Provider Last Name (Legal Name)")                                 AS last_name,
+        trim("Provider Credential Text")                                        AS credential,
+        trim("Provider First Line Business Practice Location Address")          AS address_1,
+        upper(regexp_replace(trim("Provider Business Practice Location Address City Name"), '\\s+', ' ', 'g')) AS city,
+        upper(trim("Provider Business Practice Location Address State Name"))   AS state,
+        left(trim("Provider Business Practice Location Address Postal Code"), 5) AS postal_code,
+        list_filter([{codes}], c -> c IS NOT NULL)                              AS codes,
+        {f"CASE {primary} END" if primary else "NULL"}                          AS primary_switch,
+        {deactivated} IS NOT NULL AND {reactivated} IS NULL                     AS deactivated
+    FROM read_csv(?, header = true, all_varchar = true)
+    """
+
+
+def load_nppes_csv(
+    conn,
+    path: str,
+    columns: List[str],
+    physician_codes: List[str],
+    excluded_codes: List[str],
+    full: bool,
+) -> Dict[str, int]:
+    """
+    Apply one dissemination file. A full file replaces the store; a delta
+    replaces only the NPIs it mentions (dropping deactivated ones and any
+    that no longer hold a physician taxonomy). Returns seen/kept counts.
+    """
+    conn.execute(f"""
+    CREATE OR REPLACE TEMP TABLE nppes_load AS
+    SELECT *,
+        entity_type = '1'
+        AND NOT deactivated
+        AND list_has_any(codes, ?::TEXT[])
+        AND NOT list_has_any(codes, ?::TEXT[]) AS keep
+    FROM ({_csv_source_sql(columns)})
+    """, [physician_codes, excluded_codes, path])
+
+    if full:
+        conn.execute("DELETE FROM nppes_taxonomies")
+        conn.execute("DELETE FROM nppes_physicians")
+    else:
+        conn.execute("DELETE FROM nppes_taxonomies WHERE npi IN (SELECT npi FROM nppes_load)")
+        conn.execute("DELETE FROM nppes_physicians WHERE npi IN (SELECT npi FROM nppes_load)")
+
+    conn.execute(f"""
+    INSERT INTO nppes_physicians ({_PHYSICIAN_COLUMNS})
+    SELECT npi, first_name, last_name, credential, address_1, city, state, postal_code,
+           coalesce(primary_switch, codes[1])
+    FROM nppes_load WHERE keep
+    """)
+    conn.execute("""
+    INSERT INTO nppes_taxonomies
+    SELECT DISTINCT unnest(codes), state, city, npi FROM nppes_load WHERE keep
+    """)
+
+    seen, kept = conn.execute("SELECT COUNT(*), COUNT(*) FILTER (WHERE keep) FROM nppes_load").fetchone()
+    conn.execute("DROP TABLE nppes_load")
+    return {"seen": seen, "kept": kept}
+
+
+def is_loaded(conn, source: str) -> bool:
+    return conn.execute("SELECT 1 FROM nppes_sync_state WHERE source = ?", [source]).fetchone() is not None
+
+
+def record_load(conn, source: str, kind: str, row_count: int) -> None:
+    conn.execute("""
+    INSERT INTO nppes_sync_state (source, kind, row_count, loaded_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (source) DO UPDATE SET
+        kind      = excluded.kind,
+        row_count = excluded.row_count,
+        loaded_at = excluded.loaded_at
+    """, [source, kind, row_count])
+    if kind == "full":
+        # A full file supersedes every delta loaded before it
+        conn.execute("DELETE FROM nppes_sync_state WHERE kind = 'delta'")
+
+
+def export_nppes_parquet(conn, directory: str) -> None:
+    """Write both tables as Parquet files for use outside the API."""
+    os.makedirs(directory, exist_ok=True)
+    for table in ("nppes_physicians", "nppes_taxonomies"):
+        target = os.path.join(directory, f"{table}.parquet").replace("'", "''")
+        conn.execute(f"COPY {table} TO '{target}' (FORMAT PARQUET)")
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def find_nppes_physicians(
+    conn,
+    taxonomy_codes: List[str],
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    limit: int = 10,
+) -> List[Dict[str, Any]]:
+    """
+    Physicians practicing at (city, state) — either bound may be omitted —
+    holding any of `taxonomy_codes`, best-ranked code first. With no codes,
+    every physician at the location qualifies.
+    """
+    where, params = ["1=1"], []
+    if state:
+        where.append("state = ?")
+        params.append(state.upper())
+    if city:
+        where.append("city = ?")
+        params.append(normalize_city(city))
+
+    if taxonomy_codes:
+        query = f"""
+        WITH ranked AS (
+            SELECT npi, MIN(list_position(?::TEXT[], taxonomy)) AS rank
+            FROM nppes_taxonomies
+            WHERE list_contains(?::TEXT[], taxonomy) AND {" AND ".join(where)}
+            GROUP BY npi
+        )
+        SELECT {", ".join("p." + c.strip() for c in _PHYSICIAN_COLUMNS.split(","))}
+        FROM ranked JOIN nppes_physicians p USING (npi)
+        ORDER BY ranked.rank, p.npi
+        LIMIT ?
+        """
+        params = [taxonomy_codes, taxonomy_codes, *params, limit]
+    else:
+        query = f"""
+        SELECT {_PHYSICIAN_COLUMNS} FROM nppes_physicians
+        WHERE {" AND ".join(where)}
+        ORDER BY npi
+        LIMIT ?
+        """
+        params.append(limit)
+
+    cursor = conn.execute(query, params)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def list_nppes_physicians(conn, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Every stored physician (up to `limit`), in NPI order."""
+    query = f"SELECT {_PHYSICIAN_COLUMNS} FROM nppes_physicians ORDER BY npi"
+    params = []
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    cursor = conn.execute(query, params)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def get_nppes_count(conn) -> int:
+    return conn.execute("SELECT COUNT(*) FROM nppes_physicians").fetchone()[0]
+
+
+def close_nppes_connection(conn):
+    if conn:
+        conn.close()
@@ -0,0 +1,195 @@
+"""
+backend/app/db/redis_client.py
+
+Optional shared cache tier in Redis, behind the in-process TTLCache
+(app/utils/caching.py), so several uvicorn workers share one warm cache
+instead of each re-querying clinicaltrials.gov, NPPES and Geoapify.
+
+Enabled by setting REDIS_URL; without it every call here is a no-op miss.
+Redis errors are logged and treated as misses — the tier is an
+optimisation, never a dependency of a request succeeding.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "tpf:")
+REDIS_LOCK_TTL = float(os.getenv("REDIS_LOCK_TTL", "30"))     # seconds a fill may hold the lock
+REDIS_LOCK_WAIT = float(os.getenv("REDIS_LOCK_WAIT", "10"))   # seconds a waiter polls before loading itself
+REDIS_POLL_INTERVAL = 0.05
+
+# Payloads above this many bytes are zlib-compressed; a one-byte tag says which
+_COMPRESS_MIN_BYTES = 1024
+_RAW = b"j"
+_ZLIB = b"z"
+
+# Delete the lock only if we still own it
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_redis: Optional[redis.Redis] = None
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """The shared client, created on first use; None when REDIS_URL is unset."""
+    global _redis
+    if _redis is None and REDIS_URL:
+        _redis = redis.from_url(REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+def _key(key: str) -> str:
+    return REDIS_KEY_PREFIX + key
+
+
+def dumps(value: Any) -> bytes:
+    data = json.dumps(value, separators=(",", ":")).encode()
+    if len(data) >= _COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(data, 6)
+    return _RAW + data
+
+
+def loads(payload: bytes) -> Any:
+    tag, body = payload[:1], payload[1:]
+    if tag == _ZLIB:
+        body = zlib.decompress(body)
+    return json.loads(body)
+
+
+# ── Reads / writes ────────────────────────────────────────────────────────────
+
+async def cache_get(key: str) -> Tuple[bool, Any]:
+    """(found, value)."""
+    client = get_redis()
+    if client is None:
+        return False, None
+    try:
+        payload = await client.get(_key(key))
+    except redis.RedisError as e:
+        logger.warning(f"Redis get failed for {key}: {e}")
+        return False, None
+    return (True, loads(payload)) if payload is not None else (False, None)
+
+
+async def cache_get_many(keys: List[str]) -> Dict[str, Any]:
+    """Values for the keys that are present, fetched in one MGET round-trip."""
+    client = get_redis()
+    if client is None or not keys:
+        return {}
+    try:
+        payloads = await client.mget([_key(k) for k in keys])
+    except redis.RedisError as e:
+        logger.warning(f"Redis mget failed for {len(keys)} keys: {e}")
+        return {}
+    return {k: loads(p) for k, p in zip(keys, payloads) if p is not None}
+
+
+async def cache_set(key: str, value: Any, ttl: float) -> None:
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        await client.set(_key(key), dumps(value), px=int(ttl * 1000))
+    except redis.RedisError as e:
+        logger.warning(f"Redis set failed for {key}: {e}")
+
+
+async def cache_set_many(items: Dict[str, Any], ttl: float) -> None:
+    """Store several values in one pipelined round-trip."""
+    client = get_redis()
+    if client is None or not items:
+        return
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(_key(key), dumps(value), px=int(ttl * 1000))
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Redis pipeline set failed for {len(items)} keys: {e}")
+
+
+# ── Single fill across workers ────────────────────────────────────────────────
+
+async def _acquire_lock(client: redis.Redis, key: str) -> Optional[str]:
+    token = uuid.uuid4().hex
+    if await client.set(_key("lock:" + key), token, nx=True, px=int(REDIS_LOCK_TTL * 1000)):
+        return token
+    return None
+
+
+async def _release_lock(client: redis.Redis, key: str, token: str) -> None:
+    try:
+        await client.eval(_RELEASE_LOCK, 1, _key("lock:" + key), token)
+    except redis.RedisError as e:
+        logger.warning(f"Redis lock release failed for {key}: {e}")
+
+
+async def fill_once(
+    key: str,
+    ttl: float,
+    load: Callable[[], Awaitable[Any]],
+    cache_if: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    """
+    Return the shared value for `key`, running `load` in at most one worker.
+
+    The worker that wins the lock loads and stores the value; the others poll
+    for it until the lock is released or REDIS_LOCK_WAIT passes, then load
+    it themselves (e.g. when the winner's result was vetoed by cache_if).
+    """
+    client = get_redis()
+    if client is None:
+        return await load()
+
+    found, value = await cache_get(key)
+    if found:
+        return value
+
+    try:
+        token = await _acquire_lock(client, key)
+    except redis.RedisError as e:
+        logger.warning(f"Redis lock failed for {key}: {e}")
+        return await load()
+
+    if token:
+        try:
+            value = await load()
+            if cache_if is None or cache_if(value):
+                await cache_set(key, value, ttl)
+            return value
+        finally:
+            await _release_lock(client, key, token)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + REDIS_LOCK_WAIT
+    try:
+        while loop.time() < deadline:
+            await asyncio.sleep(REDIS_POLL_INTERVAL)
+            found, value = await cache_get(key)
+            if found:
+                return value
+            if not await client.exists(_key("lock:" + key)):
+                break
+    except redis.RedisError as e:
+        logger.warning(f"Redis wait failed for {key}: {e}")
+    return await load()
@@ -0,0 +1,443 @@
+"""
+backend/app/db/trial_mirror.py
+
+Local mirror of ClinicalTrials.gov studies in a sibling DuckDB file.
+
+Rows hold the same flattened trial shape fetch_trials returns (parse_study),
+plus the upstream last-update date so re-syncs only touch studies that
+actually changed. Populated by app/services/trial_sync.py; read by
+fetch_trials_with_filters when TRIAL_SOURCE=mirror.
+
+DuckDB allows one read-write process per file and refuses read-only opens
+while it is held, so syncs never write the served file: they work on a
+staging copy and atomically swap it in when done.
+"""
+import duckdb
+import json
+import logging
+import os
+import shutil
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from datetime import datetime
+
+from app.utils.geohash import GEOHASH_PRECISION, cells_covering, encode
+
+logger = logging.getLogger(__name__)
+
+MIRROR_DB_PATH = os.getenv("TRIAL_MIRROR_PATH", "trialmirror.duckdb")
+MIRROR_CANDIDATE_BATCH = 200
+
+
+def _staging_path() -> str:
+    return MIRROR_DB_PATH + ".staging"
+
+
+def get_mirror_db(read_only: bool = False, path: Optional[str] = None):
+    """
+    Get a connection to the mirror database, creating the schema if needed.
+    Read-only opens never create the file — a missing mirror raises
+    FileNotFoundError so callers can fall back to the live API.
+    """
+    path = path or MIRROR_DB_PATH
+    if read_only:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Trial mirror not found: {path}")
+        return duckdb.connect(path, read_only=True)
+
+    conn = duckdb.connect(path)
+
+    # ── Mirrored studies ──────────────────────────────────────────────────────
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS mirror_trials (
+        nct_id              TEXT PRIMARY KEY,
+        title               TEXT,
+        status              TEXT,
+        phases              TEXT,   -- JSON array
+        sponsor             TEXT,
+        conditions          TEXT,   -- JSON array
+        locations           TEXT,   -- JSON array
+        description         TEXT,
+        inclusion_criteria  TEXT,
+        exclusion_criteria  TEXT,
+        point_of_contact    TEXT,   -- JSON object
+        last_update         DATE,   -- upstream lastUpdatePostDate
+        synced_at           TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # ── Sync watermarks ───────────────────────────────────────────────────────
+    # One row per sync scope (a condition query, or '*' for everything) so an
+    # incremental run knows where the previous one left off.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS mirror_sync_state (
+        scope           TEXT PRIMARY KEY,
+        last_update     DATE,
+        study_count     INTEGER,
+        synced_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # ── Site coordinates ──────────────────────────────────────────────────────
+    # One row per geocoded site, keyed by geohash cell so radius searches
+    # only touch the cells around the search point.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS mirror_sites (
+        nct_id      TEXT,
+        lat         DOUBLE,
+        lon         DOUBLE,
+        geohash     TEXT
+    )
+    """)
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mirror_status      ON mirror_trials(status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mirror_last_update ON mirror_trials(last_update)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mirror_sites_nct   ON mirror_sites(nct_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mirror_sites_cell  ON mirror_sites(geohash)")
+
+    _backfill_sites(conn)
+    return conn
+
+
+def _site_rows(trial: Dict[str, Any]) -> List[Tuple]:
+    return [
+        (trial["nctId"], loc["lat"], loc["lon"], encode(loc["lat"], loc["lon"], GEOHASH_PRECISION))
+        for loc in trial.get("locations", [])
+        if loc.get("lat") is not None and loc.get("lon") is not None
+    ]
+
+
+def _backfill_sites(conn) -> None:
+    """Populate mirror_sites for mirrors synced before the table existed."""
+    if conn.execute("SELECT COUNT(*) FROM mirror_sites").fetchone()[0]:
+        return
+    rows = []
+    for nct_id, locations in conn.execute("SELECT nct_id, locations FROM mirror_trials").fetchall():
+        rows.extend(_site_rows({"nctId": nct_id, "locations": json.loads(locations or "[]")}))
+    if rows:
+        conn.executemany("INSERT INTO mirror_sites VALUES (?, ?, ?, ?)", rows)
+        logger.info(f"Mirror sites backfilled: {len(rows)} sites")
+
+
+# ── Staged syncs ──────────────────────────────────────────────────────────────
+
+def _remove_staging() -> None:
+    for path in (_staging_path(), _staging_path() + ".wal"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def open_mirror_staging():
+    """
+    Start a sync: copy the served mirror (if any) to the staging path and
+    return a read-write connection to the copy. Readers keep using the
+    served file undisturbed until publish_mirror_staging swaps it.
+    """
+    _remove_staging()
+    if os.path.exists(MIRROR_DB_PATH):
+        shutil.copyfile(MIRROR_DB_PATH, _staging_path())
+    return get_mirror_db(path=_staging_path())
+
+
+def publish_mirror_staging(conn) -> None:
+    """Flush and close the staging connection, then atomically replace the served file."""
+    conn.execute("CHECKPOINT")
+    conn.close()
+    os.replace(_staging_path(), MIRROR_DB_PATH)
+    logger.info(f"Mirror published: {MIRROR_DB_PATH}")
+
+
+def discard_mirror_staging(conn) -> None:
+    conn.close()
+    _remove_staging()
+
+
+# ── Writes ────────────────────────────────────────────────────────────────────
+
+def upsert_mirror_trials(conn, rows: List[Tuple[Dict[str, Any], Optional[str]]]) -> int:
+    """
+    Upsert (trial, last_update) pairs. Existing rows are only rewritten when
+    the incoming last_update is newer. Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    synced_at = datetime.now().isoformat()
+    conn.executemany("""
+    INSERT INTO mirror_trials (
+        nct_id, title, status, phases, sponsor, conditions, locations,
+        description, inclusion_criteria, exclusion_criteria, point_of_contact,
+        last_update, synced_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (nct_id) DO UPDATE SET
+        title               = excluded.title,
+        status              = excluded.status,
+        phases              = excluded.phases,
+        sponsor             = excluded.sponsor,
+        conditions          = excluded.conditions,
+        locations           = excluded.locations,
+        description         = excluded.description,
+        inclusion_criteria  = excluded.inclusion_criteria,
+        exclusion_criteria  = excluded.exclusion_criteria,
+        point_of_contact    = excluded.point_of_contact,
+        last_update         = excluded.last_update,
+        synced_at           = excluded.synced_at
+    WHERE mirror_trials.last_update IS NULL
+       OR excluded.last_update > mirror_trials.last_update
+    """, [
+        (
+            trial.get("nctId"),
+            trial.get("title"),
+            trial.get("status"),
+            json.dumps(trial.get("phases", [])),
+            trial.get("sponsor"),
+            json.dumps(trial.get("conditions", [])),
+            json.dumps(trial.get("locations", [])),
+            trial.get("description"),
+            trial.get("inclusionCriteria"),
+            trial.get("exclusionCriteria"),
+            json.dumps(trial.get("pointOfContact")),
+            last_update,
+            synced_at,
+        )
+        for trial, last_update in rows
+        if trial.get("nctId")
+    ])
+    written_ids = {
+        row[0] for row in conn.execute(
+            "SELECT nct_id FROM mirror_trials WHERE synced_at = ?", [synced_at]
+        ).fetchall()
+    }
+    if written_ids:
+        conn.execute(
+            "DELETE FROM mirror_sites WHERE nct_id IN (SELECT nct_id FROM mirror_trials WHERE synced_at = ?)",
+            [synced_at],
+        )
+        sites = [site for trial, _ in rows if trial.get("nctId") in written_ids for site in _site_rows(trial)]
+        if sites:
+            conn.executemany("INSERT INTO mirror_sites VALUES (?, ?, ?, ?)", sites)
+    logger.debug(f"Mirror upsert: {len(written_ids)}/{len(rows)} rows changed")
+    return len(written_ids)
+
+
+def get_sync_watermark(conn, scope: str) -> Optional[str]:
+    row = conn.execute(
+        "SELECT last_update FROM mirror_sync_state WHERE scope = ?", [scope]
+    ).fetchone()
+    return str(row[0]) if row and row[0] else None
+
+
+def set_sync_watermark(conn, scope: str, last_update: Optional[str], study_count: int) -> None:
+    conn.execute("""
+    INSERT INTO mirror_sync_state (scope, last_update, study_count, synced_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (scope) DO UPDATE SET
+        last_update = GREATEST(COALESCE(mirror_sync_state.last_update, excluded.last_update), excluded.last_update),
+        study_count = excluded.study_count,
+        synced_at   = excluded.synced_at
+    """, [scope, last_update, study_count, datetime.now().isoformat()])
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def _row_to_trial(row: Tuple) -> Dict[str, Any]:
+    (nct_id, title, status, phases, sponsor, conditions, locations,
+     description, inclusion, exclusion, point_of_contact) = row
+    return {
+        "nctId": nct_id,
+        "title": title,
+        "status": status,
+        "description": description,
+        "conditions": json.loads(conditions or "[]"),
+        "sponsor": sponsor,
+        "phases": json.loads(phases or "[]"),
+        "locations": json.loads(locations or "[]"),
+        "inclusionCriteria": inclusion or "",
+        "exclusionCriteria": exclusion or "",
+        "pointOfContact": json.loads(point_of_contact or "null"),
+    }
+
+
+_TRIAL_COLUMNS = """
+    nct_id, title, status, phases, sponsor, conditions, locations,
+    description, inclusion_criteria, exclusion_criteria, point_of_contact
+"""
+
+
+def _candidate_filter(
+    condition_terms: List[str],
+    status: str,
+    phase: str,
+    location_terms: List[str],
+    us_only: bool,
+    specialty_terms: List[str] = (),
+) -> Tuple[str, List[Any]]:
+    """
+    Coarse SQL pre-filter mirroring what the upstream query params do:
+    any condition term in title/conditions/description, exact status,
+    phase membership, every location term present in the sites, and every
+    specialty word somewhere in the record text (upstream's query.term).
+    """
+    where = "1=1"
+    params: List[Any] = []
+    if condition_terms:
+        clauses = []
+        for term in condition_terms:
+            clauses.append("(title ILIKE ? OR conditions ILIKE ? OR description ILIKE ?)")
+            params.extend([f"%{term}%"] * 3)
+        where += " AND (" + " OR ".join(clauses) + ")"
+    if status:
+        where += " AND status = ?"
+        params.append(status)
+    if phase:
+        where += " AND phases LIKE ?"
+        params.append(f'%"{phase}"%')
+    for term in location_terms:
+        where += " AND locations ILIKE ?"
+        params.append(f"%{term}%")
+    for term in specialty_terms:
+        where += (
+            " AND (title ILIKE ? OR conditions ILIKE ? OR description ILIKE ?"
+            " OR inclusion_criteria ILIKE ? OR exclusion_criteria ILIKE ?)"
+        )
+        params.extend([f"%{term}%"] * 5)
+    if us_only:
+        where += " AND locations LIKE '%United States%'"
+    return where, params
+
+
+def iter_mirror_candidates(
+    conn,
+    condition_terms: List[str],
+    status: str = "",
+    phase: str = "",
+    location_terms: List[str] = (),
+    us_only: bool = True,
+    specialty_terms: List[str] = (),
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream pre-filtered trials, newest update first, decoding one batch at
+    a time so a caller that stops early never materialises the rest.
+    Precise relevance and city/state matching is left to the caller.
+    """
+    where, params = _candidate_filter(condition_terms, status, phase, location_terms, us_only, specialty_terms)
+    cursor = conn.execute(
+        f"SELECT {_TRIAL_COLUMNS} FROM mirror_trials WHERE {where} ORDER BY last_update DESC, nct_id",
+        params,
+    )
+    while True:
+        rows = cursor.fetchmany(MIRROR_CANDIDATE_BATCH)
+        if not rows:
+            return
+        for row in rows:
+            yield _row_to_trial(row)
+
+
+def count_mirror_candidates(
+    conn,
+    condition_terms: List[str],
+    status: str = "",
+    phase: str = "",
+    location_terms: List[str] = (),
+    us_only: bool = True,
+    specialty_terms: List[str] = (),
+) -> int:
+    """Size of the coarse pre-filter — the mirror's analogue of upstream totalCount."""
+    where, params = _candidate_filter(condition_terms, status, phase, location_terms, us_only, specialty_terms)
+    return conn.execute(f"SELECT COUNT(*) FROM mirror_trials WHERE {where}", params).fetchone()[0]
+
+
+# Great-circle distance from the bound search point (?, ?) to a site, in km
+_SITE_DISTANCE_SQL = """
+    2 * 6371.0088 * asin(least(1, sqrt(
+        pow(sin(radians(lat - ?) / 2), 2)
+        + cos(radians(?)) * cos(radians(lat)) * pow(sin(radians(lon - ?) / 2), 2)
+    )))
+"""
+
+
+def _nearby_query(
+    select: str,
+    lat: float,
+    lon: float,
+    radius_km: float,
+    candidate_args: Tuple,
+) -> Tuple[str, List[Any]]:
+    cells = sorted(cells_covering(lat, lon, radius_km))
+    cell_clause = " OR ".join(["geohash LIKE ?"] * len(cells))
+    where, params = _candidate_filter(*candidate_args)
+    query = f"""
+    WITH near AS (
+        SELECT nct_id, MIN(distance_km) AS distance_km
+        FROM (
+            SELECT nct_id, {_SITE_DISTANCE_SQL} AS distance_km
+            FROM mirror_sites
+            WHERE {cell_clause}
+        )
+        WHERE distance_km <= ?
+        GROUP BY nct_id
+    )
+    SELECT {select}
+    FROM mirror_trials JOIN near USING (nct_id)
+    WHERE {where}
+    """
+    return query, [lat, lat, lon, *[f"{cell}%" for cell in cells], radius_km, *params]
+
+
+def iter_mirror_nearby(
+    conn,
+    lat: float,
+    lon: float,
+    radius_km: float,
+    condition_terms: List[str],
+    status: str = "",
+    phase: str = "",
+    us_only: bool = True,
+    specialty_terms: List[str] = (),
+) -> Iterator[Tuple[Dict[str, Any], float]]:
+    """
+    Stream (trial, nearest-site km) for trials with a site inside the radius,
+    nearest first. Only sites in the geohash cells around the point are read.
+    """
+    query, params = _nearby_query(
+        f"{_TRIAL_COLUMNS}, near.distance_km", lat, lon, radius_km,
+        (condition_terms, status, phase, [], us_only, specialty_terms),
+    )
+    cursor = conn.execute(query + " ORDER BY near.distance_km, nct_id", params)
+    while True:
+        rows = cursor.fetchmany(MIRROR_CANDIDATE_BATCH)
+        if not rows:
+            return
+        for row in rows:
+            yield _row_to_trial(row[:-1]), row[-1]
+
+
+def count_mirror_nearby(
+    conn,
+    lat: float,
+    lon: float,
+    radius_km: float,
+    condition_terms: List[str],
+    status: str = "",
+    phase: str = "",
+    us_only: bool = True,
+    specialty_terms: List[str] = (),
+) -> int:
+    query, params = _nearby_query(
+        "COUNT(*)", lat, lon, radius_km,
+        (condition_terms, status, phase, [], us_only, specialty_terms),
+    )
+    return conn.execute(query, params).fetchone()[0]
+
+
+def get_mirror_trial(conn, nct_id: str) -> Optional[Dict[str, Any]]:
+    row = conn.execute(
+        f"SELECT {_TRIAL_COLUMNS} FROM mirror_trials WHERE nct_id = ?", [nct_id]
+    ).fetchone()
+    return _row_to_trial(row) if row else None
+
+
+def get_mirror_count(conn) -> int:
+    return conn.execute("SELECT COUNT(*) FROM mirror_trials").fetchone()[0]
+
+
+def close_mirror_connection(conn):
+    conn.close()
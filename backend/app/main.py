@@ -2,13 +2,35 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
+import asyncio
 import os
 
 load_dotenv()
 
 from app.api import trials, physicians, save          # ← added save
+from app.db import redis_client
+from app.services import clinicaltrials_api, zcta_geocoder
+from app.services.geocoder_router import geocoder_stats
+from app.utils import http_clients
+from app.utils.caching import cache_stats
 
-app = FastAPI(title="TrialPhysician Finder API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared pooled HTTP clients, one per upstream host per worker process
+    await http_clients.open_clients()
+    # Load the ZIP centroids now, so a missing gazetteer is reported at startup
+    await asyncio.to_thread(zcta_geocoder.get_zcta_index)
+    try:
+        yield
+    finally:
+        await clinicaltrials_api.cancel_prefetches()
+        await http_clients.close_clients()
+        await redis_client.close_redis()
+
+
+app = FastAPI(title="TrialPhysician Finder API", lifespan=lifespan)
 
 # Allow all origins — works for any Vercel preview URL without hardcoding.
 # allow_credentials must be False when using wildcard "*".
@@ -33,4 +55,9 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "caches": cache_stats(),
+        "geocoders": geocoder_stats(),
+        "zipCentroids": len(zcta_geocoder.get_zcta_index()),
+    }
\ No newline at end of file
@@ -1,5 +1,29 @@
 import requests
+import httpx
 import logging
+import math
+import os
+import re
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+import duckdb
+
+from app.db.trial_mirror import (
+    get_mirror_db,
+    get_mirror_trial,
+    iter_mirror_candidates,
+    count_mirror_candidates,
+    iter_mirror_nearby,
+    count_mirror_nearby,
+    close_mirror_connection,
+)
+from app.utils import http_clients
+from app.utils.caching import HIT, TTLCache, cache_response, canonical_key
+from app.utils.geohash import GeohashIndex
+from app.utils.prefetch import PagePrefetcher
+from app.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
@@ -9,6 +33,10 @@ HEADERS = {
     "User-Agent": "TrialPhysicianFinder/1.0 (contact@example.com)"
 }
 
+# "live" queries clinicaltrials.gov; "mirror" answers from the local DuckDB
+# mirror kept up to date by app/services/trial_sync.py
+TRIAL_SOURCE = os.getenv("TRIAL_SOURCE", "live").lower()
+
 STATE_MAP = {
     "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas",
     "CA": "California", "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware",
@@ -137,6 +165,44 @@ STATUS_NORMALIZE: dict[str, str] = {
 }
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# FIELD PROJECTIONS
+#
+# Without `fields` the API returns the whole protocolSection (outcomes, arms,
+# interventions, references, ...) plus derivedSection — most of the bytes we
+# download and decode are never read by parse_study. Each response shape
+# asks only for the pieces its builder reads. Piece names are listed at
+# https://clinicaltrials.gov/data-api/about-api/study-data-structure
+# ─────────────────────────────────────────────────────────────────────────────
+# Search result list — the leaves summarize_trial keeps
+STUDY_FIELDS_SUMMARY = [
+    "NCTId", "BriefTitle", "OverallStatus", "Condition", "LeadSponsorName", "Phase",
+    "LocationFacility", "LocationCity", "LocationState", "LocationCountry",
+    "LocationStatus", "LocationGeoPoint",
+]
+
+# One study's full record — everything parse_study reads
+STUDY_FIELDS_DETAIL = [
+    *STUDY_FIELDS_SUMMARY,
+    "BriefSummary", "EligibilityCriteria",
+    "CentralContactName", "CentralContactRole", "CentralContactPhone", "CentralContactEMail",
+]
+
+STUDY_FIELD_PROJECTIONS: dict[str, list[str]] = {
+    "list": STUDY_FIELDS_SUMMARY,
+    "detail": STUDY_FIELDS_DETAIL,
+    # Local mirror sync — full records plus the change watermark
+    "mirror": [*STUDY_FIELDS_DETAIL, "LastUpdatePostDate"],
+    # Page-token walks only need the cursor
+    "cursor": ["NCTId"],
+}
+
+
+def _fields_param(view: str) -> str | None:
+    fields = STUDY_FIELD_PROJECTIONS.get(view)
+    return ",".join(fields) if fields else None
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # CONDITION RELEVANCE KEYWORDS
 #
@@ -285,16 +351,18 @@ def _expand_location(location: str, us_only: bool = True) -> str | None:
     return result
 
 
-def fetch_trials(
+def _build_trial_params(
     condition: str,
     location: str = "",
     specialty: str = "",
     status: str = "",
     phase: str = "",
     limit: int = 20,
-    offset: int = 0,
     us_only: bool = True,
-) -> tuple[list, int]:
+    view: str = "list",
+    geo: str = "",
+) -> dict:
+    """Translate search inputs into ClinicalTrials.gov v2 query params."""
     location_query = _expand_location(location, us_only=us_only)
     condition_query = _expand_condition(condition)
 
@@ -305,6 +373,10 @@ def fetch_trials(
         "format": "json",
     }
 
+    fields = _fields_param(view)
+    if fields:
+        params["fields"] = fields
+
     if location_query:
         params["query.locn"] = location_query
 
@@ -324,85 +396,225 @@ def fetch_trials(
         if normalized_phase and normalized_phase not in ("ALL", ""):
             params["filter.advanced"] = f"AREA[Phase]{normalized_phase}"
 
-    if offset > 0:
-        page_token = _get_page_token(params, offset)
-        if page_token:
-            params["pageToken"] = page_token
+    # Radius search — upstream keeps only studies with a site in the circle
+    if geo:
+        params["filter.geo"] = geo
+
+    return params
+
+
+def parse_study(study: dict) -> dict:
+    """Flatten one v2 study record into the trial shape the frontend expects."""
+    protocol = study.get("protocolSection", {})
+    locations_module = protocol.get("contactsLocationsModule", {})
+
+    locations = [
+        {
+            "facility": loc.get("facility"),
+            "city": loc.get("city"),
+            "state": loc.get("state"),
+            "country": loc.get("country"),
+            "status": loc.get("recruitmentStatus"),
+            "lat": loc.get("geoPoint", {}).get("lat"),
+            "lon": loc.get("geoPoint", {}).get("lon"),
+        }
+        for loc in locations_module.get("locations", [])
+    ]
+
+    central_contacts = locations_module.get("centralContacts", [])
+    point_of_contact = None
+    if central_contacts:
+        c = central_contacts[0]
+        point_of_contact = {
+            "name": c.get("name"),
+            "role": c.get("role"),
+            "phone": c.get("phone"),
+            "email": c.get("email"),
+        }
+
+    criteria_text = protocol.get("eligibilityModule", {}).get("eligibilityCriteria", "")
+    inclusion_criteria = ""
+    exclusion_criteria = ""
+    if "Inclusion Criteria:" in criteria_text:
+        parts = criteria_text.split("Exclusion Criteria:")
+        inclusion_criteria = parts[0].replace("Inclusion Criteria:", "").strip()
+        exclusion_criteria = parts[1].strip() if len(parts) > 1 else ""
+
+    return {
+        "nctId": protocol.get("identificationModule", {}).get("nctId"),
+        "title": protocol.get("identificationModule", {}).get("briefTitle"),
+        "status": protocol.get("statusModule", {}).get("overallStatus"),
+        "description": protocol.get("descriptionModule", {}).get("briefSummary"),
+        "conditions": protocol.get("conditionsModule", {}).get("conditions", []),
+        "sponsor": protocol.get("sponsorCollaboratorsModule", {}).get("leadSponsor", {}).get("name"),
+        "phases": protocol.get("designModule", {}).get("phases", []),
+        "locations": locations,
+        "inclusionCriteria": inclusion_criteria,
+        "exclusionCriteria": exclusion_criteria,
+        "pointOfContact": point_of_contact,
+    }
+
+
+# Keys a search result keeps; description, criteria and contact are served by
+# the detail endpoint (/api/trials/{nct_id}) on demand
+SUMMARY_KEYS = ("nctId", "title", "status", "conditions", "sponsor", "phases")
+SUMMARY_LOCATION_KEYS = ("facility", "city", "state", "country", "status", "lat", "lon")
+
+
+def summarize_trial(trial: dict, us_only: bool = True) -> dict:
+    """
+    Compact list-view shape of a parsed trial. With us_only, non-US sites
+    are dropped (the UI never shows them); locationCount keeps the total.
+    """
+    locations = trial.get("locations", [])
+    shown = [loc for loc in locations if loc.get("country") == "United States"] if us_only else locations
+    summary = {key: trial.get(key) for key in SUMMARY_KEYS}
+    summary["locations"] = [{key: loc.get(key) for key in SUMMARY_LOCATION_KEYS} for loc in shown]
+    summary["locationCount"] = len(locations)
+    if "distanceKm" in trial:
+        summary["distanceKm"] = trial["distanceKm"]
+    return summary
 
+
+def _summaries(trials: list, filters: dict) -> list:
+    us_only = filters.get("us_only", True)
+    return [summarize_trial(trial, us_only) for trial in trials]
+
+
+def _parse_studies_response(data: dict, params: dict, page_start: int) -> tuple[list, int]:
+    studies = data.get("studies", [])
+    total_count = data.get("totalCount", len(studies))
+    _remember_page_token(params, page_start + len(studies), data.get("nextPageToken"))
+    logger.info(f"ClinicalTrials API: {len(studies)} studies (total={total_count}) params={params}")
+    return [parse_study(study) for study in studies], total_count
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# REQUEST PLANS
+#
+# Fetch logic is written once as generator "plans": a plan yields the query
+# params it needs fetched and is sent back the decoded JSON (or None when the
+# request failed). _run_sync drives a plan with requests, _run_async with the
+# shared httpx client, so pagination and filtering exist in one place for
+# both the blocking and the async entry points.
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _get_json_sync(params: dict) -> dict | None:
     try:
         response = requests.get(CLINICAL_TRIALS_BASE_URL, params=params, headers=HEADERS, timeout=15)
         response.raise_for_status()
-        data = response.json()
+        return response.json()
     except requests.HTTPError as e:
         logger.error(f"ClinicalTrials HTTP error: {e.response.status_code} — params: {params}")
-        return [], 0
-    except requests.RequestException as e:
+    except (requests.RequestException, ValueError) as e:
         logger.error(f"ClinicalTrials request failed: {e}")
+    return None
+
+
+# Concurrent identical upstream requests share one call
+_upstream_flight = SingleFlight("clinicaltrials")
+
+
+def _request_key(params: dict) -> str:
+    return "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+
+
+async def _get_json_async(params: dict) -> dict | None:
+    params = dict(params)
+    return await _upstream_flight.do(_request_key(params), lambda: _fetch_json_async(params))
+
+
+async def _fetch_json_async(params: dict) -> dict | None:
+    try:
+        response = await get_async_client().get(CLINICAL_TRIALS_BASE_URL, params=params)
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        logger.error(f"ClinicalTrials HTTP error: {e.response.status_code} — params: {params}")
+    except (httpx.RequestError, ValueError) as e:
+        logger.error(f"ClinicalTrials request failed: {e}")
+    return None
+
+
+def _run_sync(plan):
+    try:
+        params = next(plan)
+        while True:
+            params = plan.send(_get_json_sync(params))
+    except StopIteration as done:
+        return done.value
+
+
+async def _run_async(plan):
+    try:
+        params = next(plan)
+        while True:
+            params = plan.send(await _get_json_async(params))
+    except StopIteration as done:
+        return done.value
+
+
+def _fetch_trials_plan(
+    condition: str,
+    location: str,
+    specialty: str,
+    status: str,
+    phase: str,
+    limit: int,
+    offset: int,
+    us_only: bool,
+    view: str,
+    geo: str = "",
+):
+    params = _build_trial_params(condition, location, specialty, status, phase, limit, us_only, view, geo)
+
+    page_start = 0
+    if offset > 0:
+        page_token = yield from _page_token_plan(params, offset)
+        if page_token:
+            params["pageToken"] = page_token
+            page_start = offset
+
+    data = yield params
+    if data is None:
         return [], 0
+    return _parse_studies_response(data, params, page_start)
 
-    studies = data.get("studies", [])
-    total_count = data.get("totalCount", len(studies))
-    logger.info(f"ClinicalTrials API: {len(studies)} studies (total={total_count}) params={params}")
 
-    results = []
-    for study in studies:
-        protocol = study.get("protocolSection", {})
-        locations_module = protocol.get("contactsLocationsModule", {})
-
-        locations = [
-            {
-                "facility": loc.get("facility"),
-                "city": loc.get("city"),
-                "state": loc.get("state"),
-                "country": loc.get("country"),
-                "status": loc.get("recruitmentStatus"),
-                "lat": loc.get("geoPoint", {}).get("lat"),
-                "lon": loc.get("geoPoint", {}).get("lon"),
-            }
-            for loc in locations_module.get("locations", [])
-        ]
-
-        central_contacts = locations_module.get("centralContacts", [])
-        point_of_contact = None
-        if central_contacts:
-            c = central_contacts[0]
-            point_of_contact = {
-                "name": c.get("name"),
-                "role": c.get("role"),
-                "phone": c.get("phone"),
-                "email": c.get("email"),
-            }
-
-        criteria_text = protocol.get("eligibilityModule", {}).get("eligibilityCriteria", "")
-        inclusion_criteria = ""
-        exclusion_criteria = ""
-        if "Inclusion Criteria:" in criteria_text:
-            parts = criteria_text.split("Exclusion Criteria:")
-            inclusion_criteria = parts[0].replace("Inclusion Criteria:", "").strip()
-            exclusion_criteria = parts[1].strip() if len(parts) > 1 else ""
-
-        results.append({
-            "nctId": protocol.get("identificationModule", {}).get("nctId"),
-            "title": protocol.get("identificationModule", {}).get("briefTitle"),
-            "status": protocol.get("statusModule", {}).get("overallStatus"),
-            "description": protocol.get("descriptionModule", {}).get("briefSummary"),
-            "conditions": protocol.get("conditionsModule", {}).get("conditions", []),
-            "sponsor": protocol.get("sponsorCollaboratorsModule", {}).get("leadSponsor", {}).get("name"),
-            "phases": protocol.get("designModule", {}).get("phases", []),
-            "locations": locations,
-            "inclusionCriteria": inclusion_criteria,
-            "exclusionCriteria": exclusion_criteria,
-            "pointOfContact": point_of_contact,
-        })
-
-    return results, total_count
+def fetch_trials(
+    condition: str,
+    location: str = "",
+    specialty: str = "",
+    status: str = "",
+    phase: str = "",
+    limit: int = 20,
+    offset: int = 0,
+    us_only: bool = True,
+    view: str = "list",
+) -> tuple[list, int]:
+    return _run_sync(_fetch_trials_plan(
+        condition, location, specialty, status, phase, limit, offset, us_only, view,
+    ))
 
 
-def fetch_trials_with_filters(
-    filters: dict,
-    limit: int = 10,
+async def fetch_trials_async(
+    condition: str,
+    location: str = "",
+    specialty: str = "",
+    status: str = "",
+    phase: str = "",
+    limit: int = 20,
     offset: int = 0,
+    us_only: bool = True,
+    view: str = "list",
 ) -> tuple[list, int]:
+    """Same as fetch_trials, but over the shared pooled httpx client."""
+    return await _run_async(_fetch_trials_plan(
+        condition, location, specialty, status, phase, limit, offset, us_only, view,
+    ))
+
+
+def _resolve_city_state(filters: dict) -> tuple[str, str]:
     city  = (filters.get("city")  or "").strip()
     state = (filters.get("state") or "").strip()
 
@@ -412,71 +624,638 @@ def fetch_trials_with_filters(
             state = city
         city = ""
 
-    location_str = ", ".join(filter(None, [city, state]))
-
-    api_results, api_total = fetch_trials(
-        condition=filters.get("condition", ""),
-        location=location_str,
-        specialty=filters.get("specialty", ""),
-        status=filters.get("status", ""),
-        phase=filters.get("phase", ""),
-        limit=limit * 5,
-        offset=offset,
-        us_only=filters.get("us_only", True),
-    )
+    return city, state
 
-    # Post-fetch filter loop
-    filtered = []
-    user_condition = filters.get("condition", "").strip()
 
+def _trial_matches(trial: dict, user_condition: str, city: str, state: str) -> bool:
+    # ── Condition relevance check ────────────────────────────────────────────
+    # The API's query.cond searches full trial text, not just the conditions
+    # field. Broad synonyms like "cognitive decline" or "neurodegenerative"
+    # pull in trials that mention these terms in descriptions/endpoints but
+    # are actually about Parkinson's, insomnia, alcohol use, etc.
+    # This check verifies the trial's actual conditions[] are on-topic.
+    if user_condition:
+        if not _condition_is_relevant(trial.get("conditions", []), user_condition, trial.get("title", "")):
+            return False
+
+    if city or state:
+        # Match state by name OR abbreviation
+        state_full = STATE_MAP.get(state.upper(), state).lower()
+        for loc in trial.get("locations", []):
+            loc_city  = (loc.get("city",  "") or "").lower()
+            loc_state = (loc.get("state", "") or "").lower()
+            city_ok  = not city  or city.lower() in loc_city
+            state_ok = not state or state.lower() in loc_state or state_full in loc_state
+            if city_ok and state_ok:
+                return True
+        return False
+
+    return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ADAPTIVE OVER-FETCH
+#
+# The post-fetch filters (condition relevance + city/state) drop a share of
+# every upstream page that depends heavily on the query. A fixed 5x over-fetch
+# is too little for strict filters (short pages) and far too much for loose
+# ones (wasted payload). Instead we pull pages until `limit` matches are
+# collected, and size each page from a running per-query-shape estimate of
+# the filter pass rate.
+# ─────────────────────────────────────────────────────────────────────────────
+TRIAL_FETCH_MAX_PAGES   = 5
+TRIAL_PASS_RATE_PRIOR   = 0.2    # matches the old fixed 5x over-fetch
+TRIAL_PASS_RATE_FLOOR   = 0.02   # never plan for worse than 1-in-50
+TRIAL_PASS_RATE_ALPHA   = 0.3    # EMA weight of the newest observation
+TRIAL_PAGE_HEADROOM     = 1.25   # ask for a bit more than the estimate needs
+
+_pass_rates: dict[tuple, float] = {}
+
+
+def _query_shape(filters: dict, city: str, state: str) -> tuple:
+    """Which post-fetch filters are active — the pass rate is tracked per shape."""
+    condition_key = (filters.get("condition") or "").lower().strip()
+    if condition_key not in CONDITION_RELEVANCE_KEYWORDS:
+        condition_key = ""
+    return (condition_key, bool(city), bool(state))
+
+
+def _page_size_for(shape: tuple, needed: int) -> int:
+    if shape == ("", False, False):
+        return needed  # nothing is filtered out post-fetch
+    rate = _pass_rates.get(shape, TRIAL_PASS_RATE_PRIOR)
+    return max(needed, min(1000, math.ceil(needed / rate * TRIAL_PAGE_HEADROOM)))
+
+
+def _record_pass_rate(shape: tuple, passed: int, scanned: int) -> None:
+    if scanned <= 0:
+        return
+    observed = max(passed / scanned, TRIAL_PASS_RATE_FLOOR)
+    previous = _pass_rates.get(shape)
+    _pass_rates[shape] = observed if previous is None else previous + TRIAL_PASS_RATE_ALPHA * (observed - previous)
+
+
+def _collect_matches(
+    api_results: list,
+    user_condition: str,
+    city: str,
+    state: str,
+    needed: int,
+) -> tuple[list, int]:
+    """Filter one upstream page. Returns (matches, number of trials examined)."""
+    matches = []
+    examined = 0
     for trial in api_results:
-        # ── Condition relevance check ────────────────────────────────────────
-        # The API's query.cond searches full trial text, not just the conditions
-        # field. Broad synonyms like "cognitive decline" or "neurodegenerative"
-        # pull in trials that mention these terms in descriptions/endpoints but
-        # are actually about Parkinson's, insomnia, alcohol use, etc.
-        # This check verifies the trial's actual conditions[] are on-topic.
-        if user_condition:
-            if not _condition_is_relevant(trial.get("conditions", []), user_condition, trial.get("title", "")):
-                continue
-
-        if city or state:
-            match = False
-            for loc in trial.get("locations", []):
-                loc_city  = (loc.get("city",  "") or "").lower()
-                loc_state = (loc.get("state", "") or "").lower()
-                city_ok  = not city  or city.lower() in loc_city
-                # Match state by name OR abbreviation
-                state_full = STATE_MAP.get(state.upper(), state).lower()
-                state_ok = not state or state.lower() in loc_state or state_full in loc_state
-                if city_ok and state_ok:
-                    match = True
-                    break
-            if not match:
-                continue
-
-        filtered.append(trial)
-        if len(filtered) >= limit:
+        examined += 1
+        if _trial_matches(trial, user_condition, city, state):
+            matches.append(trial)
+            if len(matches) >= needed:
+                break
+    return matches, examined
+
+
+def _trial_query_kwargs(filters: dict, city: str, state: str) -> dict:
+    return {
+        "condition": filters.get("condition", ""),
+        "location": ", ".join(filter(None, [city, state])),
+        "specialty": filters.get("specialty", ""),
+        "status": filters.get("status", ""),
+        "phase": filters.get("phase", ""),
+        "us_only": filters.get("us_only", True),
+    }
+
+
+def _mirror_filter_args(filters: dict) -> tuple[list[str], str, str]:
+    """(condition terms, status, phase) as the mirror's SQL pre-filter takes them."""
+    condition_query = _expand_condition(filters.get("condition", "")) or ""
+    condition_terms = [t.strip() for t in condition_query.split(" OR ") if t.strip()]
+    status = _normalize_status(filters.get("status", "")) or ""
+    phase = filters.get("phase", "")
+    phase = _normalize_phase(phase) if phase and phase.strip() else ""
+    return condition_terms, status, phase
+
+
+def _mirror_specialty_terms(filters: dict) -> list[str]:
+    """Live search sends specialty as query.term; the mirror requires each of its words."""
+    return (filters.get("specialty") or "").split()
+
+
+def fetch_trials_from_mirror(
+    filters: dict,
+    limit: int = 10,
+    offset: int = 0,
+) -> tuple[list, int, bool]:
+    """
+    Answer a filtered search from the local mirror.
+
+    SQL does the coarse cut the upstream query params would (synonym terms,
+    status, phase, location words) and streams candidates newest-first; the
+    same _trial_matches filter then applies, and the scan stops once
+    offset + limit trials have passed. Offset indexes the filtered list.
+
+    As in live mode, the returned total is the coarse-cut count (the
+    upstream totalCount analogue), not the number that pass the post-filter.
+    """
+    condition_terms, status, phase = _mirror_filter_args(filters)
+    specialty_terms = _mirror_specialty_terms(filters)
+    us_only = filters.get("us_only", True)
+    user_condition = filters.get("condition", "").strip()
+    radius = _radius_of(filters)
+
+    conn = get_mirror_db(read_only=True)
+    try:
+        if radius:
+            nearby_args = (*radius, condition_terms, status, phase, us_only, specialty_terms)
+            total = count_mirror_nearby(conn, *nearby_args)
+            matches = []
+            examined = 0
+            for trial, distance_km in iter_mirror_nearby(conn, *nearby_args):
+                examined += 1
+                if _trial_matches(trial, user_condition, "", ""):
+                    matches.append({**trial, "distanceKm": round(distance_km, 2)})
+                    if len(matches) >= offset + limit:
+                        break
+        else:
+            city, state = _resolve_city_state(filters)
+            location_terms = [t for t in (city, STATE_MAP.get(state.upper(), state)) if t]
+            candidate_args = (condition_terms, status, phase, location_terms, us_only, specialty_terms)
+            total = count_mirror_candidates(conn, *candidate_args)
+            matches, examined = _collect_matches(
+                iter_mirror_candidates(conn, *candidate_args),
+                user_condition, city, state, offset + limit,
+            )
+    finally:
+        close_mirror_connection(conn)
+
+    logger.info(f"fetch_trials_from_mirror: {len(matches)} matches from {examined} scanned (total={total}) filters={filters}")
+    return _summaries(matches[offset:], filters), total, True
+
+
+def _try_mirror(filters: dict, limit: int, offset: int) -> tuple[list, int, bool] | None:
+    """Mirror lookup that returns None (and logs) when the mirror can't be read."""
+    try:
+        return fetch_trials_from_mirror(filters, limit, offset)
+    except (duckdb.Error, OSError) as e:
+        logger.error(f"Trial mirror unavailable, falling back to live API: {e}")
+        return None
+
+
+# Filtered results are paged by post-filter offset (the /api/trials `offset`),
+# but upstream is paged by record position. Remember, per query, which
+# upstream record each served filtered offset resumed at, so page N+1 starts
+# where page N stopped instead of re-scanning (and repeating) its trials.
+_filtered_cursor_chains: OrderedDict[str, tuple[float, dict[int, int]]] = OrderedDict()
+
+
+def _filtered_cursor_key(query: dict, user_condition: str, city: str, state: str) -> str:
+    params = _build_trial_params(**query)
+    return f"{_page_token_key(params)}|{user_condition.lower()}|{city.lower()}|{state.lower()}"
+
+
+def _nearest_filtered_cursor(key: str, offset: int) -> tuple[int, int]:
+    """Closest known (filtered_offset, upstream_cursor) at or before `offset`."""
+    with _page_token_lock:
+        chain = _lru_chain(_filtered_cursor_chains, key)
+        known = [o for o in chain if o <= offset]
+        if not known:
+            return 0, 0
+        start = max(known)
+        return start, chain[start]
+
+
+def _remember_filtered_cursor(key: str, offset: int, cursor: int) -> None:
+    if offset <= 0:
+        return
+    with _page_token_lock:
+        _lru_chain(_filtered_cursor_chains, key)[offset] = cursor
+
+
+def _filtered_search_plan(filters: dict, limit: int, offset: int):
+    city, state = _resolve_city_state(filters)
+    query = _trial_query_kwargs(filters, city, state)
+    user_condition = filters.get("condition", "").strip()
+    shape = _query_shape(filters, city, state)
+    cursor_key = _filtered_cursor_key(query, user_condition, city, state)
+
+    # Resume from the nearest page boundary we have served; any matches
+    # between it and `offset` are scanned but skipped.
+    known_offset, cursor = _nearest_filtered_cursor(cursor_key, offset)
+    to_skip = offset - known_offset
+
+    filtered: list = []
+    passed = 0
+    scanned = 0
+    api_total = 0
+    for _ in range(TRIAL_FETCH_MAX_PAGES):
+        needed = to_skip + limit - len(filtered)
+        page_size = _page_size_for(shape, needed)
+        # Follow-up pages start exactly where the previous one ended, so the
+        # page-token cache resolves them without a walk.
+        api_results, api_total = yield from _fetch_trials_plan(
+            **query, limit=page_size, offset=cursor, view="list",
+        )
+        matches, examined = _collect_matches(api_results, user_condition, city, state, needed)
+        passed += len(matches)
+        scanned += examined
+        # Resume right after the last trial consumed, not the end of the page
+        cursor += examined
+        skipped = min(to_skip, len(matches))
+        to_skip -= skipped
+        filtered.extend(matches[skipped:])
+        if len(filtered) >= limit or len(api_results) < page_size or cursor >= api_total:
+            break
+
+    if to_skip == 0:
+        _remember_filtered_cursor(cursor_key, offset + len(filtered), cursor)
+    _record_pass_rate(shape, passed, scanned)
+    logger.info(f"fetch_trials_with_filters: {len(filtered)} results from {scanned} scanned (api_total={api_total}) filters={filters}")
+    return _summaries(filtered, filters), api_total, True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# RADIUS SEARCH
+#
+# With lat/lon (and optionally radius_km) in the filters, results are trials
+# with at least one site inside the circle, nearest site first. Upstream
+# narrows to the circle with filter.geo; the returned sites are bucketed
+# into a geohash index to find each trial's closest one. Ranking needs the
+# whole in-radius set, so the live scan is capped at TRIAL_RADIUS_MAX_PAGES;
+# the ranking is cached per query, so later pages slice it instead of
+# re-scanning, and a capped scan is reported as complete=False.
+# City/state are ignored in this mode — the point replaces them.
+# ─────────────────────────────────────────────────────────────────────────────
+
+TRIAL_RADIUS_DEFAULT_KM = 50.0
+TRIAL_RADIUS_PAGE_SIZE  = 1000
+TRIAL_RADIUS_MAX_PAGES  = 3
+TRIAL_RADIUS_CACHE_TTL  = float(os.getenv("TRIAL_RADIUS_CACHE_TTL", "300"))
+
+# Ranked candidates per canonical radius query, so deeper pages are slices
+# of one scan instead of a fresh one each
+_radius_rankings = TTLCache("radius-rankings", 64, TRIAL_RADIUS_CACHE_TTL)
+
+
+def _radius_of(filters: dict) -> tuple[float, float, float] | None:
+    lat, lon = filters.get("lat"), filters.get("lon")
+    if lat is None or lon is None:
+        return None
+    return float(lat), float(lon), float(filters.get("radius_km") or TRIAL_RADIUS_DEFAULT_KM)
+
+
+def _rank_by_nearest_site(trials: list, lat: float, lon: float, radius_km: float) -> list:
+    index = GeohashIndex()
+    by_id = {}
+    for trial in trials:
+        by_id[trial["nctId"]] = trial
+        for loc in trial.get("locations", []):
+            if loc.get("lat") is not None and loc.get("lon") is not None:
+                index.insert(trial["nctId"], loc["lat"], loc["lon"])
+    return [
+        {**by_id[nct_id], "distanceKm": round(distance_km, 2)}
+        for nct_id, distance_km in index.nearest_per_key(lat, lon, radius_km)
+    ]
+
+
+def _radius_ranking_key(filters: dict) -> str:
+    return canonical_key("radius-ranking", **canonical_trial_filters(filters))
+
+
+def _radius_search_plan(filters: dict, limit: int, offset: int):
+    # Every page of one query is a slice of the same ranking — scan once
+    key = _radius_ranking_key(filters)
+    cached = _radius_rankings.get(key)
+    if cached is None:
+        cached = yield from _radius_ranking_plan(filters)
+        if cached[0]:
+            _radius_rankings.set(key, cached)
+    ranked, complete = cached
+    return _summaries(ranked[offset:offset + limit], filters), len(ranked), complete
+
+
+def _radius_ranking_plan(filters: dict):
+    """(trials ranked by nearest site, complete) — complete is False when the scan cap was hit."""
+    lat, lon, radius_km = _radius_of(filters)
+    query = _trial_query_kwargs(filters, "", "")
+    user_condition = filters.get("condition", "").strip()
+    geo = f"distance({lat},{lon},{radius_km}km)"
+
+    candidates = []
+    cursor = 0
+    api_total = 0
+    complete = False
+    for _ in range(TRIAL_RADIUS_MAX_PAGES):
+        api_results, api_total = yield from _fetch_trials_plan(
+            **query, limit=TRIAL_RADIUS_PAGE_SIZE, offset=cursor, view="list", geo=geo,
+        )
+        candidates.extend(t for t in api_results if _trial_matches(t, user_condition, "", ""))
+        cursor += len(api_results)
+        if len(api_results) < TRIAL_RADIUS_PAGE_SIZE or cursor >= api_total:
+            complete = True
             break
 
-    logger.info(f"fetch_trials_with_filters: {len(filtered)} results (api_total={api_total}) filters={filters}")
-    return filtered, api_total
+    ranked = _rank_by_nearest_site(candidates, lat, lon, radius_km)
+    if not complete:
+        logger.warning(f"radius search capped at {cursor} of {api_total} upstream trials; ranking is partial")
+    logger.info(f"radius search: {len(ranked)} trials within {radius_km}km of ({lat},{lon}) from {cursor} scanned (api_total={api_total})")
+    return ranked, complete
+
+
+def _search_plan(filters: dict, limit: int, offset: int):
+    if _radius_of(filters):
+        return _radius_search_plan(filters, limit, offset)
+    return _filtered_search_plan(filters, limit, offset)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# RESPONSE CACHE
+#
+# Filtered search results are cached per canonical query: city/state
+# resolved and spelled out, status/phase normalized, strings case-folded.
+# Stale entries are served while one background refresh replaces them.
+# Empty pages are not cached — they are as likely a failed upstream call.
+# The async entry point also shares results across workers through Redis.
+# ─────────────────────────────────────────────────────────────────────────────
+
+TRIAL_CACHE_TTL         = float(os.getenv("TRIAL_CACHE_TTL", "300"))
+TRIAL_CACHE_STALE       = float(os.getenv("TRIAL_CACHE_STALE", "900"))
+TRIAL_CACHE_MAX_ENTRIES = int(os.getenv("TRIAL_CACHE_MAX_ENTRIES", "1024"))
+
+_trial_cache = TTLCache("trials", TRIAL_CACHE_MAX_ENTRIES, TRIAL_CACHE_TTL, TRIAL_CACHE_STALE)
+
+
+def canonical_trial_filters(filters: dict) -> dict:
+    """The filter values that determine a search's results, in one spelling."""
+    city, state = _resolve_city_state(filters)
+    phase = filters.get("phase", "")
+    return {
+        "source": TRIAL_SOURCE,
+        "condition": filters.get("condition", ""),
+        "city": city,
+        "state": STATE_MAP.get(state.upper(), state),
+        "specialty": filters.get("specialty", ""),
+        "status": _normalize_status(filters.get("status", "")) or "",
+        "phase": _normalize_phase(phase) if phase and phase.strip() else "",
+        "us_only": filters.get("us_only", True),
+        "near": _radius_of(filters),
+    }
+
+
+def _trial_search_key(filters: dict, limit: int = 10, offset: int = 0) -> str:
+    return canonical_key("trials", **canonical_trial_filters(filters), limit=limit, offset=offset)
+
+
+def _has_trials(result: tuple[list, int, bool]) -> bool:
+    return bool(result[0])
+
+
+@cache_response(cache=_trial_cache, key=_trial_search_key, cache_if=_has_trials)
+def fetch_trials_with_filters(
+    filters: dict,
+    limit: int = 10,
+    offset: int = 0,
+) -> tuple[list, int, bool]:
+    if TRIAL_SOURCE == "mirror":
+        result = _try_mirror(filters, limit, offset)
+        if result is not None:
+            return result
+    return _run_sync(_search_plan(filters, limit, offset))
+
+
+@cache_response(cache=_trial_cache, key=_trial_search_key, cache_if=_has_trials, redis_tier=True)
+async def fetch_trials_with_filters_async(
+    filters: dict,
+    limit: int = 10,
+    offset: int = 0,
+) -> tuple[list, int, bool]:
+    if TRIAL_SOURCE == "mirror":
+        result = await asyncio.to_thread(_try_mirror, filters, limit, offset)
+        if result is not None:
+            return result
+    return await _run_async(_search_plan(filters, limit, offset))
 
 
 # Alias so both trials.py import names work
 fetch_trials_accurate = fetch_trials_with_filters
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# NEXT-PAGE PREFETCH
+#
+# Opt-in (TRIAL_PREFETCH=1). After a page is served, the next page for the
+# same canonical filters is fetched in the background into the response
+# cache; running the search also records its page token and filtered-offset
+# cursor, so the follow-up request is a cache hit. A real request that
+# arrives mid-prefetch joins the in-flight call through the cache's
+# single-flight. Caps: TRIAL_PREFETCH_CONCURRENCY in flight, a per-minute
+# budget, and a timeout after which an unclaimed prefetch is cancelled.
+# ─────────────────────────────────────────────────────────────────────────────
+
+TRIAL_PREFETCH             = os.getenv("TRIAL_PREFETCH", "").lower() in ("1", "true", "yes")
+TRIAL_PREFETCH_CONCURRENCY = int(os.getenv("TRIAL_PREFETCH_CONCURRENCY", "4"))
+TRIAL_PREFETCH_PER_MINUTE  = int(os.getenv("TRIAL_PREFETCH_PER_MINUTE", "60"))
+TRIAL_PREFETCH_TIMEOUT     = float(os.getenv("TRIAL_PREFETCH_TIMEOUT", "15"))
+
+_prefetcher = PagePrefetcher(
+    "trials", TRIAL_PREFETCH_CONCURRENCY, TRIAL_PREFETCH_PER_MINUTE, TRIAL_PREFETCH_TIMEOUT,
+)
+
+
+def prefetch_next_page(filters: dict, limit: int, offset: int, total: int) -> bool:
+    """Schedule the page after (limit, offset) if enabled, needed and within caps."""
+    next_offset = offset + limit
+    if not TRIAL_PREFETCH or next_offset >= total:
+        return False
+    key = _trial_search_key(filters, limit, next_offset)
+    if _trial_cache.peek(key) == HIT:
+        return False
+    return _prefetcher.schedule(key, fetch_trials_with_filters_async, filters, limit, next_offset)
+
+
+async def cancel_prefetches() -> None:
+    await _prefetcher.cancel_all()
+
+
 def _get_filter_keywords(condition: str) -> list[str]:
     return []
 
 
-def _get_page_token(base_params: dict, offset: int) -> str | None:
-    params = {**base_params, "pageSize": offset}
+# ─────────────────────────────────────────────────────────────────────────────
+# TRIAL DETAIL
+#
+# Search results are summaries (summarize_trial). The full record — brief
+# summary, eligibility criteria, central contact, every site — is fetched
+# one study at a time when the UI opens it, and cached per NCT id.
+# ─────────────────────────────────────────────────────────────────────────────
+
+TRIAL_DETAIL_CACHE_TTL         = float(os.getenv("TRIAL_DETAIL_CACHE_TTL", "3600"))
+TRIAL_DETAIL_CACHE_STALE       = float(os.getenv("TRIAL_DETAIL_CACHE_STALE", "86400"))
+TRIAL_DETAIL_CACHE_MAX_ENTRIES = int(os.getenv("TRIAL_DETAIL_CACHE_MAX_ENTRIES", "2048"))
+
+_NCT_ID_RE = re.compile(r"^NCT\d{8}$")
+
+
+def normalize_nct_id(nct_id: str) -> str | None:
+    """Upper-cased NCT id, or None if it is not one."""
+    nct_id = (nct_id or "").strip().upper()
+    return nct_id if _NCT_ID_RE.match(nct_id) else None
+
+
+def _trial_from_mirror(nct_id: str) -> dict | None:
+    conn = get_mirror_db(read_only=True)
+    try:
+        return get_mirror_trial(conn, nct_id)
+    finally:
+        close_mirror_connection(conn)
+
+
+async def _fetch_study_async(nct_id: str) -> dict | None:
+    params = {"format": "json", "fields": _fields_param("detail")}
     try:
-        r = requests.get(CLINICAL_TRIALS_BASE_URL, params=params, headers=HEADERS, timeout=15)
-        r.raise_for_status()
-        return r.json().get("nextPageToken")
-    except Exception as e:
-        logger.warning(f"Could not retrieve page token: {e}")
-        return None
\ No newline at end of file
+        response = await get_async_client().get(f"{CLINICAL_TRIALS_BASE_URL}/{nct_id}", params=params)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return parse_study(response.json())
+    except httpx.HTTPStatusError as e:
+        logger.error(f"ClinicalTrials HTTP error: {e.response.status_code} — study {nct_id}")
+    except (httpx.RequestError, ValueError) as e:
+        logger.error(f"ClinicalTrials request failed for study {nct_id}: {e}")
+    return None
+
+
+@cache_response(
+    expire=TRIAL_DETAIL_CACHE_TTL,
+    maxsize=TRIAL_DETAIL_CACHE_MAX_ENTRIES,
+    stale=TRIAL_DETAIL_CACHE_STALE,
+    key=lambda nct_id: canonical_key("trial", nct_id=nct_id),
+    cache_if=bool,
+    name="trial-detail",
+    redis_tier=True,
+)
+async def fetch_trial_detail_async(nct_id: str) -> dict | None:
+    """One study's full record, from the mirror when enabled, else upstream."""
+    if TRIAL_SOURCE == "mirror":
+        try:
+            trial = await asyncio.to_thread(_trial_from_mirror, nct_id)
+            if trial:
+                return trial
+        except (duckdb.Error, OSError) as e:
+            logger.error(f"Trial mirror unavailable, falling back to live API: {e}")
+    return await _fetch_study_async(nct_id)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# PAGE TOKEN CHAIN CACHE
+#
+# The v2 API has no offset parameter — only opaque nextPageToken cursors. The
+# old approach re-requested `pageSize=offset` full studies just to read the
+# token at the end, so deep pages grew linearly in payload.
+#
+# Instead we remember the token at every record boundary we have seen, keyed
+# by the normalized query, and resume from the nearest known boundary. Any
+# remaining gap is walked with an NCTId-only projection, so the walk costs a
+# few bytes per study instead of a full protocolSection.
+# ─────────────────────────────────────────────────────────────────────────────
+PAGE_TOKEN_CACHE_MAX_QUERIES = 512
+PAGE_TOKEN_CACHE_TTL = 3600          # seconds — upstream ordering drifts as studies update
+PAGE_TOKEN_WALK_MAX_PAGE = 1000      # API maximum pageSize
+
+# Params that change the page shape but not the underlying result ordering
+_PAGE_TOKEN_IGNORED_PARAMS = {"pageSize", "pageToken", "countTotal", "fields", "format"}
+
+_page_token_chains: OrderedDict[str, tuple[float, dict[int, str]]] = OrderedDict()
+_page_token_lock = threading.Lock()
+
+
+def _page_token_key(params: dict) -> str:
+    """Canonical key for a query: sorted, case-folded, shape params dropped."""
+    items = sorted(
+        (k, str(v).strip().lower())
+        for k, v in params.items()
+        if k not in _PAGE_TOKEN_IGNORED_PARAMS and v not in (None, "")
+    )
+    return "&".join(f"{k}={v}" for k, v in items)
+
+
+def _lru_chain(chains: OrderedDict, key: str) -> dict:
+    """Return the boundary chain for `key` in an LRU+TTL store, creating it if needed."""
+    now = time.monotonic()
+    entry = chains.get(key)
+    if entry is None or now - entry[0] > PAGE_TOKEN_CACHE_TTL:
+        entry = (now, {})
+        chains[key] = entry
+    chains.move_to_end(key)
+    while len(chains) > PAGE_TOKEN_CACHE_MAX_QUERIES:
+        chains.popitem(last=False)
+    return entry[1]
+
+
+def _page_token_chain(params: dict) -> dict[int, str]:
+    """Return the {record_offset: token} chain for a query, creating it if needed."""
+    return _lru_chain(_page_token_chains, _page_token_key(params))
+
+
+def _remember_page_token(params: dict, offset: int, token: str | None) -> None:
+    """Record that `token` starts the page at record `offset` for this query."""
+    if not token or offset <= 0:
+        return
+    with _page_token_lock:
+        _page_token_chain(params)[offset] = token
+
+
+def _nearest_page_token(params: dict, offset: int) -> tuple[int, str | None]:
+    """Closest known boundary at or before `offset` — (0, None) is the first page."""
+    with _page_token_lock:
+        chain = _page_token_chain(params)
+        known = [o for o in chain if o <= offset]
+        if not known:
+            return 0, None
+        start = max(known)
+        return start, chain[start]
+
+
+def _page_walk_params(base_params: dict, token: str | None, step: int) -> dict:
+    params = {
+        **{k: v for k, v in base_params.items() if k != "pageToken"},
+        "pageSize": step,
+        "countTotal": "false",
+        "fields": _fields_param("cursor"),
+    }
+    if token:
+        params["pageToken"] = token
+    return params
+
+
+def _page_token_plan(base_params: dict, offset: int):
+    """Plan resolving the page token for record `offset` (None if unreachable)."""
+    start, token = _nearest_page_token(base_params, offset)
+    if start == offset:
+        return token
+
+    logger.info(f"Page token walk: {start} -> {offset} (gap={offset - start})")
+    while start < offset:
+        step = min(offset - start, PAGE_TOKEN_WALK_MAX_PAGE)
+        data = yield _page_walk_params(base_params, token, step)
+        token = (data or {}).get("nextPageToken")
+        if not token:
+            # Request failed, or offset is past the end of the result set
+            return None
+        start += step
+        _remember_page_token(base_params, start, token)
+
+    return token
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SHARED ASYNC CLIENT
+#
+# One pooled httpx.AsyncClient per process from the registry in
+# app/utils/http_clients.py, opened/closed by the FastAPI lifespan. Keeps TLS
+# connections to clinicaltrials.gov alive between searches instead of paying
+# a handshake (and a thread) per call. Tuned by the CT_HTTP_* variables.
+# ─────────────────────────────────────────────────────────────────────────────
+http_clients.register("clinicaltrials", "CT", headers=HEADERS, timeout=15, max_connections=20, max_keepalive=10)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    return http_clients.get_client("clinicaltrials")
@@ -1,14 +1,44 @@
+import asyncio
 import httpx
 import os
 import logging
 
+from app.utils import http_clients
+from app.utils.ratelimit import RateLimiter
+from app.utils.singleflight import SingleFlight
+
 logger = logging.getLogger(__name__)
 
 GEOAPIFY_API_KEY = os.getenv("GEOAPIFY_API_KEY")
 GEOCODE_URL = "https://api.geoapify.com/v1/geocode/search"
+BATCH_GEOCODE_URL = "https://api.geoapify.com/v1/batch/geocode/search"
+
+# Shared by every request in the process; defaults match the free plan (5 req/s)
+GEOAPIFY_RATE_PER_SEC = float(os.getenv("GEOAPIFY_RATE_PER_SEC", "5"))
+GEOAPIFY_CONCURRENCY  = int(os.getenv("GEOAPIFY_CONCURRENCY", "4"))
+# Batch jobs are queued server-side and polled until done. This bounds the
+# job itself; how long a request waits on it is GEOCODE_BATCH_DEADLINE
+# (app/services/geocoding.py), past which the job runs on in the background
+GEOAPIFY_BATCH_POLL_INTERVAL = float(os.getenv("GEOAPIFY_BATCH_POLL_INTERVAL", "1"))
+GEOAPIFY_BATCH_MAX_POLLS     = int(os.getenv("GEOAPIFY_BATCH_MAX_POLLS", "30"))
+
+# Physician searches geocode a page of addresses at once — keep a small warm pool
+http_clients.register("geoapify", "GEOAPIFY", timeout=5, max_connections=10, max_keepalive=10)
+
+_limiter = RateLimiter("geoapify", GEOAPIFY_RATE_PER_SEC, burst=int(GEOAPIFY_RATE_PER_SEC) or 1,
+                       concurrency=GEOAPIFY_CONCURRENCY)
+
+# Concurrent lookups of the same address share one request
+_geocode_flight = SingleFlight("geoapify")
+
 
 async def geocode_address(address: str):
     """Return latitude and longitude for a given address using Geoapify API."""
+    key = " ".join(address.split()).casefold()
+    return await _geocode_flight.do(key, lambda: _geocode(address))
+
+
+async def _geocode(address: str):
     if not GEOAPIFY_API_KEY:
         logger.warning("GEOAPIFY_API_KEY is not set — skipping geocoding.")
         return {"lat": None, "lon": None}
@@ -21,21 +51,22 @@ async def geocode_address(address: str):
     }
 
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            r = await client.get(GEOCODE_URL, params=params)
-            r.raise_for_status()
-            data = r.json()
+        async with _limiter.slot():
+            r = await http_clients.get_client("geoapify").get(GEOCODE_URL, params=params)
+        r.raise_for_status()
+        data = r.json()
 
-            features = data.get("features", [])
-            if not features:
-                logger.warning(f"Geoapify returned no results for address: {address}")
-                return {"lat": None, "lon": None}
+        features = data.get("features", [])
+        if not features:
+            logger.warning(f"Geoapify returned no results for address: {address}")
+            # A definite miss, unlike the error paths below — safe to cache
+            return {"lat": None, "lon": None, "found": False}
 
-            # Geoapify returns GeoJSON: coordinates are [longitude, latitude]
-            coords = features[0]["geometry"]["coordinates"]
-            lon, lat = coords[0], coords[1]
+        # Geoapify returns GeoJSON: coordinates are [longitude, latitude]
+        coords = features[0]["geometry"]["coordinates"]
+        lon, lat = coords[0], coords[1]
 
-            return {"lat": lat, "lon": lon}
+        return {"lat": lat, "lon": lon}
 
     except (KeyError, IndexError) as e:
         logger.warning(f"Unexpected Geoapify response structure for '{address}': {e}")
@@ -45,4 +76,60 @@ async def geocode_address(address: str):
         return {"lat": None, "lon": None}
     except httpx.RequestError as e:
         logger.error(f"Geoapify request failed for '{address}': {e}")
-        return {"lat": None, "lon": None}
\ No newline at end of file
+        return {"lat": None, "lon": None}
+
+
+def _batch_result(item: dict) -> dict:
+    if item.get("lat") is None or item.get("lon") is None:
+        return {"lat": None, "lon": None, "found": False}
+    return {"lat": item["lat"], "lon": item["lon"]}
+
+
+async def geocode_batch(addresses: list[str]) -> list[dict]:
+    """
+    Geocode many addresses with one Geoapify batch job (submit, then poll
+    until it is done). Results are in input order; on any failure every
+    address comes back with None coordinates and no "found" marker, so
+    nothing is cached as a miss.
+    """
+    failed = [{"lat": None, "lon": None} for _ in addresses]
+    if not GEOAPIFY_API_KEY:
+        logger.warning("GEOAPIFY_API_KEY is not set — skipping geocoding.")
+        return failed
+
+    client = http_clients.get_client("geoapify")
+    params = {"apiKey": GEOAPIFY_API_KEY, "filter": "countrycode:us"}
+    try:
+        async with _limiter.slot():
+            r = await client.post(BATCH_GEOCODE_URL, params=params, json=addresses)
+        r.raise_for_status()
+
+        if r.status_code != 200:
+            # 202 Accepted: the job is queued — poll until it answers 200
+            job_id = r.json()["id"]
+            for _ in range(GEOAPIFY_BATCH_MAX_POLLS):
+                await asyncio.sleep(GEOAPIFY_BATCH_POLL_INTERVAL)
+                async with _limiter.slot():
+                    r = await client.get(BATCH_GEOCODE_URL, params={"id": job_id, "apiKey": GEOAPIFY_API_KEY})
+                r.raise_for_status()
+                if r.status_code == 200:
+                    break
+            else:
+                logger.error(f"Geoapify batch {job_id} not done after {GEOAPIFY_BATCH_MAX_POLLS} polls")
+                return failed
+
+        results = r.json()
+        if len(results) != len(addresses):
+            logger.error(f"Geoapify batch returned {len(results)} results for {len(addresses)} addresses")
+            return failed
+        return [_batch_result(item) for item in results]
+
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warning(f"Unexpected Geoapify batch response: {e}")
+        return failed
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Geoapify batch HTTP error: {e.response.status_code}")
+        return failed
+    except httpx.RequestError as e:
+        logger.error(f"Geoapify batch request failed: {e}")
+        return failed
@@ -0,0 +1,206 @@
+"""
+backend/app/services/geocoder_router.py
+
+Route single-address geocodes across every configured provider (Geoapify,
+MapQuest) so one slow or failing provider stops setting the tail latency of
+/api/physicians.
+
+  - Each provider keeps a rolling window of latencies and an error count.
+  - A request goes to the first healthy provider; if it has not answered
+    within that provider's p95 latency (GEOCODE_HEDGE_DEFAULT before enough
+    samples exist), or it fails, the same address is sent to the next
+    provider. The first usable answer wins and the other call is cancelled.
+  - After GEOCODE_BREAKER_FAILURES consecutive failures a provider's circuit
+    opens: it is skipped for GEOCODE_BREAKER_COOLDOWN seconds, then one
+    trial request decides whether it closes again.
+
+A provider is configured when its API key is set; with only one, the
+router just calls it.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+from app.services import geoapify_api, mapquest_api
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_HEDGE_DEFAULT     = float(os.getenv("GEOCODE_HEDGE_DEFAULT", "1.0"))   # seconds, until p95 is known
+GEOCODE_HEDGE_MIN_SAMPLES = int(os.getenv("GEOCODE_HEDGE_MIN_SAMPLES", "20"))
+GEOCODE_LATENCY_WINDOW    = 200
+GEOCODE_BREAKER_FAILURES  = int(os.getenv("GEOCODE_BREAKER_FAILURES", "5"))
+GEOCODE_BREAKER_COOLDOWN  = float(os.getenv("GEOCODE_BREAKER_COOLDOWN", "30"))
+
+NO_COORDS = {"lat": None, "lon": None}
+
+
+def _usable(geo: dict | None) -> bool:
+    """A hit or a definite miss; None coordinates without "found" mean the call failed."""
+    return geo is not None and (geo.get("lat") is not None or geo.get("found") is False)
+
+
+class GeocodeProvider:
+    def __init__(
+        self,
+        name: str,
+        geocode: Callable[[str], Awaitable[dict]],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.geocode = geocode
+        self._clock = clock
+        self.latencies: deque[float] = deque(maxlen=GEOCODE_LATENCY_WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.hedged = 0
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self._trial_inflight = False
+
+    # ── Latency ───────────────────────────────────────────────────────────────
+
+    def p95(self) -> float | None:
+        if len(self.latencies) < GEOCODE_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def hedge_after(self) -> float:
+        p95 = self.p95()
+        return GEOCODE_HEDGE_DEFAULT if p95 is None else p95
+
+    # ── Circuit breaker ───────────────────────────────────────────────────────
+
+    def available(self) -> bool:
+        """Closed, or open long enough that one trial request may go through."""
+        if self.opened_at is None:
+            return True
+        return not self._trial_inflight and self._clock() - self.opened_at >= GEOCODE_BREAKER_COOLDOWN
+
+    def _claim(self) -> tuple[bool, bool]:
+        """(may call, is the half-open trial); only the caller that gets the trial may release it."""
+        if not self.available():
+            return False, False
+        if self.opened_at is None:
+            return True, False
+        self._trial_inflight = True
+        return True, True
+
+    def _record(self, ok: bool, elapsed: float) -> None:
+        self.calls += 1
+        if ok:
+            self.latencies.append(elapsed)
+            self.consecutive_failures = 0
+            if self.opened_at is not None:
+                logger.info(f"geocoder {self.name}: circuit closed")
+            self.opened_at = None
+            return
+        self.errors += 1
+        self.consecutive_failures += 1
+        if self.opened_at is not None or self.consecutive_failures >= GEOCODE_BREAKER_FAILURES:
+            if self.opened_at is None:
+                logger.warning(f"geocoder {self.name}: circuit open after {self.consecutive_failures} failures")
+            self.opened_at = self._clock()
+
+    async def call(self, address: str) -> dict | None:
+        """The provider's answer if usable, else None (and a recorded failure)."""
+        allowed, trial = self._claim()
+        if not allowed:
+            # Another request took the half-open trial since this one was routed
+            return None
+        started = self._clock()
+        try:
+            try:
+                geo = await self.geocode(address)
+            except Exception as e:
+                logger.warning(f"geocoder {self.name} failed for '{address}': {e}")
+                geo = None
+            ok = _usable(geo)
+            self._record(ok, self._clock() - started)
+            return geo if ok else None
+        finally:
+            # Released on success, failure, cancellation and a lost hedge alike
+            if trial:
+                self._trial_inflight = False
+
+    def stats(self) -> dict:
+        p95 = self.p95()
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "hedged": self.hedged,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "circuit": "closed" if self.opened_at is None else "open",
+        }
+
+
+class GeocoderRouter:
+    def __init__(self, providers: list[GeocodeProvider]):
+        self.providers = providers
+
+    async def geocode(self, address: str) -> dict:
+        candidates = [p for p in self.providers if p.available()]
+        if not candidates:
+            # Every circuit is open — fail fast rather than wait on a dead provider
+            return dict(NO_COORDS)
+
+        tasks: dict[asyncio.Task, GeocodeProvider] = {}
+
+        def start(provider: GeocodeProvider) -> None:
+            tasks[asyncio.create_task(provider.call(address))] = provider
+
+        # available() only looks; a provider claims its half-open trial in call()
+        start(candidates[0])
+        waiting = candidates[1:]
+        try:
+            while tasks:
+                running = [t for t in tasks if not t.done()]
+                timeout = tasks[running[0]].hedge_after() if waiting and running else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The leader is past its p95 — hedge with the next provider
+                    tasks[running[0]].hedged += 1
+                    start(waiting.pop(0))
+                    continue
+                for task in done:
+                    geo = task.result()
+                    if geo is not None:
+                        return geo
+                    del tasks[task]
+                if waiting and not any(not t.done() for t in tasks):
+                    start(waiting.pop(0))
+            return dict(NO_COORDS)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {p.name: p.stats() for p in self.providers}
+
+
+def _configured_providers() -> list[GeocodeProvider]:
+    providers = []
+    if geoapify_api.GEOAPIFY_API_KEY:
+        providers.append(GeocodeProvider("geoapify", geoapify_api.geocode_address))
+    if mapquest_api.MAPQUEST_API_KEY:
+        providers.append(GeocodeProvider("mapquest", mapquest_api.geocode_address))
+    if not providers:
+        # Nothing configured: let Geoapify log its missing-key warning per call
+        providers.append(GeocodeProvider("geoapify", geoapify_api.geocode_address))
+    return providers
+
+
+router = GeocoderRouter(_configured_providers())
+
+
+async def geocode_address(address: str) -> dict:
+    """Same contract as geoapify_api.geocode_address, across every configured provider."""
+    return await router.geocode(address)
+
+
+def geocoder_stats() -> dict:
+    return router.stats()
@@ -0,0 +1,222 @@
+"""
+backend/app/services/geocoding.py
+
+Geocode a whole result list at once. Addresses are normalized
+(app/db/geocode_cache.normalize_address) so the same clinic written two
+ways is looked up once. Each unique address then goes through three tiers,
+and only what none of them knows reaches Geoapify:
+
+  1. the shared Redis tier — one MGET for the list
+  2. the durable SQLite cache — one query for the list
+  3. the provider — one call per remaining address through the hedged
+     Geoapify/MapQuest router (app/services/geocoder_router.py), or a
+     single Geoapify batch job when GEOCODE_BATCH_MIN or more are left.
+     A request waits at most GEOCODE_BATCH_DEADLINE seconds for the job;
+     after that its addresses go through the router one by one, and the
+     job finishes in the background, filling the caches for next time.
+
+An address already being geocoded for another request is joined rather
+than sent again, and every Geoapify call goes through the process-wide
+rate limiter in geoapify_api. Fresh results are written back to both caches. Definite misses go to the
+durable cache only, as negative entries, so a bad address is not
+re-geocoded on every search.
+
+locate_addresses puts the offline ZIP-centroid geocoder
+(app/services/zcta_geocoder.py) in front of all of that: ZIP-level accuracy
+is enough for distance filtering, so rooftop geocoding only runs when the
+caller asks for it or the ZIP is unknown.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+
+from app.db.geocode_cache import (
+    get_geocode_db,
+    get_geocodes,
+    put_geocodes,
+    close_geocode_connection,
+    normalize_address,
+)
+from app.db.redis_client import cache_get_many, cache_set_many
+from app.services.geoapify_api import geocode_batch
+from app.services.geocoder_router import geocode_address
+from app.services.zcta_geocoder import zip_centroid
+from app.utils.caching import canonical_key
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Clinic addresses rarely move; geocodes are shared across workers via Redis
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Below this many uncached addresses, single lookups beat a queued batch job
+GEOCODE_BATCH_MIN = int(os.getenv("GEOCODE_BATCH_MIN", "20"))
+# Longest a request waits on a queued batch job before routing its addresses singly
+GEOCODE_BATCH_DEADLINE = float(os.getenv("GEOCODE_BATCH_DEADLINE", "5"))
+
+NO_COORDS = {"lat": None, "lon": None}
+
+# Keyed by normalized address, so concurrent requests share each lookup
+_geocode_flight = SingleFlight("geocode")
+
+# Batch jobs still running after their request gave up on them
+_background: set[asyncio.Task] = set()
+
+
+def _redis_key(address_key: str) -> str:
+    return canonical_key("geocode", address=address_key)
+
+
+def _durable_lookup(keys: list[str]) -> dict:
+    conn = get_geocode_db()
+    try:
+        return get_geocodes(conn, keys)
+    finally:
+        close_geocode_connection(conn)
+
+
+def _durable_store(items: list[tuple]) -> None:
+    conn = get_geocode_db()
+    try:
+        put_geocodes(conn, items)
+    finally:
+        close_geocode_connection(conn)
+
+
+def _usable(geo: dict) -> dict | None:
+    """A provider result worth caching — a hit or a definite miss — else None."""
+    if geo.get("lat") is not None or geo.get("found") is False:
+        return geo
+    return None
+
+
+async def _remember(fresh: dict[str, dict]) -> None:
+    """Write provider results to both caches; definite misses to the durable one only."""
+    await cache_set_many(
+        {_redis_key(k): geo for k, geo in fresh.items() if geo["lat"] is not None}, GEOCODE_CACHE_TTL,
+    )
+    if fresh:
+        try:
+            await asyncio.to_thread(_durable_store, [(k, g["lat"], g["lon"]) for k, g in fresh.items()])
+        except sqlite3.Error as e:
+            logger.error(f"Geocode cache write failed: {e}")
+
+
+def _finish_in_background(batch: asyncio.Future, keys: list[str]) -> None:
+    """Cache a late batch job's results once it completes."""
+    async def store():
+        results = await batch
+        await _remember({
+            k: {"lat": geo["lat"], "lon": geo["lon"]} for k, geo in zip(keys, results) if _usable(geo) is not None
+        })
+        logger.info(f"Late geocode batch of {len(keys)} addresses finished and cached")
+
+    task = asyncio.ensure_future(store())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _geocode_one(address: str) -> dict | None:
+    try:
+        geo = await geocode_address(address)
+    except Exception as e:
+        logger.warning(f"Geocoding failed for '{address}': {e}")
+        return None
+    return _usable(geo)
+
+
+async def _geocode_missing(missing: dict[str, str]) -> dict[str, dict | None]:
+    """Provider results for {key: address}, None where the lookup failed."""
+    joined = [k for k in missing if k in _geocode_flight]
+    to_batch = [k for k in missing if k not in _geocode_flight] if len(missing) >= GEOCODE_BATCH_MIN else []
+
+    calls = {}
+    if to_batch:
+        batch = asyncio.ensure_future(geocode_batch([missing[k] for k in to_batch]))
+        position = {k: i for i, k in enumerate(to_batch)}
+        deadline = asyncio.get_running_loop().time() + GEOCODE_BATCH_DEADLINE
+        late = []
+
+        async def from_batch(key):
+            remaining = max(0.0, deadline - asyncio.get_running_loop().time())
+            try:
+                results = await asyncio.wait_for(asyncio.shield(batch), remaining)
+            except asyncio.TimeoutError:
+                if not late:
+                    logger.warning(f"Geocode batch not done after {GEOCODE_BATCH_DEADLINE}s; routing singly")
+                    _finish_in_background(batch, to_batch)
+                late.append(key)
+                return await _geocode_one(missing[key])
+            return _usable(results[position[key]])
+
+        calls.update({k: (lambda k=k: from_batch(k)) for k in to_batch})
+        logger.info(f"Geocoding {len(to_batch)} addresses in one batch job ({len(joined)} joined in flight)")
+    for k in missing:
+        calls.setdefault(k, lambda k=k: _geocode_one(missing[k]))
+
+    results = await asyncio.gather(*[_geocode_flight.do(k, call) for k, call in calls.items()])
+    return dict(zip(calls, results))
+
+
+async def geocode_addresses(addresses: list[str]) -> dict[str, dict]:
+    """{address: {"lat", "lon"}} for every address; unknown ones map to None coordinates."""
+    by_key: dict[str, str] = {}
+    for address in addresses:
+        by_key.setdefault(normalize_address(address), address)
+    known: dict[str, dict] = {}
+
+    # 1. Shared Redis tier
+    cached = await cache_get_many([_redis_key(k) for k in by_key])
+    for key in by_key:
+        if _redis_key(key) in cached:
+            known[key] = cached[_redis_key(key)]
+
+    # 2. Durable cache — hits are promoted to Redis for the other workers
+    missing = [k for k in by_key if k not in known]
+    if missing:
+        try:
+            stored = await asyncio.to_thread(_durable_lookup, missing)
+        except sqlite3.Error as e:
+            logger.error(f"Geocode cache unavailable: {e}")
+            stored = {}
+        known.update(stored)
+        await cache_set_many(
+            {_redis_key(k): geo for k, geo in stored.items() if geo["lat"] is not None}, GEOCODE_CACHE_TTL,
+        )
+
+    # 3. Provider, for whatever neither cache knew
+    missing = [k for k in by_key if k not in known]
+    if missing:
+        results = await _geocode_missing({k: by_key[k] for k in missing})
+        fresh = {k: {"lat": geo["lat"], "lon": geo["lon"]} for k, geo in results.items() if geo is not None}
+        known.update(fresh)
+        await _remember(fresh)
+        logger.info(f"Geocoded {len(missing)} new addresses ({len(by_key) - len(missing)} cached)")
+
+    return {address: known.get(normalize_address(address), NO_COORDS) for address in addresses}
+
+
+async def locate_addresses(places: list[tuple[str, str | None]], precise: bool = False) -> list[dict]:
+    """
+    {"lat", "lon", "geoPrecision"} for each (address, postal_code): the ZIP
+    centroid ("zip") unless `precise`, else — or when the ZIP is unknown —
+    the address's own geocode ("rooftop"). Precision is None when neither
+    resolved.
+    """
+    approximate = [None if precise else zip_centroid(postal_code) for _, postal_code in places]
+    pending = [address for (address, _), approx in zip(places, approximate) if approx is None]
+    exact = await geocode_addresses(pending) if pending else {}
+
+    located = []
+    for (address, _), approx in zip(places, approximate):
+        if approx is not None:
+            located.append({**approx, "geoPrecision": "zip"})
+            continue
+        geo = exact[address]
+        located.append({
+            "lat": geo["lat"],
+            "lon": geo["lon"],
+            "geoPrecision": "rooftop" if geo["lat"] is not None else None,
+        })
+    return located
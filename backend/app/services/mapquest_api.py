@@ -2,11 +2,15 @@ import httpx
 import os
 import logging
 
+from app.utils import http_clients
+
 logger = logging.getLogger(__name__)
 
 MAPQUEST_API_KEY = os.getenv("MAPQUEST_API_KEY")
 GEOCODE_URL = "http://www.mapquestapi.com/geocoding/v1/address"
 
+http_clients.register("mapquest", "MAPQUEST", timeout=5, max_connections=10, max_keepalive=10)
+
 async def geocode_address(address: str):
     """Return latitude and longitude for a given address using MapQuest API."""
     if not MAPQUEST_API_KEY:
@@ -19,18 +23,17 @@ async def geocode_address(address: str):
     }
 
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            r = await client.get(GEOCODE_URL, params=params)
-            r.raise_for_status()
-            data = r.json()
-            loc = data["results"][0]["locations"][0]["latLng"]
-
-            # MapQuest returns 0,0 for unresolved addresses
-            if loc["lat"] == 0.0 and loc["lng"] == 0.0:
-                logger.warning(f"MapQuest could not geocode address: {address}")
-                return {"lat": None, "lon": None}
-
-            return {"lat": loc["lat"], "lon": loc["lng"]}
+        r = await http_clients.get_client("mapquest").get(GEOCODE_URL, params=params)
+        r.raise_for_status()
+        data = r.json()
+        loc = data["results"][0]["locations"][0]["latLng"]
+
+        # MapQuest returns 0,0 for unresolved addresses
+        if loc["lat"] == 0.0 and loc["lng"] == 0.0:
+            logger.warning(f"MapQuest could not geocode address: {address}")
+            return {"lat": None, "lon": None, "found": False}
+
+        return {"lat": loc["lat"], "lon": loc["lng"]}
 
     except (KeyError, IndexError) as e:
         logger.warning(f"Unexpected MapQuest response structure for '{address}': {e}")
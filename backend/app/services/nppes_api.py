@@ -1,12 +1,23 @@
 import httpx
 import logging
 import asyncio
-from app.services.geoapify_api import geocode_address
+import os
+from contextlib import aclosing
+import duckdb
+from app.db.nppes_store import get_nppes_db, find_nppes_physicians, close_nppes_connection
+from app.services.geocoding import locate_addresses
+from app.utils import http_clients
+from app.utils.caching import cache_response, canonical_key
+from app.utils.hedging import run_ladder
+from app.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 NPPES_BASE_URL = "https://npiregistry.cms.hhs.gov/api/"
 
+# Taxonomy fan-out issues several queries per search — size the pool for it
+http_clients.register("nppes", "NPPES", timeout=15, max_connections=20, max_keepalive=10)
+
 PHYSICIAN_TAXONOMY_CODES = {
     "207R00000X", "207RB0002X", "207RC0000X", "207RC0001X", "207RE0101X",
     "207RG0100X", "207RG0300X", "207RH0000X", "207RH0003X", "207RI0001X",
@@ -651,17 +662,29 @@ def _is_physician(taxonomies: list) -> bool:
     return bool(codes & PHYSICIAN_TAXONOMY_CODES)
 
 
+# The registry API returns at most 200 results per call and refuses skip > 1000
+NPPES_PAGE_SIZE = 200
+NPPES_MAX_SKIP  = 1000
+
+# Concurrent identical NPPES queries (e.g. one popular search from several
+# users) share one upstream call
+_nppes_flight = SingleFlight("nppes")
+
+
 async def _query_nppes(
     city: str | None,
     state: str | None,
     limit: int,
     taxonomy_description: str | None = None,
+    skip: int = 0,
 ) -> list:
     params = {
         "version": "2.1",
         "enumeration_type": "NPI-1",
         "limit": limit,
     }
+    if skip:
+        params["skip"] = skip
     if city:
         params["city"] = city.strip()
     if state:
@@ -669,11 +692,17 @@ async def _query_nppes(
     if taxonomy_description:
         params["taxonomy_description"] = taxonomy_description
 
+    request_key = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+    return await _nppes_flight.do(request_key, lambda: _fetch_nppes(params))
+
+
+async def _fetch_nppes(params: dict) -> list:
+    city, state = params.get("city"), params.get("state")
+    taxonomy_description = params.get("taxonomy_description")
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            response = await client.get(NPPES_BASE_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
+        response = await http_clients.get_client("nppes").get(NPPES_BASE_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
     except httpx.HTTPStatusError as e:
         logger.error(f"NPPES HTTP error: {e.response.status_code}")
         return []
@@ -686,6 +715,38 @@ async def _query_nppes(
     return raw
 
 
+async def iter_nppes_physicians(
+    city: str | None,
+    state: str | None,
+    taxonomy_description: str | None = None,
+    strict_city: str | None = None,
+    strict_state: str | None = None,
+    page_size: int = NPPES_PAGE_SIZE,
+):
+    """
+    Yield physicians passing _parse_physician's filters, one NPPES page at a
+    time using `skip`. Dense cities where the strict city/state match drops
+    most of a page keep paging instead of falling through to a coarser tier;
+    the caller stops the walk (and further requests) by leaving the loop.
+    """
+    page_size = min(page_size, NPPES_PAGE_SIZE)
+    skip = 0
+    while skip <= NPPES_MAX_SKIP:
+        raw = await _query_nppes(city, state, page_size, taxonomy_description, skip)
+        for item in raw:
+            parsed = _parse_physician(item, expected_city=strict_city, expected_state=strict_state)
+            if parsed:
+                yield parsed
+        if len(raw) < page_size:
+            return
+        skip += page_size
+
+
+def _taxonomy_descriptions(codes: list[str]) -> list[str]:
+    """Unique NPPES taxonomy descriptions for `codes`, in code priority order."""
+    return list(dict.fromkeys(CODE_TO_DESCRIPTION.get(code, "Internal Medicine") for code in codes))
+
+
 def _parse_physician(
     item: dict,
     expected_city: str | None = None,
@@ -749,15 +810,202 @@ def _parse_physician(
     }
 
 
+# "live" queries the NPI Registry API; "local" answers from the offline store
+# loaded by app/services/nppes_sync.py, falling back to live if it is missing
+PHYSICIAN_SOURCE = os.getenv("PHYSICIAN_SOURCE", "live").lower()
+# Taxonomy queries one search may have in flight at once
+NPPES_TAXONOMY_CONCURRENCY  = int(os.getenv("NPPES_TAXONOMY_CONCURRENCY", "4"))
+# Hedged ladder: start the next fallback tier if the current one has not
+# answered within NPPES_HEDGE_DELAY seconds (see app/utils/hedging.py)
+NPPES_HEDGE                 = os.getenv("NPPES_HEDGE", "false").lower() in ("1", "true", "yes")
+NPPES_HEDGE_DELAY           = float(os.getenv("NPPES_HEDGE_DELAY", "0.75"))
+# ...or at once when it returns fewer physicians than this (capped at the limit)
+NPPES_HEDGE_MIN_RESULTS     = int(os.getenv("NPPES_HEDGE_MIN_RESULTS", "3"))
+
+
+def _physician_from_store(row: dict) -> dict:
+    """An NPPES store row in the shape _parse_physician returns."""
+    code = row["primary_taxonomy"] or ""
+    description = CODE_TO_DESCRIPTION.get(code) or "Unknown"
+    city = row["city"] or ""
+    return {
+        "npi": row["npi"],
+        "name": f"{row['first_name'] or ''} {row['last_name'] or ''}".strip(),
+        "credential": row["credential"] or "",
+        "city": city,
+        "state": row["state"],
+        "address": row["address_1"],
+        "postal_code": row["postal_code"],
+        "specialty": description,
+        "taxonomyCode": code,
+        "taxonomyDescription": description,
+        "full_address": f"{row['address_1'] or ''}, {city}, {row['state'] or ''} {row['postal_code'] or ''}",
+    }
+
+
+def _collect_local(city: str | None, state_code: str | None, taxonomy_codes: list[str], limit: int) -> list:
+    """The same tiered ladder as _collect_live, answered from the offline NPPES store."""
+    tiers = []
+    if taxonomy_codes:
+        if city:
+            tiers.append((taxonomy_codes, state_code, city))
+        if state_code:
+            tiers.append((taxonomy_codes, state_code, None))
+        tiers.append((taxonomy_codes, None, None))
+    if city:
+        tiers.append(([], state_code, city))
+    if state_code:
+        tiers.append(([], state_code, None))
+
+    conn = get_nppes_db(read_only=True)
+    try:
+        for codes, tier_state, tier_city in tiers:
+            rows = find_nppes_physicians(conn, codes, tier_state, tier_city, limit)
+            if rows:
+                logger.info(f"NPPES store: {len(rows)} physicians (state={tier_state}, city={tier_city}, codes={bool(codes)})")
+                return [_physician_from_store(row) for row in rows]
+    finally:
+        close_nppes_connection(conn)
+    return []
+
+
+async def _collect_live(city: str | None, state_code: str | None, taxonomy_codes: list[str], limit: int) -> list:
+    """
+    The tiered ladder against the live NPI Registry API. Each tier is only
+    used when every more specific tier is empty; with NPPES_HEDGE the tiers
+    are started speculatively instead of strictly one after another, and a
+    tier with fewer than NPPES_HEDGE_MIN_RESULTS physicians gives way to a
+    fuller tier below it.
+    """
+    page_size = limit * 5
+
+    async def first_matches(query_city, query_state, desc, strict_city, strict_state):
+        """Up to `limit` physicians from one query, paging only as far as needed."""
+        found = []
+        async with aclosing(iter_nppes_physicians(
+            query_city, query_state, desc, strict_city, strict_state, page_size,
+        )) as physicians:
+            async for physician in physicians:
+                found.append(physician)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def merge(results, seen_npis, physicians):
+        for parsed in physicians:
+            if len(results) >= limit:
+                return
+            if parsed["npi"] in seen_npis:
+                continue
+            seen_npis.add(parsed["npi"])
+            results.append(parsed)
+
+    def by_taxonomy(query_city, query_state, strict_city, strict_state=None):
+        async def tier():
+            """Query NPPES by condition taxonomy codes + location, all descriptions at once."""
+            results, seen_npis = [], set()
+            semaphore = asyncio.Semaphore(NPPES_TAXONOMY_CONCURRENCY)
+
+            async def query(desc):
+                async with semaphore:
+                    return await first_matches(query_city, query_state, desc, strict_city, strict_state)
+
+            tasks = [asyncio.create_task(query(desc)) for desc in _taxonomy_descriptions(taxonomy_codes)]
+            try:
+                # Merge in priority order so results match a one-at-a-time walk
+                for task in tasks:
+                    if len(results) >= limit:
+                        break
+                    merge(results, seen_npis, await task)
+            finally:
+                # Enough physicians (or we were cancelled) — drop the queries still pending
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"NPPES tier taxonomy city={query_city} state={query_state}: {len(results)} physicians")
+            return results
+        return tier
+
+    def unfiltered(query_city, query_state, strict_city, strict_state=None):
+        async def tier():
+            """Fallback: query NPPES by location only, no taxonomy filter."""
+            results = []
+            merge(results, set(), await first_matches(query_city, query_state, None, strict_city, strict_state))
+            logger.info(f"NPPES tier unfiltered city={query_city} state={query_state}: {len(results)} physicians")
+            return results
+        return tier
+
+    tiers = []
+    if taxonomy_codes:
+        # Step 1: condition taxonomy + city + state (most specific, no city ambiguity)
+        if city:
+            tiers.append(by_taxonomy(city, state_code, strict_city=city, strict_state=state_code))
+        # Step 2: condition taxonomy + state only
+        if state_code:
+            tiers.append(by_taxonomy(None, state_code, strict_city=None, strict_state=state_code))
+        # Step 3: condition taxonomy nationally
+        tiers.append(by_taxonomy(None, None, strict_city=None))
+    # Step 4: unfiltered location fallback
+    if city:
+        tiers.append(unfiltered(city, state_code, strict_city=city, strict_state=state_code))
+    if state_code:
+        tiers.append(unfiltered(None, state_code, strict_city=None, strict_state=state_code))
+
+    if NPPES_HEDGE:
+        return await run_ladder(tiers, NPPES_HEDGE_DELAY, min(NPPES_HEDGE_MIN_RESULTS, limit))
+    for tier in tiers:
+        results = await tier()
+        if results:
+            return results
+    return []
+
+
+# Physician lookups change slowly — cache per canonical (city, state, condition)
+PHYSICIAN_CACHE_TTL         = float(os.getenv("PHYSICIAN_CACHE_TTL", "3600"))
+PHYSICIAN_CACHE_STALE       = float(os.getenv("PHYSICIAN_CACHE_STALE", "21600"))
+PHYSICIAN_CACHE_MAX_ENTRIES = int(os.getenv("PHYSICIAN_CACHE_MAX_ENTRIES", "1024"))
+
+
+def _physician_search_key(
+    city: str | None = None,
+    state: str | None = None,
+    condition: str | None = None,
+    limit: int = 10,
+    precise: bool = False,
+) -> str:
+    return canonical_key(
+        "physicians",
+        city=city,
+        state=normalize_state(state) if state else None,
+        condition=condition,
+        limit=limit,
+        precise=precise or None,
+    )
+
+
+@cache_response(
+    expire=PHYSICIAN_CACHE_TTL,
+    maxsize=PHYSICIAN_CACHE_MAX_ENTRIES,
+    stale=PHYSICIAN_CACHE_STALE,
+    key=_physician_search_key,
+    cache_if=bool,
+    name="physicians",
+    redis_tier=True,
+)
 async def fetch_physicians_near(
     city: str | None = None,
     state: str | None = None,
     condition: str | None = None,
     limit: int = 10,
+    precise: bool = False,
 ) -> list:
     """
     Condition-first, location-second physician search.
 
+    Coordinates are the practice ZIP's centroid (geoPrecision "zip") when it
+    is known, so no geocoding call is needed; pass precise=True for rooftop
+    geocodes of each address.
+
     1. Map condition -> relevant specialty taxonomy codes
     2. Query NPPES by taxonomy + city (most specific)
     3. Fall back to taxonomy + state if city yields nothing
@@ -769,83 +1017,27 @@ async def fetch_physicians_near(
 
     logger.info(f"Fetching physicians: condition={condition}, city={city}, state={state_code}, codes={taxonomy_codes}")
 
-    seen_npis: set = set()
-    results: list = []
-
-    async def collect_by_taxonomy(query_city, query_state, strict_city, codes, strict_state=None):
-        """Query NPPES by condition taxonomy codes + location."""
-        for code in codes:
-            if len(results) >= limit:
-                break
-            desc = CODE_TO_DESCRIPTION.get(code, "Internal Medicine")
-            raw = await _query_nppes(query_city, query_state, limit * 5, desc)
-            for item in raw:
-                npi = item.get("number")
-                if npi in seen_npis:
-                    continue
-                seen_npis.add(npi)
-                parsed = _parse_physician(item, expected_city=strict_city, expected_state=strict_state)
-                if parsed:
-                    results.append(parsed)
-                if len(results) >= limit:
-                    break
-
-    async def collect_unfiltered(query_city, query_state, strict_city, strict_state=None):
-        """Fallback: query NPPES by location only, no taxonomy filter."""
-        raw = await _query_nppes(query_city, query_state, limit * 5)
-        for item in raw:
-            npi = item.get("number")
-            if npi in seen_npis:
-                continue
-            seen_npis.add(npi)
-            parsed = _parse_physician(item, expected_city=strict_city, expected_state=strict_state)
-            if parsed:
-                results.append(parsed)
-            if len(results) >= limit:
-                break
-
-    if taxonomy_codes:
-        # Step 1: condition taxonomy + city + state (most specific, no city ambiguity)
-        if city:
-            await collect_by_taxonomy(city, state_code, strict_city=city, codes=taxonomy_codes, strict_state=state_code)
-
-        # Step 2: condition taxonomy + state only
-        if not results and state_code:
-            logger.info(f"No city results for condition, trying state={state_code}")
-            await collect_by_taxonomy(None, state_code, strict_city=None, codes=taxonomy_codes, strict_state=state_code)
-
-        # Step 3: condition taxonomy nationally
-        if not results:
-            logger.info("No state results for condition, trying national")
-            await collect_by_taxonomy(None, None, strict_city=None, codes=taxonomy_codes)
-
-    # Step 4: unfiltered fallback
-    if not results:
-        logger.warning("No condition-matched physicians found, falling back to unfiltered location search")
-        if city:
-            await collect_unfiltered(city, state_code, strict_city=city, strict_state=state_code)
-        if not results and state_code:
-            await collect_unfiltered(None, state_code, strict_city=None, strict_state=state_code)
+    results = None
+    if PHYSICIAN_SOURCE == "local":
+        try:
+            results = await asyncio.to_thread(_collect_local, city, state_code, taxonomy_codes, limit)
+        except (duckdb.Error, OSError) as e:
+            logger.error(f"NPPES store unavailable, falling back to live API: {e}")
+    if results is None:
+        results = await _collect_live(city, state_code, taxonomy_codes, limit)
 
     logger.info(f"Found {len(results)} physicians before geocoding")
     if not results:
         return []
 
-    async def geocode_physician(p: dict) -> dict:
-        try:
-            geo = await geocode_address(p["full_address"])
-        except Exception as e:
-            logger.warning(f"Geocoding failed for '{p['full_address']}': {e}")
-            geo = {}
-        return {
-            **{k: v for k, v in p.items() if k != "full_address"},
-            "lat": geo.get("lat"),
-            "lon": geo.get("lon"),
-        }
-
-    geocoded = await asyncio.gather(*[geocode_physician(p) for p in results[:limit]])
+    physicians = results[:limit]
+    coords = await locate_addresses([(p["full_address"], p.get("postal_code")) for p in physicians], precise)
+    geocoded = [
+        {**{k: v for k, v in p.items() if k != "full_address"}, **geo}
+        for p, geo in zip(physicians, coords)
+    ]
     logger.info(f"Returning {len(geocoded)} physicians")
-    return list(geocoded)
+    return geocoded
 
 
 # Alias so physicians.py import works with either name
@@ -0,0 +1,87 @@
+"""
+backend/app/services/nppes_sync.py
+
+Load the CMS NPPES dissemination files into the offline store
+(app/db/nppes_store.py).
+
+The monthly file (npidata_pfile_*.csv) replaces the store; weekly files
+(NPPES_Data_Dissemination_*_Weekly) carry the same columns and only replace
+the NPIs they mention. Each weekly file is applied once — loading it again
+is a no-op until the next full file supersedes it. Loads run on a staging
+copy that is swapped in at the end.
+
+Usage (from backend/):
+    python -m app.services.nppes_sync npidata_pfile_20250101-20250131.csv
+    python -m app.services.nppes_sync --delta npidata_pfile_20250203-20250209.csv
+    python -m app.services.nppes_sync monthly.csv --parquet ./nppes_parquet
+"""
+import argparse
+import csv
+import logging
+import os
+from typing import Optional
+
+from app.db.nppes_store import (
+    open_nppes_staging,
+    publish_nppes_staging,
+    discard_nppes_staging,
+    load_nppes_csv,
+    is_loaded,
+    record_load,
+    export_nppes_parquet,
+)
+from app.services.nppes_api import NON_PHYSICIAN_TAXONOMY_CODES, PHYSICIAN_TAXONOMY_CODES
+
+logger = logging.getLogger(__name__)
+
+
+def _csv_columns(path: str) -> list[str]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+
+def sync_nppes(path: str, delta: bool = False, parquet_dir: Optional[str] = None) -> dict:
+    """
+    Apply one dissemination file. Returns the rows seen and physicians kept;
+    a weekly file that was already applied is skipped.
+    """
+    source = os.path.basename(path)
+    kind = "delta" if delta else "full"
+    conn = open_nppes_staging()
+    published = False
+    try:
+        if delta and is_loaded(conn, source):
+            logger.info(f"NPPES sync: {source} already applied — skipping")
+            return {"source": source, "kind": kind, "seen": 0, "kept": 0, "skipped": True}
+
+        logger.info(f"NPPES sync start: {source} ({kind})")
+        counts = load_nppes_csv(
+            conn,
+            path,
+            _csv_columns(path),
+            sorted(PHYSICIAN_TAXONOMY_CODES),
+            sorted(NON_PHYSICIAN_TAXONOMY_CODES),
+            full=not delta,
+        )
+        record_load(conn, source, kind, counts["kept"])
+        conn.commit()
+        logger.info(f"NPPES sync: {counts['seen']} rows seen, {counts['kept']} physicians kept")
+
+        if parquet_dir:
+            export_nppes_parquet(conn, parquet_dir)
+        publish_nppes_staging(conn)
+        published = True
+        return {"source": source, "kind": kind, **counts, "skipped": False}
+    finally:
+        if not published:
+            discard_nppes_staging(conn)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Load an NPPES dissemination file into the offline store.")
+    parser.add_argument("path", help="npidata_pfile CSV from the monthly or weekly dissemination")
+    parser.add_argument("--delta", action="store_true", help="apply as a weekly update instead of replacing the store")
+    parser.add_argument("--parquet", default=None, help="also export the store as Parquet files into this directory")
+    args = parser.parse_args()
+    print(sync_nppes(args.path, delta=args.delta, parquet_dir=args.parquet))
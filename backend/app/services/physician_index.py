@@ -0,0 +1,218 @@
+"""
+backend/app/services/physician_index.py
+
+In-memory spatial index over geocoded physicians, so "the nearest N doctors
+to this trial site" is answered from memory instead of another NPPES query.
+
+Coordinates live in NumPy arrays (one slot per physician): k-nearest
+queries score every candidate in one vectorized haversine call and keep the
+k best with a partial sort (app/utils/distance.py). Radius queries go
+through geohash buckets (app/utils/geohash.py), so only the cells around
+the point are read.
+
+The index is filled lazily, on first use, from the offline NPPES store
+(app/db/nppes_store.py) with coordinates from the durable geocode cache,
+falling back to ZIP centroids. Physicians returned by live searches are
+inserted as they are geocoded; re-inserting an NPI overwrites its slot in
+place. The index holds at most PHYSICIAN_INDEX_MAX_SIZE physicians; past
+that, the least recently inserted one gives up its slot.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+
+import duckdb
+import numpy as np
+
+from app.db.geocode_cache import get_geocode_db, get_geocodes, close_geocode_connection, normalize_address
+from app.db.nppes_store import get_nppes_db, list_nppes_physicians, close_nppes_connection
+from app.services.nppes_api import _physician_from_store
+from app.services.zcta_geocoder import zip_centroid
+from app.utils.distance import haversine_from, top_k
+from app.utils.geohash import GeohashIndex
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Cap on store rows loaded at startup, and on physicians held at all (live
+# searches add beyond the store rows until the index is full)
+PHYSICIAN_INDEX_MAX_ROWS = int(os.getenv("PHYSICIAN_INDEX_MAX_ROWS", "500000"))
+PHYSICIAN_INDEX_MAX_SIZE = int(os.getenv("PHYSICIAN_INDEX_MAX_SIZE", "600000"))
+
+
+class PhysicianIndex:
+    def __init__(self, capacity: int = 1024, max_size: int | None = None):
+        self.max_size = max_size or PHYSICIAN_INDEX_MAX_SIZE
+        capacity = min(capacity, self.max_size)
+        self._lats = np.full(capacity, np.nan)
+        self._lons = np.full(capacity, np.nan)
+        self._physicians: list[dict] = []                 # by slot
+        self._slots: dict[str, int] = {}                  # npi -> slot, oldest insert first
+        self._by_code: dict[str, dict[int, None]] = {}    # taxonomy code -> slots
+        self._cells = GeohashIndex()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, npi: str) -> bool:
+        return npi in self._slots
+
+    # ── Inserts ───────────────────────────────────────────────────────────────
+
+    def _unlink(self, slot: int) -> None:
+        """Remove a slot's physician from the code and geohash lookups."""
+        old = self._physicians[slot]
+        code = old.get("taxonomyCode") or ""
+        self._by_code[code].pop(slot, None)
+        if not self._by_code[code]:
+            del self._by_code[code]
+        self._cells.remove(slot, float(self._lats[slot]), float(self._lons[slot]))
+
+    def _free_slot(self) -> int:
+        """A new slot, growing the arrays, or the oldest entry's once the index is full."""
+        if len(self._physicians) >= self.max_size:
+            npi, slot = next(iter(self._slots.items()))
+            del self._slots[npi]
+            self._unlink(slot)
+            return slot
+        slot = len(self._physicians)
+        if slot == len(self._lats):
+            grow = min(max(slot, 1), self.max_size - slot)
+            self._lats = np.concatenate([self._lats, np.full(grow, np.nan)])
+            self._lons = np.concatenate([self._lons, np.full(grow, np.nan)])
+        self._physicians.append({})
+        return slot
+
+    def insert(self, physician: dict) -> bool:
+        """Add or replace one physician; False if it has no NPI or no coordinates."""
+        lat, lon = physician.get("lat"), physician.get("lon")
+        npi = physician.get("npi")
+        if lat is None or lon is None or not npi:
+            return False
+        slot = self._slots.pop(npi, None)
+        if slot is not None:
+            self._unlink(slot)
+        else:
+            slot = self._free_slot()
+
+        self._slots[npi] = slot
+        self._lats[slot], self._lons[slot] = lat, lon
+        self._physicians[slot] = physician
+        self._by_code.setdefault(physician.get("taxonomyCode") or "", {})[slot] = None
+        self._cells.insert(slot, float(lat), float(lon))
+        return True
+
+    def insert_many(self, physicians: list) -> int:
+        return sum(self.insert(p) for p in physicians)
+
+    # ── Queries ───────────────────────────────────────────────────────────────
+
+    def _candidates(self, taxonomy_codes: list[str] | None) -> np.ndarray:
+        if not taxonomy_codes:
+            return np.arange(len(self._physicians))
+        slots = [s for code in dict.fromkeys(taxonomy_codes) for s in self._by_code.get(code, {})]
+        return np.asarray(slots, dtype=np.intp)
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 10,
+        max_km: float | None = None,
+        taxonomy_codes: list[str] | None = None,
+    ) -> list[dict]:
+        """Up to k physicians nearest (lat, lon), each with "distance_km"."""
+        candidates = self._candidates(taxonomy_codes)
+        if not len(candidates):
+            return []
+        distances = haversine_from(lat, lon, self._lats[candidates], self._lons[candidates])
+        distances[np.isnan(distances)] = np.inf
+        indices, nearest = top_k(distances, k)
+        limit = np.inf if max_km is None else max_km
+        return [
+            {**self._physicians[candidates[i]], "distance_km": round(float(d), 2)}
+            for i, d in zip(indices[0], nearest[0])
+            if np.isfinite(d) and d <= limit
+        ]
+
+    def within(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        taxonomy_codes: list[str] | None = None,
+    ) -> list[dict]:
+        """Every physician inside the radius, nearest first, each with "distance_km"."""
+        codes = set(taxonomy_codes or ())
+        found = []
+        for slot, dist in self._cells.within(lat, lon, radius_km):
+            physician = self._physicians[slot]
+            if codes and physician.get("taxonomyCode") not in codes:
+                continue
+            found.append({**physician, "distance_km": round(dist, 2)})
+        return found
+
+
+# ── Loading from the stores ───────────────────────────────────────────────────
+
+def _store_physicians(limit: int) -> list[dict]:
+    """Stored physicians with coordinates: cached rooftop geocodes, else ZIP centroids."""
+    try:
+        conn = get_nppes_db(read_only=True)
+    except (duckdb.Error, OSError) as e:
+        logger.info(f"Physician index: NPPES store unavailable ({e}); starting empty")
+        return []
+    try:
+        physicians = [_physician_from_store(row) for row in list_nppes_physicians(conn, limit)]
+    finally:
+        close_nppes_connection(conn)
+
+    geocoded = {}
+    try:
+        geo_conn = get_geocode_db()
+        try:
+            geocoded = get_geocodes(geo_conn, [normalize_address(p["full_address"]) for p in physicians])
+        finally:
+            close_geocode_connection(geo_conn)
+    except sqlite3.Error as e:
+        logger.error(f"Physician index: geocode cache unavailable: {e}")
+
+    located = []
+    for physician in physicians:
+        geo = geocoded.get(normalize_address(physician["full_address"]))
+        if geo and geo["lat"] is not None:
+            located.append({**physician, **geo, "geoPrecision": "rooftop"})
+            continue
+        centroid = zip_centroid(physician["postal_code"])
+        if centroid is not None:
+            located.append({**physician, **centroid, "geoPrecision": "zip"})
+    return located
+
+
+_index = PhysicianIndex()
+_loaded = False
+_load_flight = SingleFlight("physician-index")
+
+
+async def _load() -> None:
+    global _loaded
+    if _loaded:
+        return
+    physicians = await asyncio.to_thread(_store_physicians, min(PHYSICIAN_INDEX_MAX_ROWS, _index.max_size))
+    # Anything a live search inserted meanwhile is fresher than the store
+    added = _index.insert_many([p for p in physicians if p["npi"] not in _index])
+    _loaded = True
+    logger.info(f"Physician index: loaded {added} of {len(physicians)} stored physicians")
+
+
+async def get_physician_index() -> PhysicianIndex:
+    """The process-wide index, filled from the stores on first use."""
+    if not _loaded:
+        await _load_flight.do("load", _load)
+    return _index
+
+
+def add_physicians(physicians: list) -> int:
+    """Insert freshly geocoded physicians; returns how many had coordinates."""
+    return _index.insert_many(physicians)
@@ -0,0 +1,182 @@
+"""
+backend/app/services/trial_facets.py
+
+Facet counts (status, phase, state, sponsor) for a condition search,
+computed in one streaming pass over the result set instead of one search
+round-trip per facet value.
+
+Sources, in order of preference ("auto"):
+  mirror  — the local ClinicalTrials.gov mirror, when TRIAL_SOURCE=mirror
+  saved   — trials saved to DuckDB that match the condition, only when
+            they are the whole set (as many as upstream's total for it);
+            requested explicitly, a partial set reports complete=false
+  live    — a bounded scan of upstream pages (TRIAL_FACET_MAX_PAGES);
+            `complete` is false if the scan stopped before the end
+Results are cached per canonical condition key.
+"""
+import asyncio
+import logging
+import os
+from collections import Counter
+
+import duckdb
+
+from app.db import duckdb_client
+from app.db.trial_mirror import get_mirror_db, iter_mirror_candidates, close_mirror_connection
+from app.services import clinicaltrials_api
+from app.services.clinicaltrials_api import (
+    _fetch_trials_plan,
+    _mirror_filter_args,
+    _run_async,
+    _trial_matches,
+)
+from app.utils.caching import cache_response, canonical_key
+
+logger = logging.getLogger(__name__)
+
+FACET_NAMES = ("status", "phase", "state", "sponsor")
+FACET_SOURCES = ("auto", "mirror", "saved", "live")
+
+TRIAL_FACET_TOP_N         = int(os.getenv("TRIAL_FACET_TOP_N", "25"))
+TRIAL_FACET_PAGE_SIZE     = 1000
+TRIAL_FACET_MAX_PAGES     = int(os.getenv("TRIAL_FACET_MAX_PAGES", "5"))
+TRIAL_FACET_CACHE_TTL     = float(os.getenv("TRIAL_FACET_CACHE_TTL", "900"))
+TRIAL_FACET_CACHE_STALE   = float(os.getenv("TRIAL_FACET_CACHE_STALE", "3600"))
+
+
+class FacetCounts:
+    """Accumulates every facet from each trial as it streams past."""
+
+    def __init__(self, us_only: bool = True):
+        self.us_only = us_only
+        self.counters = {name: Counter() for name in FACET_NAMES}
+        self.matched = 0
+        self.scanned = 0
+
+    def add(self, trial: dict) -> None:
+        self.matched += 1
+        self.counters["status"][trial.get("status") or "UNKNOWN"] += 1
+        for phase in set(trial.get("phases") or ["NA"]):
+            self.counters["phase"][phase] += 1
+        # A trial counts once per state it has a site in
+        states = {
+            loc.get("state") for loc in trial.get("locations", [])
+            if loc.get("state") and (not self.us_only or loc.get("country") == "United States")
+        }
+        for state in states:
+            self.counters["state"][state] += 1
+        if trial.get("sponsor"):
+            self.counters["sponsor"][trial["sponsor"]] += 1
+
+    def consume(self, trials, condition: str) -> None:
+        for trial in trials:
+            self.scanned += 1
+            if _trial_matches(trial, condition, "", ""):
+                self.add(trial)
+
+    def result(self, top_n: int = TRIAL_FACET_TOP_N) -> dict:
+        return {
+            name: [{"value": value, "count": count} for value, count in counter.most_common(top_n)]
+            for name, counter in self.counters.items()
+        }
+
+
+# ── Sources ───────────────────────────────────────────────────────────────────
+
+def _facets_from_mirror(condition: str, us_only: bool) -> FacetCounts:
+    condition_terms, _, _ = _mirror_filter_args({"condition": condition})
+    counts = FacetCounts(us_only)
+    conn = get_mirror_db(read_only=True)
+    try:
+        counts.consume(iter_mirror_candidates(conn, condition_terms, us_only=us_only), condition)
+    finally:
+        close_mirror_connection(conn)
+    return counts
+
+
+def _facets_from_saved(condition: str, us_only: bool) -> FacetCounts | None:
+    """None when nothing matching the condition has been saved."""
+    if not os.path.exists(duckdb_client.DB_PATH):
+        return None
+    conn = duckdb_client.get_duckdb()
+    try:
+        counts = FacetCounts(us_only)
+        counts.consume(duckdb_client.iter_trials_by_condition(conn, condition), condition)
+    finally:
+        duckdb_client.close_connection(conn)
+    return counts if counts.matched else None
+
+
+def _upstream_total_plan(condition: str, us_only: bool):
+    """Upstream's totalCount for the condition — one single-record request."""
+    _, api_total = yield from _fetch_trials_plan(condition, "", "", "", "", 1, 0, us_only, "cursor")
+    return api_total
+
+
+def _live_facet_plan(condition: str, us_only: bool):
+    counts = FacetCounts(us_only)
+    cursor = 0
+    api_total = 0
+    for _ in range(TRIAL_FACET_MAX_PAGES):
+        page, api_total = yield from _fetch_trials_plan(
+            condition, "", "", "", "", TRIAL_FACET_PAGE_SIZE, cursor, us_only, "list",
+        )
+        counts.consume(page, condition)
+        cursor += len(page)
+        if len(page) < TRIAL_FACET_PAGE_SIZE or cursor >= api_total:
+            break
+    return counts, cursor >= api_total
+
+
+def _facet_key(condition: str, us_only: bool = True, source: str = "auto") -> str:
+    return canonical_key("facets", condition=condition, us_only=us_only, source=source)
+
+
+@cache_response(
+    expire=TRIAL_FACET_CACHE_TTL,
+    stale=TRIAL_FACET_CACHE_STALE,
+    key=_facet_key,
+    cache_if=lambda result: result["scanned"] > 0,
+    name="trial-facets",
+    redis_tier=True,
+)
+async def fetch_trial_facets(condition: str, us_only: bool = True, source: str = "auto") -> dict:
+    counts = None
+    used = source
+    complete = True
+
+    if source == "mirror" or (source == "auto" and clinicaltrials_api.TRIAL_SOURCE == "mirror"):
+        try:
+            counts = await asyncio.to_thread(_facets_from_mirror, condition, us_only)
+            used = "mirror"
+        except (duckdb.Error, OSError) as e:
+            logger.error(f"Trial mirror unavailable for facets: {e}")
+
+    if counts is None and source in ("auto", "saved"):
+        try:
+            saved = await asyncio.to_thread(_facets_from_saved, condition, us_only)
+        except duckdb.Error as e:
+            logger.error(f"Saved trials unavailable for facets: {e}")
+            saved = None
+        if saved is not None:
+            # A few saved trials are not the facet counts of the whole search
+            api_total = await _run_async(_upstream_total_plan(condition, us_only))
+            complete = api_total > 0 and saved.matched >= api_total
+            if complete or source == "saved":
+                counts, used = saved, "saved"
+            else:
+                logger.info(f"Saved trials cover {saved.matched} of {api_total} for {condition!r}; scanning live")
+
+    if counts is None:
+        counts, complete = await _run_async(_live_facet_plan(condition, us_only))
+        used = "live"
+
+    logger.info(f"fetch_trial_facets: {counts.matched} of {counts.scanned} trials (source={used}) condition={condition!r}")
+    return {
+        "condition": condition,
+        "source": used,
+        "matched": counts.matched,
+        "scanned": counts.scanned,
+        "complete": complete,
+        "facets": counts.result(),
+    }
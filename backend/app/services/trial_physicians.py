@@ -0,0 +1,120 @@
+"""
+backend/app/services/trial_physicians.py
+
+Physicians for one trial, in one call: the trial's US sites are grouped by
+city, each city is searched concurrently (fetch_physicians_near — cached,
+local store or live NPPES), results are deduped by NPI and ranked by
+distance to the trial's nearest site.
+
+This replaces the per-site /api/physicians round-trips the trial card used
+to make from the browser. A trial with no usable US site falls back to a
+national search for its condition, as the card did.
+"""
+import asyncio
+import logging
+import os
+
+from app.services.clinicaltrials_api import fetch_trial_detail_async
+from app.services.nppes_api import fetch_physicians_near
+from app.services.physician_index import add_physicians
+from app.utils.distance import coordinate_arrays, haversine_matrix, top_k
+
+logger = logging.getLogger(__name__)
+
+# Site cities searched per trial, and how many run at once; large trials
+# list hundreds of sites, most sharing a handful of cities
+TRIAL_PHYSICIAN_MAX_SITES   = int(os.getenv("TRIAL_PHYSICIAN_MAX_SITES", "10"))
+TRIAL_PHYSICIAN_CONCURRENCY = int(os.getenv("TRIAL_PHYSICIAN_CONCURRENCY", "4"))
+PHYSICIANS_PER_SITE         = 10
+
+
+def _site_cities(locations: list) -> list[tuple[str, str]]:
+    """Unique (city, state) of the trial's US sites, in listing order."""
+    seen = {}
+    for loc in locations:
+        if loc.get("country") != "United States" or not loc.get("city") or not loc.get("state"):
+            continue
+        seen.setdefault((loc["city"].casefold(), loc["state"].casefold()), (loc["city"], loc["state"]))
+    return list(seen.values())[:TRIAL_PHYSICIAN_MAX_SITES]
+
+
+def rank_by_nearest_site(sites: list, physicians: list, limit: int, max_km: float | None = None) -> list:
+    """
+    Physicians ordered by distance to their closest site, each with
+    "distance_km" and "nearestSite". Physicians without coordinates follow
+    the ranked ones (or are all there is, when no site has coordinates).
+    """
+    site_lats, site_lons, site_positions = coordinate_arrays(sites)
+    lats, lons, positions = coordinate_arrays(physicians)
+    placed = set(positions.tolist())
+    unplaced = [p for i, p in enumerate(physicians) if i not in placed]
+    if not len(site_positions) or not len(positions):
+        return physicians[:limit] if max_km is None else []
+
+    matrix = haversine_matrix(site_lats, site_lons, lats, lons)
+    closest_site = matrix.argmin(axis=0)
+    indices, distances = top_k(matrix.min(axis=0), limit)
+
+    ranked = []
+    for j, dist in zip(indices[0], distances[0]):
+        if max_km is not None and dist > max_km:
+            break
+        site = sites[site_positions[closest_site[j]]]
+        ranked.append({
+            **physicians[positions[j]],
+            "distance_km": round(float(dist), 2),
+            "nearestSite": {key: site.get(key) for key in ("facility", "city", "state")},
+        })
+    if max_km is None:
+        ranked.extend(unplaced[:limit - len(ranked)])
+    return ranked
+
+
+async def fetch_trial_physicians(
+    nct_id: str,
+    limit: int = 20,
+    max_km: float | None = None,
+    precise: bool = False,
+) -> dict | None:
+    """Ranked physicians near a trial's sites, or None when the trial does not exist."""
+    trial = await fetch_trial_detail_async(nct_id)
+    if not trial:
+        return None
+    condition = (trial.get("conditions") or [None])[0]
+    locations = trial.get("locations") or []
+    cities = _site_cities(locations)
+
+    semaphore = asyncio.Semaphore(TRIAL_PHYSICIAN_CONCURRENCY)
+
+    async def search(city, state):
+        async with semaphore:
+            return await fetch_physicians_near(city, state, condition, PHYSICIANS_PER_SITE, precise)
+
+    # No usable US site: one national search for the condition
+    targets = cities or [(None, None)]
+    batches = await asyncio.gather(*[search(city, state) for city, state in targets], return_exceptions=True)
+
+    by_npi = {}
+    for (city, state), batch in zip(targets, batches):
+        if isinstance(batch, BaseException):
+            logger.error(f"Physician search for {nct_id} near {city}, {state} failed: {batch}")
+            continue
+        for physician in batch:
+            by_npi.setdefault(physician["npi"], physician)
+    physicians = list(by_npi.values())
+    add_physicians(physicians)
+
+    sites = [loc for loc in locations if loc.get("country") == "United States"]
+    results = rank_by_nearest_site(sites, physicians, limit, max_km) if cities else physicians[:limit]
+    unplaced = sum(p.get("lat") is None for p in physicians)
+    if max_km is not None and unplaced:
+        # Usually a missing ZCTA gazetteer (app/services/zcta_geocoder.py) plus failed rooftop geocodes
+        logger.warning(f"{nct_id}: {unplaced} physicians without coordinates left out of the {max_km} km radius")
+    logger.info(f"{nct_id}: {len(results)} physicians from {len(cities)} site cities ({len(physicians)} unique)")
+    return {
+        "nctId": trial.get("nctId") or nct_id,
+        "condition": condition,
+        "siteCities": [{"city": city, "state": state} for city, state in cities],
+        "count": len(results),
+        "results": results,
+    }
@@ -0,0 +1,163 @@
+"""
+backend/app/services/trial_sync.py
+
+Bulk-load and incrementally re-sync the local ClinicalTrials.gov mirror
+(app/db/trial_mirror.py).
+
+The first run for a scope pages through every matching study at the API
+maximum page size. Later runs send a LastUpdatePostDate range filter starting
+at the stored watermark, so only studies whose last-update date moved are
+downloaded, and the upsert only rewrites rows that are actually newer.
+
+Each run writes to a staging copy of the mirror and swaps it in at the end,
+so the API server can keep reading the served file throughout. Recorded
+dumps are tracked under their own "dump:<file>" scope: a dump's dates say
+nothing about what the API scope has seen, so they never move its watermark.
+
+Usage (from backend/):
+    python -m app.services.trial_sync                      # everything, incremental
+    python -m app.services.trial_sync --condition asthma   # one condition scope
+    python -m app.services.trial_sync --full               # ignore the watermark
+    python -m app.services.trial_sync --dump studies.json  # load a recorded dump
+"""
+import argparse
+import json
+import logging
+import os
+from typing import Iterator, Optional
+
+import requests
+
+from app.db.trial_mirror import (
+    open_mirror_staging,
+    publish_mirror_staging,
+    discard_mirror_staging,
+    upsert_mirror_trials,
+    get_sync_watermark,
+    set_sync_watermark,
+)
+from app.services.clinicaltrials_api import (
+    CLINICAL_TRIALS_BASE_URL,
+    HEADERS,
+    parse_study,
+    _expand_condition,
+    _fields_param,
+)
+
+logger = logging.getLogger(__name__)
+
+SYNC_PAGE_SIZE = 1000
+SYNC_MAX_PAGES = 10_000
+
+
+def _study_last_update(study: dict) -> Optional[str]:
+    status = study.get("protocolSection", {}).get("statusModule", {})
+    return status.get("lastUpdatePostDateStruct", {}).get("date")
+
+
+def _sync_scope(condition: str, dump_path: Optional[str] = None) -> str:
+    if dump_path:
+        return f"dump:{os.path.basename(dump_path)}"
+    return condition.lower().strip() or "*"
+
+
+def iter_api_pages(condition: str = "", since: Optional[str] = None) -> Iterator[list]:
+    """Yield pages of raw studies from the live API, optionally only those updated since `since`."""
+    params = {
+        "pageSize": SYNC_PAGE_SIZE,
+        "format": "json",
+        "fields": _fields_param("mirror"),
+    }
+    if condition:
+        params["query.cond"] = _expand_condition(condition)
+    if since:
+        # Inclusive lower bound — studies updated on the watermark day are
+        # re-fetched, but the upsert skips any whose date did not move.
+        params["filter.advanced"] = f"AREA[LastUpdatePostDate]RANGE[{since},MAX]"
+
+    with requests.Session() as session:
+        session.headers.update(HEADERS)
+        for _ in range(SYNC_MAX_PAGES):
+            r = session.get(CLINICAL_TRIALS_BASE_URL, params=params, timeout=60)
+            r.raise_for_status()
+            data = r.json()
+            yield data.get("studies", [])
+            token = data.get("nextPageToken")
+            if not token:
+                return
+            params["pageToken"] = token
+
+
+def iter_dump_pages(path: str) -> Iterator[list]:
+    """
+    Yield pages of raw studies from a recorded dump. Accepts a single API
+    response ({"studies": [...]}), a bare list of studies, a list of API
+    responses, or JSON Lines of either.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    try:
+        docs = [json.loads(text)]
+    except json.JSONDecodeError:
+        docs = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    for doc in docs:
+        if isinstance(doc, dict) and "studies" in doc:
+            yield doc["studies"]
+        elif isinstance(doc, dict):
+            yield [doc]
+        elif doc and all(isinstance(d, dict) and "studies" in d for d in doc):
+            for page in doc:
+                yield page["studies"]
+        else:
+            yield list(doc)
+
+
+def sync_mirror(
+    condition: str = "",
+    full: bool = False,
+    dump_path: Optional[str] = None,
+) -> dict:
+    """
+    Sync one scope of the mirror. Returns counts of studies seen and rows
+    written plus the new watermark.
+    """
+    scope = _sync_scope(condition, dump_path)
+    conn = open_mirror_staging()
+    published = False
+    try:
+        since = None if full or dump_path else get_sync_watermark(conn, scope)
+        pages = iter_dump_pages(dump_path) if dump_path else iter_api_pages(condition, since)
+        logger.info(f"Mirror sync start: scope={scope} since={since} source={dump_path or 'api'}")
+
+        seen = 0
+        written = 0
+        watermark = since
+        for studies in pages:
+            rows = [(parse_study(study), _study_last_update(study)) for study in studies]
+            written += upsert_mirror_trials(conn, rows)
+            seen += len(rows)
+            for _, last_update in rows:
+                if last_update and (watermark is None or last_update > watermark):
+                    watermark = last_update
+            conn.commit()
+            logger.info(f"Mirror sync: {seen} studies seen, {written} written")
+
+        set_sync_watermark(conn, scope, watermark, seen)
+        conn.commit()
+        publish_mirror_staging(conn)
+        published = True
+        return {"scope": scope, "seen": seen, "written": written, "watermark": watermark}
+    finally:
+        if not published:
+            discard_mirror_staging(conn)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Sync the local ClinicalTrials.gov mirror.")
+    parser.add_argument("--condition", default="", help="limit the sync to one condition query")
+    parser.add_argument("--full", action="store_true", help="ignore the watermark and reload the scope")
+    parser.add_argument("--dump", default=None, help="load studies from a recorded JSON dump instead of the API")
+    args = parser.parse_args()
+    print(sync_mirror(condition=args.condition, full=args.full, dump_path=args.dump))
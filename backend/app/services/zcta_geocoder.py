@@ -0,0 +1,139 @@
+"""
+backend/app/services/zcta_geocoder.py
+
+Offline ZIP-level geocoder built from the Census ZCTA gazetteer — the
+internal point of every ZIP Code Tabulation Area, ~33k rows. The Docker
+build fetches it; elsewhere download it once (from backend/):
+
+    python -m app.services.zcta_geocoder
+
+which writes ZCTA_GAZETTEER_PATH. Loaded into three parallel arrays (sorted
+ZIP codes as uint32, lat/lon as float32, ~400 KB in total) and searched with
+bisect — no network, no database. The app loads it at startup and logs an
+error when it is missing: every lookup is then a miss, callers fall back to
+rooftop geocoding, and radius filters drop whoever that cannot place.
+"""
+import argparse
+import bisect
+import io
+import logging
+import os
+import threading
+import zipfile
+from array import array
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+ZCTA_GAZETTEER_PATH = os.getenv("ZCTA_GAZETTEER_PATH", "data/2023_Gaz_zcta_national.txt")
+ZCTA_GAZETTEER_URL  = os.getenv(
+    "ZCTA_GAZETTEER_URL",
+    "https://www2.census.gov/geo/docs/maps-data/data/gazetteer/2023_Gazetteer/2023_Gaz_zcta_national.zip",
+)
+
+
+class ZctaIndex:
+    def __init__(self, rows):
+        """`rows` is an iterable of (zip, lat, lon); ZIPs are five-digit strings."""
+        rows = sorted((int(z), lat, lon) for z, lat, lon in rows)
+        self._zips = array("I", (r[0] for r in rows))
+        self._lats = array("f", (r[1] for r in rows))
+        self._lons = array("f", (r[2] for r in rows))
+
+    def __len__(self) -> int:
+        return len(self._zips)
+
+    @classmethod
+    def from_gazetteer(cls, path: str) -> "ZctaIndex":
+        """Parse the tab-separated gazetteer (GEOID ... INTPTLAT INTPTLONG)."""
+        with open(path, encoding="utf-8") as f:
+            header = [h.strip() for h in f.readline().split("\t")]
+            geoid, lat, lon = header.index("GEOID"), header.index("INTPTLAT"), header.index("INTPTLONG")
+
+            def rows():
+                for line in f:
+                    fields = line.split("\t")
+                    if len(fields) > max(geoid, lat, lon):
+                        yield fields[geoid].strip(), float(fields[lat]), float(fields[lon])
+
+            return cls(rows())
+
+    def lookup(self, postal_code: str | None) -> tuple[float, float] | None:
+        """(lat, lon) of the ZIP's centroid; ZIP+4 and stray formatting are accepted."""
+        digits = "".join(c for c in (postal_code or "")[:10] if c.isdigit())[:5]
+        if len(digits) != 5:
+            return None
+        code = int(digits)
+        i = bisect.bisect_left(self._zips, code)
+        if i == len(self._zips) or self._zips[i] != code:
+            return None
+        return float(self._lats[i]), float(self._lons[i])
+
+
+_index: ZctaIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_zcta_index() -> ZctaIndex:
+    """The process-wide index, loaded on first use; empty when the gazetteer is missing."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = ZctaIndex.from_gazetteer(ZCTA_GAZETTEER_PATH)
+                    logger.info(f"ZCTA gazetteer loaded: {len(_index)} ZIP centroids")
+                except (OSError, ValueError) as e:
+                    logger.error(
+                        f"ZCTA gazetteer unavailable ({e}) — ZIP-level geocoding disabled; "
+                        f"fetch it with: python -m app.services.zcta_geocoder"
+                    )
+                    _index = ZctaIndex([])
+    return _index
+
+
+def download_gazetteer(path: str | None = None, client: httpx.Client | None = None) -> int:
+    """
+    Fetch the gazetteer zip from ZCTA_GAZETTEER_URL and unpack its .txt to
+    `path` (ZCTA_GAZETTEER_PATH by default). The file is parsed before it
+    replaces an existing one; returns the number of ZIP centroids.
+    """
+    path = path or ZCTA_GAZETTEER_PATH
+    own_client = client is None
+    client = client or httpx.Client(timeout=120, follow_redirects=True)
+    try:
+        r = client.get(ZCTA_GAZETTEER_URL)
+        r.raise_for_status()
+    finally:
+        if own_client:
+            client.close()
+
+    with zipfile.ZipFile(io.BytesIO(r.content)) as archive:
+        name = next(n for n in archive.namelist() if n.endswith(".txt"))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        staging = path + ".tmp"
+        with archive.open(name) as src, open(staging, "wb") as dst:
+            dst.write(src.read())
+    try:
+        count = len(ZctaIndex.from_gazetteer(staging))
+    except (OSError, ValueError):
+        os.remove(staging)
+        raise
+    os.replace(staging, path)
+    logger.info(f"ZCTA gazetteer saved to {path}: {count} ZIP centroids")
+    return count
+
+
+def zip_centroid(postal_code: str | None) -> dict | None:
+    """{"lat", "lon"} for the ZIP, or None when it is unknown."""
+    found = get_zcta_index().lookup(postal_code)
+    return {"lat": found[0], "lon": found[1]} if found else None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Download the Census ZCTA gazetteer used for ZIP-level geocoding.")
+    parser.add_argument("--path", default=None, help=f"where to write it (default {ZCTA_GAZETTEER_PATH})")
+    args = parser.parse_args()
+    print(download_gazetteer(args.path))
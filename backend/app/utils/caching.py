@@ -1,29 +1,273 @@
-import functools
+"""
+backend/app/utils/caching.py
+
+In-process response cache: a bounded LRU with per-entry TTL and an optional
+stale-while-revalidate window.
+
+Expiry is lazy — an entry is checked when it is read and dropped then, so
+there is no per-key timer task. Inside the stale window a read still returns
+the old value immediately and one background refresh replaces it. Keys are
+built by the caller from canonicalized inputs (see canonical_key) so that
+"Austin, TX" and "austin, Texas" share an entry.
+"""
 import asyncio
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from app.db import redis_client
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+HIT = "hit"
+STALE = "stale"
+MISS = "miss"
+
+# Every named cache, so their counters can be reported together
+_caches: dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1024,
+        ttl: float = 300,
+        stale_ttl: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[Any, float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+        # Concurrent async misses for one key run the loader once
+        self.flight = SingleFlight(name)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        _caches[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: str) -> tuple[Any, str]:
+        """(value, HIT | STALE | MISS). A MISS value is always None."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, MISS
+            value, fresh_until, stale_until = entry
+            if now >= stale_until:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None, MISS
+            self._entries.move_to_end(key)
+            if now >= fresh_until:
+                self.stale_hits += 1
+                return value, STALE
+            self.hits += 1
+            return value, HIT
+
+    def peek(self, key: str) -> str:
+        """HIT | STALE | MISS for `key`, without touching recency or counters."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or now >= entry[2]:
+            return MISS
+        return STALE if now >= entry[1] else HIT
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value, status = self.lookup(key)
+        return default if status == MISS else value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        now = self._clock()
+        fresh_until = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, fresh_until, fresh_until + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._refreshing.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    # ── Stale-while-revalidate ────────────────────────────────────────────────
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _store_refresh(self, key: str, value: Any, cache_if: Callable[[Any], bool] | None) -> None:
+        if cache_if is None or cache_if(value):
+            self.set(key, value)
+        with self._lock:
+            self._refreshing.discard(key)
 
-def cache_response(expire=300):
+    def refresh_async(self, key: str, load: Callable[[], Any], cache_if=None) -> None:
+        """Re-run the coroutine factory `load` in the background, once per key."""
+        if not self._claim_refresh(key):
+            return
+
+        async def run():
+            try:
+                self._store_refresh(key, await load(), cache_if)
+            except Exception as e:
+                logger.warning(f"Cache refresh failed ({self.name}, {key}): {e}")
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def refresh_sync(self, key: str, load: Callable[[], Any], cache_if=None) -> None:
+        """Re-run the blocking `load` on a daemon thread, once per key."""
+        if not self._claim_refresh(key):
+            return
+
+        def run():
+            try:
+                self._store_refresh(key, load(), cache_if)
+            except Exception as e:
+                logger.warning(f"Cache refresh failed ({self.name}, {key}): {e}")
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+def _canonical(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (list, tuple)):
+        return ",".join(_canonical(v) for v in value)
+    return str(value)
+
+
+def canonical_key(namespace: str, **parts: Any) -> str:
+    """
+    Stable cache key: names sorted, strings case-folded and whitespace
+    collapsed, empty values dropped. Callers normalize domain values (e.g.
+    expand state abbreviations) before passing them in.
     """
-    Simple async decorator cache (can extend to Redis)
+    fields = [f"{name}={_canonical(value)}" for name, value in sorted(parts.items())]
+    return namespace + "|" + "&".join(f for f in fields if not f.endswith("="))
+
+
+def cache_response(
+    expire: float = 300,
+    maxsize: int = 1024,
+    stale: float = 0,
+    key: Callable[..., str] | None = None,
+    cache_if: Callable[[Any], bool] | None = None,
+    name: str | None = None,
+    cache: TTLCache | None = None,
+    redis_tier: bool = False,
+):
+    """
+    Cache a function's results in a TTLCache (exposed as `wrapper.cache`).
+
+    `key(*args, **kwargs)` builds the cache key — pass one built on
+    canonical_key; the default only suits plain positional arguments.
+    `cache_if(result)` can veto storing a result (e.g. an empty page from a
+    failed upstream call). Pass `cache` to share one TTLCache between
+    functions (e.g. sync and async variants); expire/maxsize/stale then come
+    from it. Works on both async and plain functions; cached values are
+    shared, so callers must treat them as read-only.
+
+    With `redis_tier`, async misses go through the shared Redis tier
+    (app/db/redis_client.py) before the function runs, and only one worker
+    fills a missing key. Values must then be JSON-serializable; tuples come
+    back as lists.
     """
+    shared = cache
+
     def decorator(func):
-        cache = {}
-
-        @functools.wraps(func)
-        async def wrapper(*args, **kwargs):
-            key = str(args) + str(kwargs)
-            if key in cache:
-                return cache[key]
-            result = await func(*args, **kwargs)
-            cache[key] = result
-            # Expire cache
-            asyncio.create_task(expire_cache(cache, key, expire))
-            return result
+        cache = shared if shared is not None else TTLCache(
+            name or f"{func.__module__}.{func.__qualname__}", maxsize, expire, stale,
+        )
+        make_key = key or (lambda *args, **kwargs: canonical_key(func.__qualname__, args=args, **kwargs))
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                k = make_key(*args, **kwargs)
+
+                def load():
+                    if redis_tier:
+                        return redis_client.fill_once(k, cache.ttl, lambda: func(*args, **kwargs), cache_if)
+                    return func(*args, **kwargs)
 
+                value, status = cache.lookup(k)
+                if status == STALE:
+                    cache.refresh_async(k, load, cache_if)
+                if status != MISS:
+                    return value
+                value = await cache.flight.do(k, load)
+                if cache_if is None or cache_if(value):
+                    cache.set(k, value)
+                return value
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                k = make_key(*args, **kwargs)
+                value, status = cache.lookup(k)
+                if status == STALE:
+                    cache.refresh_sync(k, lambda: func(*args, **kwargs), cache_if)
+                if status != MISS:
+                    return value
+                value = func(*args, **kwargs)
+                if cache_if is None or cache_if(value):
+                    cache.set(k, value)
+                return value
+
+        wrapper.cache = cache
         return wrapper
 
-    async def expire_cache(cache, key, ttl):
-        await asyncio.sleep(ttl)
-        if key in cache:
-            del cache[key]
+    return decorator
+
 
-    return decorator
\ No newline at end of file
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _caches.items()}
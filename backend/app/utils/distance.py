@@ -1,6 +1,97 @@
-# In trials.py, replace the import and filter function:
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km between two lat/lon points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# ── Vectorized kernels ────────────────────────────────────────────────────────
+# The same formula over whole arrays: one call scores every trial site
+# against every physician instead of one Python call per pair.
+
+def coordinate_arrays(items: list) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(lats, lons, positions) for the dicts in `items` that have coordinates."""
+    positions = [i for i, item in enumerate(items) if item.get("lat") is not None and item.get("lon") is not None]
+    lats = np.fromiter((items[i]["lat"] for i in positions), dtype=np.float64, count=len(positions))
+    lons = np.fromiter((items[i]["lon"] for i in positions), dtype=np.float64, count=len(positions))
+    return lats, lons, np.asarray(positions, dtype=np.intp)
+
+
+def haversine_from(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distance in km from one origin to each point — the single-site fast path."""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_matrix(
+    origin_lats: np.ndarray,
+    origin_lons: np.ndarray,
+    lats: np.ndarray,
+    lons: np.ndarray,
+) -> np.ndarray:
+    """(origins x points) matrix of distances in km."""
+    phi1 = np.radians(origin_lats)[:, None]
+    phi2 = np.radians(lats)[None, :]
+    dlmb = np.radians(lons[None, :] - np.asarray(origin_lons)[:, None])
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def top_k(distances: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (indices, distances) of the k smallest entries in each row, nearest
+    first. A partial sort finds the k, so only those k are fully sorted.
+    """
+    distances = np.atleast_2d(distances)
+    k = min(k, distances.shape[1])
+    if k <= 0:
+        empty = np.empty((distances.shape[0], 0))
+        return empty.astype(np.intp), empty
+    if k < distances.shape[1]:
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(k), distances.shape).copy()
+    picked = np.take_along_axis(distances, candidates, axis=1)
+    order = np.argsort(picked, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(picked, order, axis=1)
+
+
+def nearest_physicians_per_site(sites: list, physicians: list, k: int = 10, max_km: float | None = None) -> list[list]:
+    """
+    For each site dict, up to k physician dicts (with "distance_km") nearest
+    first, optionally within max_km. Sites or physicians without
+    coordinates are skipped.
+    """
+    site_lats, site_lons, site_positions = coordinate_arrays(sites)
+    lats, lons, positions = coordinate_arrays(physicians)
+    ranked = [[] for _ in sites]
+    if not len(site_positions) or not len(positions):
+        return ranked
+
+    if len(site_positions) == 1:
+        matrix = haversine_from(site_lats[0], site_lons[0], lats, lons)[None, :]
+    else:
+        matrix = haversine_matrix(site_lats, site_lons, lats, lons)
+    indices, distances = top_k(matrix, k)
+    for row, site_index in enumerate(site_positions):
+        ranked[site_index] = [
+            {**physicians[positions[j]], "distance_km": round(float(d), 2)}
+            for j, d in zip(indices[row], distances[row])
+            if max_km is None or d <= max_km
+        ]
+    return ranked
 
-from app.utils.distance import haversine_distance
 
 def filter_physicians_by_distance(trial_coords: dict, physicians: list, max_km: float = 50):
     trial_lat = trial_coords.get("lat")
@@ -9,11 +100,10 @@ def filter_physicians_by_distance(trial_coords: dict, physicians: list, max_km:
     if trial_lat is None or trial_lon is None:
         return []
 
-    filtered = []
-    for doc in physicians:
-        if doc.get("lat") is not None and doc.get("lon") is not None:
-            dist = haversine_distance(trial_lat, trial_lon, doc["lat"], doc["lon"])
-            if dist <= max_km:
-                filtered.append({**doc, "distance_km": round(dist, 2)})
-
-    return filtered
\ No newline at end of file
+    lats, lons, positions = coordinate_arrays(physicians)
+    distances = haversine_from(trial_lat, trial_lon, lats, lons)
+    return [
+        {**physicians[i], "distance_km": round(float(dist), 2)}
+        for i, dist in zip(positions, distances)
+        if dist <= max_km
+    ]
@@ -0,0 +1,164 @@
+"""
+backend/app/utils/geohash.py
+
+Geohash cells and a small in-memory spatial index built on them.
+
+A geohash interleaves longitude and latitude bits into a base32 string, so
+points that share a prefix share a cell and a radius query becomes "scan the
+handful of cells that cover the bounding box, then check exact distance".
+The same cell strings are stored next to mirrored trial sites so DuckDB can
+run the identical lookup with prefix matches.
+"""
+import bisect
+import math
+
+from app.utils.distance import EARTH_RADIUS_KM, haversine_distance
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Stored/indexed precision: 6 chars is a ~1.2 x 0.6 km cell
+GEOHASH_PRECISION = 6
+# Upper bound on cells a radius query may scan before coarsening the prefix
+GEOHASH_MAX_COVER_CELLS = 32
+
+_KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            value = value * 2 + (lon >= mid)
+            lon_lo, lon_hi = (mid, lon_hi) if lon >= mid else (lon_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            value = value * 2 + (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> tuple[float, float]:
+    """(lat_degrees, lon_degrees) spanned by one cell at `precision`."""
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def _bounding_box(lat: float, lon: float, radius_km: float) -> tuple[float, float, float, float]:
+    dlat = radius_km / _KM_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(min(89.0, abs(lat) + dlat))), 1e-6)
+    dlon = min(180.0, dlat / cos_lat)
+    return max(-90.0, lat - dlat), min(90.0, lat + dlat), lon - dlon, lon + dlon
+
+
+def _cells_at(box: tuple[float, float, float, float], precision: int) -> set[str]:
+    lat_min, lat_max, lon_min, lon_max = box
+    h, w = cell_size(precision)
+    cells = set()
+    lat = math.floor(lat_min / h) * h + h / 2
+    while lat - h / 2 <= lat_max:
+        lon = math.floor(lon_min / w) * w + w / 2
+        while lon - w / 2 <= lon_max:
+            wrapped = (lon + 180.0) % 360.0 - 180.0
+            cells.add(encode(min(lat, 89.999999), wrapped, precision))
+            lon += w
+        lat += h
+    return cells
+
+
+def cells_covering(
+    lat: float,
+    lon: float,
+    radius_km: float,
+    max_precision: int = GEOHASH_PRECISION,
+) -> set[str]:
+    """
+    Geohash prefixes whose cells together cover the circle's bounding box,
+    at the finest precision that needs no more than GEOHASH_MAX_COVER_CELLS.
+    """
+    box = _bounding_box(lat, lon, radius_km)
+    for precision in range(max_precision, 0, -1):
+        h, w = cell_size(precision)
+        estimate = ((box[1] - box[0]) / h + 2) * ((box[3] - box[2]) / w + 2)
+        if estimate <= GEOHASH_MAX_COVER_CELLS * 2:
+            cells = _cells_at(box, precision)
+            if len(cells) <= GEOHASH_MAX_COVER_CELLS:
+                return cells
+    return set(_BASE32)
+
+
+class GeohashIndex:
+    """
+    Points bucketed by geohash cell. Each point carries a key (e.g. an NCT
+    id); a key may have many points (a trial has many sites).
+    """
+
+    def __init__(self, precision: int = GEOHASH_PRECISION):
+        self.precision = precision
+        self._buckets: dict[str, list[tuple[object, float, float]]] = {}
+        self._cells: list[str] = []  # sorted, for prefix range scans
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, key, lat: float, lon: float) -> None:
+        cell = encode(lat, lon, self.precision)
+        bucket = self._buckets.get(cell)
+        if bucket is None:
+            bucket = self._buckets[cell] = []
+            bisect.insort(self._cells, cell)
+        bucket.append((key, lat, lon))
+        self._size += 1
+
+    def remove(self, key, lat: float, lon: float) -> bool:
+        """Drop one point inserted as (key, lat, lon); False if it is not there."""
+        cell = encode(lat, lon, self.precision)
+        bucket = self._buckets.get(cell)
+        if not bucket or (key, lat, lon) not in bucket:
+            return False
+        bucket.remove((key, lat, lon))
+        if not bucket:
+            del self._buckets[cell]
+            self._cells.pop(bisect.bisect_left(self._cells, cell))
+        self._size -= 1
+        return True
+
+    def _points_under(self, prefix: str):
+        i = bisect.bisect_left(self._cells, prefix)
+        while i < len(self._cells) and self._cells[i].startswith(prefix):
+            yield from self._buckets[self._cells[i]]
+            i += 1
+
+    def within(self, lat: float, lon: float, radius_km: float) -> list[tuple[object, float]]:
+        """Every (key, distance_km) point inside the radius, nearest first."""
+        hits = []
+        for prefix in cells_covering(lat, lon, radius_km, self.precision):
+            for key, plat, plon in self._points_under(prefix):
+                dist = haversine_distance(lat, lon, plat, plon)
+                if dist <= radius_km:
+                    hits.append((key, dist))
+        hits.sort(key=lambda hit: hit[1])
+        return hits
+
+    def nearest_per_key(self, lat: float, lon: float, radius_km: float) -> list[tuple[object, float]]:
+        """One (key, distance_km) per key — its closest point — nearest first."""
+        seen = set()
+        ranked = []
+        for key, dist in self.within(lat, lon, radius_km):
+            if key not in seen:
+                seen.add(key)
+                ranked.append((key, dist))
+        return ranked
@@ -0,0 +1,75 @@
+"""
+backend/app/utils/hedging.py
+
+Speculative execution of a fallback ladder: tiers ordered from most to least
+specific, where a tier is only wanted if every tier above it came back
+empty. Run in order, an empty-handed search waits through every round-trip
+in turn; hedged, the next tier starts after `delay` seconds (or at once when
+the tiers above it have already come back empty), so the worst case costs
+about one tier's latency plus the stagger.
+
+A tier that comes back with fewer than `min_results` results is sparse: it
+starts the next tier at once, as an empty one does, and only answers if no
+tier below it does better. The answer is the most specific tier with at
+least `min_results` results, else the most specific non-empty one — a
+coarse tier that finishes first is held until every tier above it has
+finished short — and the tiers still running when the answer is known are
+cancelled.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def _size(result: Any) -> int:
+    return len(result) if result else 0
+
+
+async def run_ladder(
+    tiers: Sequence[Callable[[], Awaitable[Any]]],
+    delay: float,
+    min_results: int = 1,
+) -> Any:
+    """
+    Result of the first tier with at least `min_results` results; failing
+    that, of the first non-empty tier; [] when all are empty.
+    """
+    tasks: list[asyncio.Task] = []
+
+    def start_next() -> None:
+        tasks.append(asyncio.create_task(tiers[len(tasks)]()))
+
+    def best_short() -> Any:
+        return next((t.result() for t in tasks if _size(t.result())), [])
+
+    try:
+        if tiers:
+            start_next()
+        while tasks:
+            # Settle as many tiers as possible from the top of the ladder
+            for task in tasks:
+                if not task.done():
+                    break
+                if _size(task.result()) >= min_results:
+                    return task.result()
+            else:
+                if len(tasks) == len(tiers):
+                    return best_short()
+                start_next()   # everything started so far is empty or sparse
+                continue
+
+            running = [t for t in tasks if not t.done()]
+            more = len(tasks) < len(tiers)
+            done, _ = await asyncio.wait(
+                running, timeout=delay if more else None, return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done and more:
+                logger.debug(f"hedging: tier {len(tasks)} still running after {delay}s, starting tier {len(tasks) + 1}")
+                start_next()
+        return []
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,87 @@
+"""
+backend/app/utils/http_clients.py
+
+One pooled httpx.AsyncClient per upstream host, shared by every service
+module in the process. Opened and closed by the FastAPI lifespan in
+main.py, so keep-alive TLS connections to clinicaltrials.gov, NPPES and
+the geocoders are reused across requests instead of handshaking per call.
+
+Each service registers its client at import time with its own defaults;
+<PREFIX>_HTTP_MAX_CONNECTIONS, _MAX_KEEPALIVE, _KEEPALIVE_EXPIRY, _TIMEOUT
+and <PREFIX>_HTTP2 override them per host.
+"""
+import importlib.util
+import logging
+import os
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_specs: dict[str, dict] = {}
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+def register(
+    name: str,
+    env_prefix: str,
+    headers: dict | None = None,
+    timeout: float = 10,
+    max_connections: int = 20,
+    max_keepalive: int = 10,
+    keepalive_expiry: float = 30,
+    http2: bool = False,
+) -> None:
+    """Declare the pooled client for one upstream host."""
+    _specs[name] = {
+        "headers": headers or {},
+        "timeout": float(os.getenv(f"{env_prefix}_HTTP_TIMEOUT", str(timeout))),
+        "max_connections": int(os.getenv(f"{env_prefix}_HTTP_MAX_CONNECTIONS", str(max_connections))),
+        "max_keepalive": int(os.getenv(f"{env_prefix}_HTTP_MAX_KEEPALIVE", str(max_keepalive))),
+        "keepalive_expiry": float(os.getenv(f"{env_prefix}_HTTP_KEEPALIVE_EXPIRY", str(keepalive_expiry))),
+        "http2": _env_flag(f"{env_prefix}_HTTP2", http2),
+    }
+
+
+def _new_client(name: str) -> httpx.AsyncClient:
+    spec = _specs[name]
+    http2 = spec["http2"]
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning(f"HTTP/2 requested for {name} but the 'h2' package is not installed — using HTTP/1.1.")
+        http2 = False
+    return httpx.AsyncClient(
+        headers=spec["headers"],
+        timeout=spec["timeout"],
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=spec["max_connections"],
+            max_keepalive_connections=spec["max_keepalive"],
+            keepalive_expiry=spec["keepalive_expiry"],
+        ),
+    )
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """The shared client for `name`, created lazily outside the app (scripts, shells)."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _new_client(name)
+    return client
+
+
+async def open_clients() -> None:
+    """Create every registered client. Called once at app startup."""
+    for name in _specs:
+        get_client(name)
+
+
+async def close_clients() -> None:
+    """Close every client and its pooled connections. Called at shutdown."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,87 @@
+"""
+backend/app/utils/prefetch.py
+
+Speculative background fetches, e.g. the next result page a user is likely
+to ask for. Prefetching is optional work, so it never queues: a request is
+dropped when the in-flight cap is reached, the per-minute budget is spent,
+or the same key is already being fetched. A prefetch that outlives its
+timeout is cancelled — if nobody has asked for it by then, it was a bad bet.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PagePrefetcher:
+    def __init__(
+        self,
+        name: str,
+        concurrency: int = 4,
+        per_minute: int = 60,
+        timeout: float = 15,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.per_minute = per_minute
+        self.timeout = timeout
+        self._clock = clock
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._tokens = float(per_minute)
+        self._refilled_at = clock()
+        self.stats = {"scheduled": 0, "completed": 0, "timed_out": 0, "failed": 0,
+                      "skipped_busy": 0, "skipped_budget": 0}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def _take_token(self) -> bool:
+        now = self._clock()
+        self._tokens = min(self.per_minute, self._tokens + (now - self._refilled_at) * self.per_minute / 60)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def schedule(self, key: str, fetch: Callable[..., Awaitable[Any]], *args: Any) -> bool:
+        """Start `fetch(*args)` in the background unless a cap says no."""
+        if key in self._inflight:
+            return False
+        if len(self._inflight) >= self.concurrency:
+            self.stats["skipped_busy"] += 1
+            return False
+        if not self._take_token():
+            self.stats["skipped_budget"] += 1
+            return False
+        self.stats["scheduled"] += 1
+        task = asyncio.get_running_loop().create_task(self._run(key, fetch, args))
+        self._inflight[key] = task
+        return True
+
+    async def _run(self, key: str, fetch: Callable[..., Awaitable[Any]], args: tuple) -> None:
+        try:
+            await asyncio.wait_for(fetch(*args), self.timeout)
+            self.stats["completed"] += 1
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            logger.info(f"prefetch {self.name}: gave up on {key} after {self.timeout}s")
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning(f"prefetch {self.name}: {key} failed: {e}")
+        finally:
+            self._inflight.pop(key, None)
+
+    async def drain(self) -> None:
+        """Wait for every in-flight prefetch to finish."""
+        while self._inflight:
+            await asyncio.gather(*list(self._inflight.values()), return_exceptions=True)
+
+    async def cancel_all(self) -> None:
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,65 @@
+"""
+backend/app/utils/ratelimit.py
+
+Process-wide limiter for a rate-limited upstream: a token bucket (`rate`
+requests per second, bursts up to `burst`) plus a cap on requests in
+flight. Every request in the process shares one limiter per upstream, so
+a page of fifty physicians queues politely behind the provider's limit
+instead of bursting past it and turning 429s into missing coordinates.
+
+Unlike PagePrefetcher (optional work, dropped when over budget) a caller
+here waits for its turn.
+"""
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Callable
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int = 1,
+        concurrency: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self._clock = clock
+        self._tokens = float(burst)
+        self._refilled_at = clock()
+        # asyncio primitives belong to one loop; scripts and tests run several
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.stats = {"acquired": 0, "throttled": 0, "waited_s": 0.0}
+
+    def _reserve(self) -> float:
+        """Take a token, possibly on credit; return how long to wait for it."""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one in-flight slot, entered no sooner than the bucket allows."""
+        async with self._semaphore():
+            wait = self._reserve()
+            if wait > 0:
+                self.stats["throttled"] += 1
+                self.stats["waited_s"] += wait
+                await asyncio.sleep(wait)
+            self.stats["acquired"] += 1
+            yield
@@ -0,0 +1,58 @@
+"""
+backend/app/utils/singleflight.py
+
+Coalesce identical in-flight upstream calls. The first caller for a key
+starts the call; concurrent callers with the same key await that one task
+instead of issuing a duplicate request.
+
+Each caller waits through asyncio.shield, so a disconnecting client only
+cancels its own wait. The shared call is cancelled only once every caller
+waiting on it has gone.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[str, tuple[asyncio.Task, list[int]]] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.get_running_loop().create_task(call())
+            entry = (task, [0])
+            self._inflight[key] = entry
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.coalesced += 1
+            logger.debug(f"singleflight {self.name}: joined in-flight call {key}")
+
+        task, waiters = entry
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and waiters[0] == 1:
+                # Last interested caller left — stop the upstream call too
+                self._forget(key, task)
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
@@ -0,0 +1,83 @@
+"""Shared fixtures: an in-process stand-in for the ClinicalTrials.gov v2 API."""
+import httpx
+import pytest
+
+from app.db import geocode_cache
+from app.services import clinicaltrials_api, zcta_geocoder
+from app.utils import http_clients
+
+CITY_GEO = {"Boston": (42.36, -71.06), "Austin": (30.27, -97.74), "Round Rock": (30.51, -97.68)}
+
+
+def make_study(i: int, city: str = "Boston", state: str = "Massachusetts", condition: str = "Asthma") -> dict:
+    return {
+        "protocolSection": {
+            "identificationModule": {"nctId": f"NCT{i:08d}", "briefTitle": f"{condition} study {i}"},
+            "statusModule": {
+                "overallStatus": "RECRUITING",
+                "lastUpdatePostDateStruct": {"date": "2024-01-01"},
+            },
+            "descriptionModule": {"briefSummary": f"A study of {condition.lower()} number {i}."},
+            "conditionsModule": {"conditions": [condition]},
+            "sponsorCollaboratorsModule": {"leadSponsor": {"name": f"Sponsor {i % 3}"}},
+            "designModule": {"phases": ["PHASE2"]},
+            "contactsLocationsModule": {"locations": [{
+                "facility": f"Clinic {i}", "city": city, "state": state,
+                "country": "United States",
+                "geoPoint": dict(zip(("lat", "lon"), CITY_GEO.get(city, (42.36, -71.06)))),
+            }]},
+        }
+    }
+
+
+class FakeClinicalTrials:
+    """Serves `studies` in order; page tokens are the record offset (`t<n>`)."""
+
+    def __init__(self, studies: list):
+        self.studies = studies
+        self.calls: list[dict] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        self.calls.append(params)
+        nct_id = request.url.path.rsplit("/", 1)[-1]
+        if nct_id.startswith("NCT"):
+            study = next((s for s in self.studies
+                          if s["protocolSection"]["identificationModule"]["nctId"] == nct_id), None)
+            return httpx.Response(200, json=study) if study else httpx.Response(404)
+        start = int(params.get("pageToken", "t0")[1:])
+        end = min(start + int(params["pageSize"]), len(self.studies))
+        data = {"studies": self.studies[start:end], "totalCount": len(self.studies)}
+        if end < len(self.studies):
+            data["nextPageToken"] = f"t{end}"
+        return httpx.Response(200, json=data)
+
+
+@pytest.fixture(autouse=True)
+def geocode_store(tmp_path, monkeypatch):
+    """Keep the durable geocode cache out of the working directory."""
+    path = str(tmp_path / "geocodes.sqlite")
+    monkeypatch.setattr(geocode_cache, "GEOCODE_DB_PATH", path)
+    # ZIP centroids only where a test loads its own gazetteer
+    monkeypatch.setattr(zcta_geocoder, "_index", zcta_geocoder.ZctaIndex([]))
+    return path
+
+
+@pytest.fixture
+def fake_ct(monkeypatch):
+    """Install a fake upstream with every 7th study sited in Austin, TX."""
+    studies = [
+        make_study(i, *(("Austin", "Texas") if i % 7 == 0 else ("Boston", "Massachusetts")))
+        for i in range(400)
+    ]
+    fake = FakeClinicalTrials(studies)
+    monkeypatch.setitem(http_clients._clients, "clinicaltrials",
+                        httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)))
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_SOURCE", "live")
+    clinicaltrials_api._page_token_chains.clear()
+    clinicaltrials_api._filtered_cursor_chains.clear()
+    clinicaltrials_api._pass_rates.clear()
+    clinicaltrials_api._trial_cache.clear()
+    clinicaltrials_api._radius_rankings.clear()
+    clinicaltrials_api.fetch_trial_detail_async.cache.clear()
+    return fake
@@ -0,0 +1,73 @@
+"""TTL+LRU response cache and its use by the trial search."""
+import asyncio
+
+from app.services import clinicaltrials_api
+from app.services.clinicaltrials_api import fetch_trials_with_filters_async
+from app.utils.caching import HIT, MISS, STALE, TTLCache, cache_response, canonical_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TTLCache("test-lru", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.lookup("b") == (None, MISS)
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_entries_expire_lazily_through_the_stale_window():
+    clock = Clock()
+    cache = TTLCache("test-ttl", ttl=10, stale_ttl=20, clock=clock)
+    cache.set("k", "v")
+    clock.now = 9
+    assert cache.lookup("k") == ("v", HIT)
+    clock.now = 15
+    assert cache.lookup("k") == ("v", STALE)
+    clock.now = 30
+    assert cache.lookup("k") == (None, MISS)
+    assert len(cache) == 0 and cache.expirations == 1
+
+
+def test_stale_hit_serves_old_value_and_refreshes_once():
+    clock = Clock()
+    cache = TTLCache("test-swr", ttl=10, stale_ttl=100, clock=clock)
+    calls = []
+
+    @cache_response(cache=cache, key=lambda x: str(x))
+    async def load(x):
+        calls.append(x)
+        await asyncio.sleep(0)
+        return len(calls)
+
+    async def scenario():
+        assert await load(1) == 1
+        clock.now = 50
+        stale = await asyncio.gather(load(1), load(1), load(1))
+        await asyncio.sleep(0.01)
+        return stale, await load(1)
+
+    stale, refreshed = asyncio.run(scenario())
+    assert stale == [1, 1, 1] and refreshed == 2 and len(calls) == 2
+
+
+def test_canonical_key_ignores_case_whitespace_and_order():
+    assert canonical_key("t", city="  Austin ", state="Texas") == canonical_key("t", state="texas", city="austin")
+    assert canonical_key("t", city="Austin", state="") == canonical_key("t", city="austin")
+
+
+def test_equivalent_trial_searches_share_one_upstream_fetch(fake_ct):
+    first, _, _ = asyncio.run(fetch_trials_with_filters_async({"condition": "Asthma", "city": "Austin", "state": "TX"}, 10, 0))
+    calls = len(fake_ct.calls)
+    again, _, _ = asyncio.run(fetch_trials_with_filters_async({"condition": "asthma ", "city": "austin", "state": "Texas"}, 10, 0))
+    assert again == first and len(fake_ct.calls) == calls
+    assert clinicaltrials_api._trial_cache.hits == 1
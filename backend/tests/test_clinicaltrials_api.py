@@ -0,0 +1,84 @@
+"""Pagination and filtering against the fake ClinicalTrials.gov upstream."""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import clinicaltrials_api
+from app.services.clinicaltrials_api import fetch_trials_async, fetch_trials_with_filters_async
+
+from conftest import make_study
+
+AUSTIN = {"condition": "asthma", "city": "Austin", "state": "TX"}
+
+
+def _ids(trials):
+    return [t["nctId"] for t in trials]
+
+
+def test_deep_page_walks_only_the_gap_with_cursor_projection(fake_ct):
+    trials, total = asyncio.run(fetch_trials_async("asthma", limit=10, offset=0))
+    assert total == 400 and _ids(trials)[0] == "NCT00000000"
+    fake_ct.calls.clear()
+
+    trials, _ = asyncio.run(fetch_trials_async("asthma", limit=10, offset=25))
+    walk, page = fake_ct.calls
+    assert (walk["pageSize"], walk["pageToken"], walk["fields"]) == ("15", "t10", "NCTId")
+    assert page["pageToken"] == "t25"
+    assert _ids(trials)[0] == "NCT00000025"
+
+
+def test_list_view_sends_field_projection(fake_ct):
+    asyncio.run(fetch_trials_async("asthma", limit=5))
+    fields = fake_ct.calls[-1]["fields"].split(",")
+    assert fields == clinicaltrials_api.STUDY_FIELD_PROJECTIONS["list"]
+
+
+def test_filtered_pages_are_full_and_do_not_repeat(fake_ct):
+    pages = [asyncio.run(fetch_trials_with_filters_async(AUSTIN, 10, offset))[0] for offset in (0, 10, 20)]
+    ids = [i for page in pages for i in _ids(page)]
+    assert all(len(page) == 10 for page in pages)
+    assert ids == [f"NCT{i:08d}" for i in range(0, 7 * 30, 7)]
+
+
+def test_cold_deep_offset_matches_sequential_paging(fake_ct):
+    trials, _, _ = asyncio.run(fetch_trials_with_filters_async(AUSTIN, 10, 20))
+    assert _ids(trials) == [f"NCT{i:08d}" for i in range(140, 210, 7)]
+
+
+def test_pass_rate_estimate_sizes_the_next_first_page(fake_ct):
+    asyncio.run(fetch_trials_with_filters_async(AUSTIN, 10, 0))
+    fake_ct.calls.clear()
+    clinicaltrials_api._filtered_cursor_chains.clear()
+    asyncio.run(fetch_trials_with_filters_async({**AUSTIN, "status": "recruiting"}, 10, 0))
+    # ~1 in 7 pass, so the first page asks for ~70 with headroom — one round-trip
+    assert len(fake_ct.calls) == 1
+    assert 70 <= int(fake_ct.calls[0]["pageSize"]) <= 100
+
+
+def test_radius_search_sends_geo_filter_and_ranks_by_distance(fake_ct):
+    fake_ct.studies[3] = make_study(3, "Round Rock", "Texas")
+    trials, total, _ = asyncio.run(fetch_trials_with_filters_async(
+        {"condition": "asthma", "lat": 30.27, "lon": -97.74, "radius_km": 40}, 5, 0,
+    ))
+    assert fake_ct.calls[0]["filter.geo"] == "distance(30.27,-97.74,40.0km)"
+    assert total == 59
+    assert _ids(trials) == ["NCT00000000", "NCT00000007", "NCT00000014", "NCT00000021", "NCT00000028"]
+    far = asyncio.run(fetch_trials_with_filters_async(
+        {"condition": "asthma", "lat": 30.27, "lon": -97.74, "radius_km": 40}, 5, 55,
+    ))[0]
+    assert _ids(far)[-1] == "NCT00000003" and 20 < far[-1]["distanceKm"] < 40
+
+
+def test_radius_pages_slice_one_scan_and_report_a_capped_scan(fake_ct, monkeypatch):
+    near_austin = {"condition": "asthma", "lat": 30.27, "lon": -97.74, "radius_km": 40}
+    _, _, complete = asyncio.run(fetch_trials_with_filters_async(near_austin, 5, 0))
+    scans = len(fake_ct.calls)
+    page, _, _ = asyncio.run(fetch_trials_with_filters_async(near_austin, 5, 50))
+    assert complete and len(page) == 5 and len(fake_ct.calls) == scans
+
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_RADIUS_PAGE_SIZE", 100)
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_RADIUS_MAX_PAGES", 2)
+    response = TestClient(app).get("/api/trials/", params={**near_austin, "radius_km": 45})
+    assert response.json()["pagination"]["complete"] is False
+    assert response.json()["pagination"]["total"] == 29
@@ -0,0 +1,80 @@
+"""Vectorized haversine kernels and per-site top-k."""
+import random
+import time
+
+import numpy as np
+import pytest
+
+from app.utils.distance import (
+    filter_physicians_by_distance,
+    haversine_distance,
+    haversine_matrix,
+    nearest_physicians_per_site,
+    top_k,
+)
+
+BOSTON = (42.3601, -71.0589)
+NYC = (40.7128, -74.0060)
+
+
+def _random_points(n, seed):
+    rng = random.Random(seed)
+    return [{"npi": str(i), "lat": rng.uniform(25, 49), "lon": rng.uniform(-124, -67)} for i in range(n)]
+
+
+def test_matrix_matches_scalar_formula():
+    sites = _random_points(5, seed=1)
+    points = _random_points(40, seed=2)
+    matrix = haversine_matrix(
+        np.array([s["lat"] for s in sites]), np.array([s["lon"] for s in sites]),
+        np.array([p["lat"] for p in points]), np.array([p["lon"] for p in points]),
+    )
+    assert matrix.shape == (5, 40)
+    for i, s in enumerate(sites):
+        for j, p in enumerate(points):
+            assert matrix[i, j] == pytest.approx(haversine_distance(s["lat"], s["lon"], p["lat"], p["lon"]), abs=1e-6)
+
+
+def test_top_k_is_sorted_and_exact():
+    distances = np.array([[5.0, 1.0, 4.0, 2.0, 3.0], [0.5, 9.0, 0.1, 7.0, 8.0]])
+    indices, nearest = top_k(distances, 3)
+    assert indices.tolist() == [[1, 3, 4], [2, 0, 3]]
+    assert nearest.tolist() == [[1.0, 2.0, 3.0], [0.1, 0.5, 7.0]]
+    assert top_k(distances, 10)[0].shape == (2, 5)
+
+
+def test_nearest_per_site_skips_missing_coordinates_and_applies_radius():
+    physicians = [
+        {"npi": "boston", "lat": 42.36, "lon": -71.06},
+        {"npi": "unknown", "lat": None, "lon": None},
+        {"npi": "nyc", "lat": 40.71, "lon": -74.01},
+    ]
+    sites = [dict(zip(("lat", "lon"), BOSTON)), {"lat": None, "lon": None}, dict(zip(("lat", "lon"), NYC))]
+
+    ranked = nearest_physicians_per_site(sites, physicians, k=2, max_km=50)
+
+    assert [p["npi"] for p in ranked[0]] == ["boston"]
+    assert ranked[1] == []
+    assert [p["npi"] for p in ranked[2]] == ["nyc"]
+    assert ranked[0][0]["distance_km"] < 1
+
+
+def test_filter_keeps_input_order():
+    physicians = [
+        {"npi": "nyc", "lat": NYC[0], "lon": NYC[1]},
+        {"npi": "none", "lat": None, "lon": None},
+        {"npi": "boston", "lat": BOSTON[0], "lon": BOSTON[1]},
+    ]
+    kept = filter_physicians_by_distance({"lat": BOSTON[0], "lon": BOSTON[1]}, physicians, max_km=400)
+    assert [p["npi"] for p in kept] == ["nyc", "boston"]
+    assert kept[1]["distance_km"] == 0.0
+    assert filter_physicians_by_distance({"lat": None, "lon": None}, physicians) == []
+
+
+def test_hundreds_of_sites_against_thousands_of_physicians_is_fast():
+    sites = _random_points(300, seed=3)
+    physicians = _random_points(5000, seed=4)
+    started = time.perf_counter()
+    ranked = nearest_physicians_per_site(sites, physicians, k=10)
+    assert time.perf_counter() - started < 1.0
+    assert all(len(r) == 10 for r in ranked)
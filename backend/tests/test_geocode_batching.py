@@ -0,0 +1,138 @@
+"""Batching, cross-request dedupe and rate limiting in front of Geoapify."""
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+import pytest
+
+from app.services import geoapify_api, geocoding
+from app.services.geocoding import geocode_addresses
+from app.utils import http_clients
+from app.utils.ratelimit import RateLimiter
+
+
+class FakeGeoapify:
+    """Single lookups answer at once; batch jobs answer 202 once, then 200 unless held."""
+
+    def __init__(self):
+        self.requests: list[httpx.Request] = []
+        self.jobs: dict[str, list] = {}
+        self.hold_jobs = False
+
+    @staticmethod
+    def _point(text: str) -> dict:
+        n = int(text.split()[0])
+        return {"lat": 40 + n / 1000, "lon": -70 - n / 1000}
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        params = request.url.params
+        if request.url.path.endswith("/batch/geocode/search"):
+            if request.method == "POST":
+                job_id = f"job{len(self.jobs)}"
+                self.jobs[job_id] = [{"query": {"text": t}, **self._point(t)} for t in json.loads(request.content)]
+                return httpx.Response(202, json={"id": job_id, "status": "pending"})
+            if self.hold_jobs:
+                return httpx.Response(202, json={"id": params["id"], "status": "pending"})
+            return httpx.Response(200, json=self.jobs[params["id"]])
+        await asyncio.sleep(0.05)
+        point = self._point(params["text"])
+        return httpx.Response(200, json={"features": [{"geometry": {"coordinates": [point["lon"], point["lat"]]}}]})
+
+
+@pytest.fixture
+def geoapify(monkeypatch):
+    fake = FakeGeoapify()
+    monkeypatch.setitem(http_clients._clients, "geoapify",
+                        httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)))
+    monkeypatch.setattr(geoapify_api, "GEOAPIFY_API_KEY", "test-key")
+    monkeypatch.setattr(geoapify_api, "GEOAPIFY_BATCH_POLL_INTERVAL", 0)
+    monkeypatch.setattr(geoapify_api, "_limiter", RateLimiter("geoapify", rate=1000, burst=1000, concurrency=8))
+    return fake
+
+
+def _addresses(n):
+    return [f"{i} Main St, Boston, MA 02110" for i in range(1, n + 1)]
+
+
+def test_large_sets_go_through_one_batch_job(geoapify, monkeypatch):
+    monkeypatch.setattr(geocoding, "GEOCODE_BATCH_MIN", 5)
+    addresses = _addresses(6)
+
+    coords = asyncio.run(geocode_addresses(addresses + addresses[:2]))
+
+    assert [r.method for r in geoapify.requests] == ["POST", "GET"]
+    assert coords[addresses[2]] == {"lat": 40.003, "lon": -70.003}
+
+
+def test_slow_batch_falls_back_to_single_lookups_and_finishes_later(geoapify, monkeypatch, caplog):
+    monkeypatch.setattr(geocoding, "GEOCODE_BATCH_MIN", 5)
+    monkeypatch.setattr(geocoding, "GEOCODE_BATCH_DEADLINE", 0.05)
+    monkeypatch.setattr(geoapify_api, "GEOAPIFY_BATCH_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(geoapify_api, "GEOAPIFY_BATCH_MAX_POLLS", 1000)
+    caplog.set_level(logging.INFO, logger="app.services.geocoding")
+    addresses = _addresses(6)
+    geoapify.hold_jobs = True
+
+    async def search_then_let_the_job_finish():
+        started = time.perf_counter()
+        coords = await geocode_addresses(addresses)
+        waited = time.perf_counter() - started
+        singles = sum("text" in r.url.params for r in geoapify.requests)
+        geoapify.hold_jobs = False
+        await asyncio.gather(*geocoding._background)
+        return coords, waited, singles
+
+    coords, waited, singles = asyncio.run(search_then_let_the_job_finish())
+
+    # The request did not wait out the job: every address was routed singly
+    assert waited < 0.5 and singles == 6
+    assert coords[addresses[2]] == {"lat": 40.003, "lon": -70.003}
+    # ...and the job kept polling in the background until it answered
+    assert not geocoding._background
+    assert "Late geocode batch of 6 addresses finished and cached" in caplog.text
+    assert sum(r.method == "GET" and "id" in r.url.params for r in geoapify.requests) >= 2
+
+
+def test_small_sets_are_looked_up_singly(geoapify):
+    coords = asyncio.run(geocode_addresses(_addresses(3)))
+    assert len(geoapify.requests) == 3 and all(r.method == "GET" for r in geoapify.requests)
+    assert coords[_addresses(3)[0]] == {"lat": 40.001, "lon": -70.001}
+
+
+def test_concurrent_requests_share_in_flight_lookups(geoapify):
+    shared = "7 Main St, Suite 4, Boston, MA 02110"
+
+    async def two_requests():
+        return await asyncio.gather(
+            geocode_addresses([shared, "8 Main St, Boston, MA 02110"]),
+            geocode_addresses(["7 MAIN ST, BOSTON, MA 02110-1234"]),
+        )
+
+    asyncio.run(two_requests())
+    texts = [r.url.params["text"] for r in geoapify.requests]
+    assert len(texts) == 2 and sum(t.startswith("7 ") for t in texts) == 1
+
+
+def test_rate_limiter_spaces_requests_and_caps_concurrency():
+    limiter = RateLimiter("test", rate=50, burst=1, concurrency=2)
+    active, peak = 0, 0
+
+    async def call():
+        nonlocal active, peak
+        async with limiter.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def burst():
+        await asyncio.gather(*[call() for _ in range(6)])
+
+    started = time.perf_counter()
+    asyncio.run(burst())
+    # Six calls at 50/s with a burst of one: at least five 20 ms gaps
+    assert time.perf_counter() - started >= 0.09
+    assert peak <= 2 and limiter.stats["throttled"] >= 5
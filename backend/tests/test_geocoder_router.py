@@ -0,0 +1,161 @@
+"""Hedged, circuit-broken routing of single geocodes across providers."""
+import asyncio
+
+import pytest
+
+from app.services import geocoder_router
+from app.services.geocoder_router import GeocodeProvider, GeocoderRouter
+
+
+class FakeProvider:
+    def __init__(self, name, delay=0.0, result=None, fail=False):
+        self.name = name
+        self.delay = delay
+        self.result = result or {"lat": 42.0, "lon": -71.0, "via": name}
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    async def geocode(self, address):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return self.result
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fast_hedge(monkeypatch):
+    monkeypatch.setattr(geocoder_router, "GEOCODE_HEDGE_DEFAULT", 0.05)
+    monkeypatch.setattr(geocoder_router, "GEOCODE_HEDGE_MIN_SAMPLES", 5)
+
+
+def _router(*fakes, clock=None):
+    kwargs = {"clock": clock} if clock else {}
+    return GeocoderRouter([GeocodeProvider(f.name, f.geocode, **kwargs) for f in fakes])
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    slow, fast = FakeProvider("geoapify", delay=1.0), FakeProvider("mapquest")
+    router = _router(slow, fast)
+
+    geo = asyncio.run(router.geocode("1 Main St"))
+
+    assert geo["via"] == "mapquest"
+    assert slow.cancelled == 1
+    assert router.stats()["geoapify"]["hedged"] == 1
+
+
+def test_fast_primary_never_reaches_the_second_provider():
+    primary, backup = FakeProvider("geoapify"), FakeProvider("mapquest")
+    geo = asyncio.run(_router(primary, backup).geocode("1 Main St"))
+    assert geo["via"] == "geoapify" and backup.calls == 0
+
+
+def test_failure_falls_through_and_definite_miss_does_not():
+    down, backup = FakeProvider("geoapify", fail=True), FakeProvider("mapquest")
+    assert asyncio.run(_router(down, backup).geocode("1 Main St"))["via"] == "mapquest"
+
+    miss = FakeProvider("geoapify", result={"lat": None, "lon": None, "found": False})
+    backup = FakeProvider("mapquest")
+    assert asyncio.run(_router(miss, backup).geocode("nowhere"))["found"] is False
+    assert backup.calls == 0
+
+
+def test_hedge_delay_follows_observed_p95():
+    provider = GeocodeProvider("geoapify", FakeProvider("geoapify").geocode)
+    assert provider.hedge_after() == 0.05
+    provider.latencies.extend([0.1] * 19 + [0.9])
+    assert provider.p95() == pytest.approx(0.9)
+    provider.latencies.extend([0.1] * 20)
+    assert provider.p95() == pytest.approx(0.1)
+
+
+def test_breaker_opens_then_lets_one_trial_through(monkeypatch):
+    monkeypatch.setattr(geocoder_router, "GEOCODE_BREAKER_FAILURES", 3)
+    monkeypatch.setattr(geocoder_router, "GEOCODE_BREAKER_COOLDOWN", 30)
+    clock = Clock()
+    down, backup = FakeProvider("geoapify", fail=True), FakeProvider("mapquest")
+    router = _router(down, backup, clock=clock)
+
+    async def lookups(n):
+        return [await router.geocode(f"{i} Main St") for i in range(n)]
+
+    asyncio.run(lookups(5))
+    assert down.calls == 3
+    assert router.stats()["geoapify"]["circuit"] == "open"
+
+    # After the cooldown one trial goes through; it fails, so the circuit stays open
+    clock.now += 31
+    asyncio.run(lookups(2))
+    assert down.calls == 4
+
+    # A successful trial closes it again
+    clock.now += 31
+    down.fail = False
+    asyncio.run(lookups(2))
+    assert down.calls == 6
+    assert router.stats()["geoapify"]["circuit"] == "closed"
+
+
+def test_half_open_backup_is_not_stuck_when_the_primary_answers(monkeypatch):
+    monkeypatch.setattr(geocoder_router, "GEOCODE_BREAKER_FAILURES", 1)
+    clock = Clock()
+    primary, backup = FakeProvider("geoapify"), FakeProvider("mapquest", fail=True)
+    router = _router(primary, backup, clock=clock)
+    primary.fail = True
+    asyncio.run(router.geocode("1 Main St"))
+    primary.fail = False
+    assert router.stats()["mapquest"]["circuit"] == "open"
+
+    # The backup is half-open while the primary keeps answering on its own
+    clock.now += 31
+    for i in range(3):
+        assert asyncio.run(router.geocode(f"{i} Main St"))["via"] == "geoapify"
+    assert backup.calls == 1 and router.providers[1].available()
+
+    # ...so once it is needed, its trial still goes through and closes it
+    primary.fail, backup.fail = True, False
+    assert asyncio.run(router.geocode("9 Main St"))["via"] == "mapquest"
+    assert router.stats()["mapquest"]["circuit"] == "closed"
+
+
+def test_cancelled_trial_releases_the_half_open_slot(monkeypatch):
+    monkeypatch.setattr(geocoder_router, "GEOCODE_BREAKER_FAILURES", 1)
+    clock = Clock()
+    fake = FakeProvider("geoapify", fail=True)
+    provider = GeocodeProvider("geoapify", fake.geocode, clock=clock)
+    asyncio.run(provider.call("1 Main St"))
+    clock.now += 31
+    fake.fail, fake.delay = False, 1.0
+
+    async def cancel_trial():
+        task = asyncio.create_task(provider.call("2 Main St"))
+        await asyncio.sleep(0.01)
+        assert not provider.available()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_trial())
+    assert fake.cancelled == 1 and provider.available()
+
+
+def test_all_circuits_open_fails_fast(monkeypatch):
+    monkeypatch.setattr(geocoder_router, "GEOCODE_BREAKER_FAILURES", 1)
+    down = FakeProvider("geoapify", fail=True)
+    router = _router(down)
+    asyncio.run(router.geocode("1 Main St"))
+    assert asyncio.run(router.geocode("2 Main St")) == {"lat": None, "lon": None}
+    assert down.calls == 1
@@ -0,0 +1,74 @@
+"""Geocoding result lists through the Redis and durable caches."""
+import asyncio
+
+import pytest
+
+from app.db import geocode_cache
+from app.db.geocode_cache import normalize_address
+from app.services import geocoding
+from app.services.geocoding import geocode_addresses
+
+COORDS = {
+    "1 main st boston ma 02110": {"lat": 42.36, "lon": -71.06},
+    "9 nowhere rd boston ma 02110": {"lat": None, "lon": None, "found": False},
+}
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    calls = []
+
+    async def geocode(address):
+        calls.append(address)
+        # Unknown addresses behave like an upstream error: no "found" marker
+        return COORDS.get(normalize_address(address), {"lat": None, "lon": None})
+
+    monkeypatch.setattr(geocoding, "geocode_address", geocode)
+    return calls
+
+
+def test_normalized_key_ignores_case_suites_and_zip4():
+    assert (
+        normalize_address("1 Main St., Suite 200, Boston, MA 02110-1234")
+        == normalize_address("1 MAIN ST  STE 4B, BOSTON, MA 021101234")
+        == "1 main st boston ma 02110"
+    )
+    # A Florida address keeps its state code
+    assert normalize_address("5 Bay Rd, Miami, FL 33101") == "5 bay rd miami fl 33101"
+    assert normalize_address("2 Oak Ave, Unit C, Austin, TX 78701") == "2 oak ave austin tx 78701"
+
+
+def test_place_names_starting_with_a_unit_word_are_kept():
+    assert normalize_address("100 Market St, Ste Genevieve, MO 63670") == "100 market st ste genevieve mo 63670"
+    assert normalize_address("100 Market St, Ste 2, Ste Genevieve, MO 63670") == "100 market st ste genevieve mo 63670"
+    assert normalize_address("4 Main St, Ste Marie, MO 63670") != normalize_address("4 Main St, Ste Genevieve, MO 63670")
+
+
+def test_shared_clinic_is_geocoded_once_and_then_served_from_disk(provider):
+    addresses = ["1 Main St, Suite 200, Boston, MA 02110", "1 MAIN ST STE 310, BOSTON, MA 021101234"]
+
+    first = asyncio.run(geocode_addresses(addresses))
+    assert provider == [addresses[0]]
+    assert first[addresses[1]] == {"lat": 42.36, "lon": -71.06}
+
+    assert asyncio.run(geocode_addresses(addresses)) == first
+    assert len(provider) == 1
+
+
+def test_misses_are_cached_but_errors_are_not(provider):
+    miss, error = "9 Nowhere Rd, Boston, MA 02110", "13 Flaky Ave, Boston, MA 02110"
+
+    asyncio.run(geocode_addresses([miss, error]))
+    again = asyncio.run(geocode_addresses([miss, error]))
+
+    assert again[miss] == {"lat": None, "lon": None}
+    assert provider.count(miss) == 1
+    assert provider.count(error) == 2
+
+
+def test_expired_entries_are_geocoded_again(provider, monkeypatch):
+    miss = "9 Nowhere Rd, Boston, MA 02110"
+    asyncio.run(geocode_addresses([miss]))
+    monkeypatch.setattr(geocode_cache, "GEOCODE_MISS_TTL_DAYS", 0)
+    asyncio.run(geocode_addresses([miss]))
+    assert provider.count(miss) == 2
@@ -0,0 +1,47 @@
+"""Geohash cells and the bucketed radius index."""
+import random
+
+from app.utils.distance import haversine_distance
+from app.utils.geohash import GeohashIndex, cells_covering, encode
+
+
+def test_encode_matches_reference_geohash():
+    assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_cover_stays_bounded_for_large_radii():
+    for radius_km in (1, 10, 100, 1000):
+        assert len(cells_covering(30.27, -97.74, radius_km)) <= 32
+
+
+def test_index_radius_query_matches_brute_force():
+    rng = random.Random(7)
+    points = [(i, rng.uniform(25, 48), rng.uniform(-124, -67)) for i in range(20_000)]
+    index = GeohashIndex()
+    for point in points:
+        index.insert(*point)
+
+    for lat, lon, radius_km in ((30.27, -97.74, 80), (40.71, -74.0, 25), (47.6, -122.3, 300)):
+        hits = index.within(lat, lon, radius_km)
+        expected = {i for i, plat, plon in points if haversine_distance(lat, lon, plat, plon) <= radius_km}
+        assert {key for key, _ in hits} == expected
+        assert [d for _, d in hits] == sorted(d for _, d in hits)
+
+
+def test_nearest_per_key_keeps_each_keys_closest_point():
+    index = GeohashIndex()
+    index.insert("far-and-near", 30.50, -97.70)
+    index.insert("far-and-near", 30.27, -97.74)
+    index.insert("mid", 30.35, -97.74)
+    ranked = index.nearest_per_key(30.27, -97.74, 50)
+    assert [key for key, _ in ranked] == ["far-and-near", "mid"]
+
+
+def test_remove_drops_one_point_and_empty_cells():
+    index = GeohashIndex()
+    index.insert("a", 30.27, -97.74)
+    index.insert("a", 30.35, -97.74)
+    assert index.remove("a", 30.27, -97.74)
+    assert not index.remove("a", 30.27, -97.74)
+    assert len(index) == 1 and len(index._cells) == 1
+    assert [key for key, _ in index.within(30.27, -97.74, 50)] == ["a"]
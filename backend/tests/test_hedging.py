@@ -0,0 +1,103 @@
+"""Speculative execution of a most-specific-first fallback ladder."""
+import asyncio
+import time
+
+from app.services import geocoding, nppes_api
+from app.services.nppes_api import fetch_physicians_near
+from app.utils.hedging import run_ladder
+
+
+def tier(delay, result, log=None, name=None):
+    async def run():
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(name)
+            raise
+        return result
+    return run
+
+
+def _timed(coro):
+    started = time.perf_counter()
+    result = asyncio.run(coro)
+    return result, time.perf_counter() - started
+
+
+def test_prefers_the_most_specific_tier_even_when_a_coarser_one_is_faster():
+    result, _ = _timed(run_ladder([tier(0.1, ["city"]), tier(0.01, ["state"])], delay=0.02))
+    assert result == ["city"]
+
+
+def test_empty_tiers_cost_about_one_round_trip():
+    tiers = [tier(0.2, []), tier(0.2, []), tier(0.2, ["national"])]
+    result, elapsed = _timed(run_ladder(tiers, delay=0.05))
+    assert result == ["national"]
+    assert elapsed < 0.45   # in sequence this is 0.6s
+
+
+def test_losing_tiers_are_cancelled():
+    cancelled = []
+    tiers = [tier(0.05, ["city"]), tier(1, ["state"], cancelled, "state")]
+    result, elapsed = _timed(run_ladder(tiers, delay=0.01))
+    assert result == ["city"] and cancelled == ["state"]
+    assert elapsed < 0.5
+
+
+def test_all_empty_returns_empty():
+    assert asyncio.run(run_ladder([tier(0, []), tier(0, [])], delay=1)) == []
+    assert asyncio.run(run_ladder([], delay=1)) == []
+
+
+def test_sparse_tier_starts_the_next_one_and_yields_to_a_fuller_tier():
+    started = []
+
+    def tracked(name, delay, result):
+        async def run():
+            started.append(name)
+            await asyncio.sleep(delay)
+            return result
+        return run
+
+    tiers = [tracked("city", 0.01, ["c1"]), tracked("state", 0.01, ["s1", "s2", "s3"]), tracked("us", 0.01, ["n"] * 5)]
+    result, elapsed = _timed(run_ladder(tiers, delay=1, min_results=3))
+    # The thin city tier did not end the ladder or wait out the delay
+    assert result == ["s1", "s2", "s3"] and started == ["city", "state"]
+    assert elapsed < 0.5
+
+    # Default threshold: any non-empty tier answers
+    assert asyncio.run(run_ladder([tier(0, ["c1"]), tier(0, ["s1", "s2"])], delay=1)) == ["c1"]
+
+
+def test_sparse_tiers_fall_back_to_the_most_specific_non_empty():
+    tiers = [tier(0, []), tier(0.01, ["state"]), tier(0, ["us1", "us2"])]
+    assert asyncio.run(run_ladder(tiers, delay=1, min_results=3)) == ["state"]
+
+
+def test_hedged_physician_search_answers_from_the_first_non_empty_tier(monkeypatch):
+    provider = {
+        "number": "1", "basic": {"first_name": "Pat", "last_name": "Doe"},
+        "taxonomies": [{"code": "207RH0003X", "primary": True}],
+        "addresses": [{"address_purpose": "LOCATION", "address_1": "1 Front St",
+                       "city": "Nome", "state": "AK", "postal_code": "99762"}],
+    }
+
+    async def fetch(params):
+        # Rural town: the city tier is slow and empty, the state tier has one doctor
+        if params.get("city"):
+            await asyncio.sleep(0.3)
+            return []
+        return [provider] if params.get("state") else []
+
+    async def geocode(address):
+        return {"lat": 64.5, "lon": -165.4}
+
+    monkeypatch.setattr(nppes_api, "_fetch_nppes", fetch)
+    monkeypatch.setattr(geocoding, "geocode_address", geocode)
+    monkeypatch.setattr(nppes_api, "NPPES_HEDGE", True)
+    monkeypatch.setattr(nppes_api, "NPPES_HEDGE_DELAY", 0.05)
+    fetch_physicians_near.cache.clear()
+
+    physicians = asyncio.run(fetch_physicians_near("Nome", "AK", "cancer", limit=5))
+    assert [p["npi"] for p in physicians] == ["1"]
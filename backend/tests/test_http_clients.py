@@ -0,0 +1,53 @@
+"""The per-process registry of pooled upstream clients."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.utils import http_clients
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(http_clients, "_specs", {})
+    monkeypatch.setattr(http_clients, "_clients", {})
+    return http_clients
+
+
+def test_each_host_gets_one_shared_client(registry):
+    registry.register("a", "TEST_A", timeout=5)
+    registry.register("b", "TEST_B", timeout=7)
+
+    assert registry.get_client("a") is registry.get_client("a")
+    assert registry.get_client("a") is not registry.get_client("b")
+    assert registry.get_client("b").timeout == httpx.Timeout(7)
+
+
+def test_env_overrides_registered_defaults(registry, monkeypatch):
+    monkeypatch.setenv("TEST_A_HTTP_TIMEOUT", "2.5")
+    monkeypatch.setenv("TEST_A_HTTP_MAX_CONNECTIONS", "3")
+    monkeypatch.setenv("TEST_A_HTTP2", "true")
+    registry.register("a", "TEST_A", timeout=5, max_connections=20)
+
+    spec = registry._specs["a"]
+    assert (spec["timeout"], spec["max_connections"], spec["http2"]) == (2.5, 3, True)
+    # Without the h2 package HTTP/2 quietly falls back to HTTP/1.1
+    assert registry.get_client("a").timeout == httpx.Timeout(2.5)
+
+
+def test_lifespan_opens_and_closes_every_client(registry):
+    registry.register("a", "TEST_A")
+    registry.register("b", "TEST_B")
+
+    async def lifecycle():
+        await registry.open_clients()
+        opened = dict(registry._clients)
+        await registry.close_clients()
+        return opened
+
+    opened = asyncio.run(lifecycle())
+    assert set(opened) == {"a", "b"}
+    assert all(client.is_closed for client in opened.values())
+    assert registry._clients == {}
+    # Used again outside the app, a fresh client is created
+    assert not registry.get_client("a").is_closed
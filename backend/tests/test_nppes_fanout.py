@@ -0,0 +1,92 @@
+"""Concurrent, deduplicated taxonomy fan-out in fetch_physicians_near."""
+import asyncio
+
+import pytest
+
+from app.services import geocoding, nppes_api
+from app.services.nppes_api import fetch_physicians_near
+
+
+def make_provider(npi: int, code: str, city: str = "Boston", state: str = "MA") -> dict:
+    return {
+        "number": str(npi),
+        "basic": {"first_name": "Pat", "last_name": f"Doe{npi}"},
+        "taxonomies": [{"code": code, "primary": True}],
+        "addresses": [{"address_purpose": "LOCATION", "address_1": f"{npi} Main St",
+                       "city": city, "state": state, "postal_code": "02110"}],
+    }
+
+
+class FakeNppes:
+    """Serves a few providers per taxonomy description after `delay(n)` seconds for the n-th call."""
+
+    def __init__(self, delay, per_description: int = 3):
+        self.delay = delay
+        self.per_description = per_description
+        self.calls: list[str] = []
+        self.cancelled: list[str] = []
+        self.active = 0
+        self.peak = 0
+
+    async def fetch(self, params: dict) -> list:
+        desc = params.get("taxonomy_description")
+        self.calls.append(desc)
+        n = len(self.calls)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay(n))
+        except asyncio.CancelledError:
+            self.cancelled.append(desc)
+            raise
+        finally:
+            self.active -= 1
+        code = next(c for c, d in nppes_api.CODE_TO_DESCRIPTION.items() if d == desc)
+        return [make_provider(1000 * n + i, code) for i in range(self.per_description)]
+
+
+@pytest.fixture
+def install_nppes(monkeypatch):
+    def install(delay):
+        fake = FakeNppes(delay)
+        monkeypatch.setattr(nppes_api, "_fetch_nppes", fake.fetch)
+        return fake
+
+    async def geocode(address):
+        return {"lat": 42.36, "lon": -71.06}
+
+    monkeypatch.setattr(geocoding, "geocode_address", geocode)
+    fetch_physicians_near.cache.clear()
+    return install
+
+
+def test_codes_collapse_to_unique_descriptions():
+    codes = ["207QG0300X", "207RG0300X", "207RC0000X"]
+    assert nppes_api._taxonomy_descriptions(codes) == ["Geriatric Medicine", "Cardiovascular Disease"]
+
+
+def test_fan_out_runs_concurrently_and_merges_in_priority_order(install_nppes, monkeypatch):
+    # Later descriptions answer first, so the merge order is really exercised
+    fake = install_nppes(lambda n: 0.05 / n)
+    monkeypatch.setattr(nppes_api, "NPPES_TAXONOMY_CONCURRENCY", 2)
+    expected = nppes_api._taxonomy_descriptions(nppes_api.get_taxonomy_codes_for_condition("breast cancer"))
+
+    physicians = asyncio.run(fetch_physicians_near("Boston", "MA", "breast cancer", limit=100))
+
+    assert sorted(fake.calls) == sorted(expected)
+    assert fake.peak == 2
+    assert [p["specialty"] for p in physicians] == [d for d in expected for _ in range(3)]
+
+
+def test_fan_out_cancels_queries_once_limit_is_met(install_nppes, monkeypatch):
+    fake = install_nppes(lambda n: 0.01 * n)
+    monkeypatch.setattr(nppes_api, "NPPES_TAXONOMY_CONCURRENCY", 2)
+    first, second, *rest = nppes_api._taxonomy_descriptions(nppes_api.get_taxonomy_codes_for_condition("breast cancer"))
+
+    physicians = asyncio.run(fetch_physicians_near("Boston", "MA", "breast cancer", limit=3))
+
+    assert {p["specialty"] for p in physicians} == {first}
+    # Queries still in flight are cancelled; queued ones never reach NPPES
+    assert second in fake.cancelled
+    assert set(fake.cancelled) == set(fake.calls) - {first}
+    assert len(fake.calls) < 2 + len(rest)
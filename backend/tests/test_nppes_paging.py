@@ -0,0 +1,70 @@
+"""Paging through NPPES results with `skip` until enough physicians pass the filters."""
+import asyncio
+
+import pytest
+
+from app.services import geocoding, nppes_api
+from app.services.nppes_api import fetch_physicians_near, iter_nppes_physicians
+
+
+def make_provider(npi: int, state: str) -> dict:
+    return {
+        "number": str(npi),
+        "basic": {"first_name": "Pat", "last_name": f"Doe{npi}"},
+        "taxonomies": [{"code": "207RX0202X", "primary": True}],
+        "addresses": [{"address_purpose": "LOCATION", "address_1": f"{npi} Main St",
+                       "city": "Portland", "state": state, "postal_code": "97201"}],
+    }
+
+
+@pytest.fixture
+def portland(monkeypatch):
+    """A fuzzy city search that mostly returns the other Portland: one in ten is in OR."""
+    listing = [make_provider(i, "OR" if i % 10 == 0 else "ME") for i in range(450)]
+    calls = []
+
+    async def fetch(params):
+        calls.append(params)
+        skip = params.get("skip", 0)
+        return listing[skip:skip + params["limit"]]
+
+    async def geocode(address):
+        return {"lat": 45.52, "lon": -122.68}
+
+    monkeypatch.setattr(nppes_api, "_fetch_nppes", fetch)
+    monkeypatch.setattr(geocoding, "geocode_address", geocode)
+    fetch_physicians_near.cache.clear()
+    return calls
+
+
+async def _take(agen, n):
+    found = []
+    async for item in agen:
+        found.append(item)
+        if len(found) >= n:
+            break
+    await agen.aclose()
+    return found
+
+
+def test_pages_until_enough_pass_the_strict_filters(portland):
+    found = asyncio.run(_take(iter_nppes_physicians("Portland", None, strict_state="OR", page_size=50), 10))
+
+    assert [p["npi"] for p in found] == [str(i) for i in range(0, 100, 10)]
+    assert [c.get("skip", 0) for c in portland] == [0, 50]
+
+
+def test_stops_at_the_end_of_the_listing(portland):
+    found = asyncio.run(_take(iter_nppes_physicians("Portland", None, strict_state="OR", page_size=200), 100))
+
+    assert len(found) == 45
+    assert [c.get("skip", 0) for c in portland] == [0, 200, 400]
+
+
+def test_city_tier_pages_instead_of_falling_back(portland):
+    physicians = asyncio.run(fetch_physicians_near("Portland", "OR", "cancer", limit=5))
+
+    assert len(physicians) == 5 and {p["state"] for p in physicians} == {"OR"}
+    # Every call stayed in the city tier; the first query needed a second page
+    assert all(c.get("city") == "Portland" for c in portland)
+    assert any(c.get("skip") for c in portland)
@@ -0,0 +1,86 @@
+"""Loading NPPES dissemination files and answering physician searches offline."""
+import asyncio
+import os
+
+import pytest
+
+from app.db import nppes_store
+from app.services import geocoding, nppes_api
+from app.services.nppes_api import fetch_physicians_near
+from app.services.nppes_sync import sync_nppes
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+MONTHLY = os.path.join(FIXTURES, "npidata_sample.csv")
+WEEKLY = os.path.join(FIXTURES, "npidata_weekly.csv")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(nppes_store, "NPPES_DB_PATH", str(tmp_path / "nppes.duckdb"))
+    monkeypatch.setattr(nppes_api, "PHYSICIAN_SOURCE", "local")
+
+    async def geocode(address):
+        return {"lat": 42.36, "lon": -71.06}
+
+    monkeypatch.setattr(geocoding, "geocode_address", geocode)
+    fetch_physicians_near.cache.clear()
+    return tmp_path
+
+
+def _find(**kwargs):
+    conn = nppes_store.get_nppes_db(read_only=True)
+    try:
+        return nppes_store.find_nppes_physicians(conn, **kwargs)
+    finally:
+        conn.close()
+
+
+def _npis(physicians):
+    return [p["npi"] for p in physicians]
+
+
+def test_full_load_keeps_active_individual_physicians(store):
+    assert sync_nppes(MONTHLY) == {"source": "npidata_sample.csv", "kind": "full", "seen": 8, "kept": 4, "skipped": False}
+
+    rows = _find(taxonomy_codes=[], state="MA", city="Boston", limit=10)
+    assert _npis(rows) == ["1000000001", "1000000002"]
+    # Addresses are normalized; the switch picks the primary taxonomy
+    assert (rows[1]["city"], rows[1]["state"], rows[1]["postal_code"]) == ("BOSTON", "MA", "02110")
+    assert rows[1]["primary_taxonomy"] == "207RH0003X"
+
+
+def test_weekly_delta_replaces_only_its_npis_once(store):
+    sync_nppes(MONTHLY)
+    assert sync_nppes(WEEKLY, delta=True)["kept"] == 2
+    assert sync_nppes(WEEKLY, delta=True)["skipped"]
+
+    # 001 deactivated, 005 moved from Worcester to Boston, 009 is new
+    assert _npis(_find(taxonomy_codes=[], state="MA", city="boston", limit=10)) == [
+        "1000000002", "1000000005", "1000000009",
+    ]
+    assert _find(taxonomy_codes=[], state="MA", city="Worcester", limit=10) == []
+
+
+def test_local_ladder_matches_the_live_tiers(store):
+    sync_nppes(MONTHLY)
+
+    # City tier, ranked by the condition's code priority (207RH0003X first)
+    city = asyncio.run(fetch_physicians_near("Boston", "MA", "cancer", limit=10))
+    assert _npis(city) == ["1000000002", "1000000001"]
+    assert city[0]["specialty"] == "Hematology & Oncology" and city[0]["lat"] == 42.36
+
+    # Nobody in Springfield for oncology -> state tier
+    state = asyncio.run(fetch_physicians_near("Springfield", "Massachusetts", "cancer", limit=10))
+    assert _npis(state) == ["1000000002", "1000000001", "1000000005"]
+
+    # Nobody in Alaska -> national tier
+    national = asyncio.run(fetch_physicians_near("Nome", "AK", "cancer", limit=10))
+    assert _npis(national) == ["1000000002", "1000000006", "1000000001", "1000000005"]
+
+
+def test_missing_store_falls_back_to_live(store, monkeypatch):
+    async def live(city, state_code, codes, limit):
+        return [{"npi": "live", "full_address": "1 Main St, Boston, MA 02110"}]
+
+    monkeypatch.setattr(nppes_api, "_collect_live", live)
+    assert _npis(asyncio.run(fetch_physicians_near("Boston", "MA", "cancer"))) == ["live"]
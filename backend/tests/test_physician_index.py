@@ -0,0 +1,110 @@
+"""In-memory spatial index over geocoded physicians."""
+import asyncio
+import os
+import random
+
+import pytest
+
+from app.db import geocode_cache, nppes_store
+from app.services import physician_index, zcta_geocoder
+from app.services.nppes_sync import sync_nppes
+from app.services.physician_index import PhysicianIndex, get_physician_index
+from app.utils.distance import haversine_distance
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+BOSTON = (42.3601, -71.0589)
+
+
+def _physicians(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        {"npi": f"{i:010d}", "lat": rng.uniform(41, 44), "lon": rng.uniform(-73, -70),
+         "taxonomyCode": "207RX0202X" if i % 3 == 0 else "207Q00000X"}
+        for i in range(n)
+    ]
+
+
+def test_nearest_and_within_match_brute_force():
+    physicians = _physicians(2000)
+    index = PhysicianIndex(capacity=16)
+    assert index.insert_many(physicians + [{"npi": "x", "lat": None, "lon": None}]) == 2000
+
+    by_distance = sorted(physicians, key=lambda p: haversine_distance(*BOSTON, p["lat"], p["lon"]))
+    assert [p["npi"] for p in index.nearest(*BOSTON, k=5)] == [p["npi"] for p in by_distance[:5]]
+
+    oncologists = [p for p in by_distance if p["taxonomyCode"] == "207RX0202X"]
+    assert [p["npi"] for p in index.nearest(*BOSTON, k=3, taxonomy_codes=["207RX0202X"])] == \
+           [p["npi"] for p in oncologists[:3]]
+
+    inside = [p["npi"] for p in by_distance if haversine_distance(*BOSTON, p["lat"], p["lon"]) <= 25]
+    assert [p["npi"] for p in index.within(*BOSTON, 25)] == inside
+    assert all(p["distance_km"] <= 25 for p in index.nearest(*BOSTON, k=50, max_km=25))
+
+
+def test_reinserting_an_npi_moves_it():
+    index = PhysicianIndex()
+    index.insert({"npi": "1", "lat": 30.27, "lon": -97.74})
+    index.insert({"npi": "1", "lat": BOSTON[0], "lon": BOSTON[1], "name": "moved"})
+
+    assert len(index) == 1
+    assert index.within(30.27, -97.74, 10) == []
+    assert index.nearest(30.27, -97.74, k=5)[0]["name"] == "moved"
+    assert index.within(*BOSTON, 1)[0]["distance_km"] == 0.0
+
+
+def test_reinserting_does_not_grow_the_index():
+    index = PhysicianIndex(capacity=4)
+    physicians = _physicians(4)
+    index.insert_many(physicians)
+    for _ in range(50):
+        for p in physicians:
+            index.insert({**p, "lat": p["lat"] + 0.01, "lon": p["lon"], "taxonomyCode": "207Q00000X"})
+
+    assert len(index) == 4 and len(index._physicians) == 4 and len(index._lats) == 4
+    assert {code: len(slots) for code, slots in index._by_code.items()} == {"207Q00000X": 4}
+    assert len(index._cells) == 4
+    assert len(index.within(42.5, -71.5, 500)) == 4
+    assert index.nearest(*BOSTON, k=5, taxonomy_codes=["207RX0202X"]) == []
+
+
+def test_full_index_evicts_the_least_recently_inserted():
+    index = PhysicianIndex(capacity=2, max_size=3)
+    physicians = _physicians(5)
+    index.insert_many(physicians[:3])
+    index.insert(physicians[0])            # refreshed, so "1" is now the oldest
+    index.insert_many(physicians[3:])
+
+    assert len(index) == 3 and len(index._lats) == 3
+    assert sorted(p["npi"] for p in index.within(42.5, -71.5, 500)) == [
+        physicians[i]["npi"] for i in (0, 3, 4)
+    ]
+    assert "0000000001" not in index and "0000000002" not in index
+
+
+def test_loads_from_the_store_with_cached_geocodes_and_zip_centroids(tmp_path, monkeypatch):
+    monkeypatch.setattr(nppes_store, "NPPES_DB_PATH", str(tmp_path / "nppes.duckdb"))
+    monkeypatch.setattr(zcta_geocoder, "ZCTA_GAZETTEER_PATH", os.path.join(FIXTURES, "zcta_sample.txt"))
+    monkeypatch.setattr(zcta_geocoder, "_index", None)
+    monkeypatch.setattr(physician_index, "_index", PhysicianIndex())
+    monkeypatch.setattr(physician_index, "_loaded", False)
+    sync_nppes(os.path.join(FIXTURES, "npidata_sample.csv"))
+
+    conn = geocode_cache.get_geocode_db()
+    geocode_cache.put_geocodes(conn, [(geocode_cache.normalize_address("1 MAIN ST, BOSTON, MA 02110"), 42.3555, -71.0565)])
+    conn.close()
+
+    # A live search result inserted first is kept over the stored row
+    physician_index.add_physicians([{"npi": "1000000006", "lat": 30.3, "lon": -97.7, "name": "live"}])
+    index = asyncio.run(get_physician_index())
+
+    assert len(index) == 4
+    nearest = index.nearest(*BOSTON, k=2)
+    assert [(p["npi"], p["geoPrecision"]) for p in nearest] == [("1000000001", "rooftop"), ("1000000002", "zip")]
+    assert index.nearest(30.3, -97.7, k=1)[0]["name"] == "live"
+
+
+def test_missing_store_leaves_an_empty_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(nppes_store, "NPPES_DB_PATH", str(tmp_path / "missing.duckdb"))
+    monkeypatch.setattr(physician_index, "_index", PhysicianIndex())
+    monkeypatch.setattr(physician_index, "_loaded", False)
+    assert len(asyncio.run(get_physician_index())) == 0
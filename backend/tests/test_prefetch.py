@@ -0,0 +1,65 @@
+"""Speculative next-page prefetch into the response cache."""
+import asyncio
+
+from app.services import clinicaltrials_api
+from app.services.clinicaltrials_api import fetch_trials_with_filters_async, prefetch_next_page
+from app.utils.prefetch import PagePrefetcher
+
+AUSTIN = {"condition": "asthma", "city": "Austin", "state": "TX"}
+
+
+def test_next_page_is_served_from_the_prefetched_cache(fake_ct, monkeypatch):
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_PREFETCH", True)
+
+    async def scenario():
+        _, total, _ = await fetch_trials_with_filters_async(AUSTIN, 10, 0)
+        assert prefetch_next_page(AUSTIN, 10, 0, total)
+        await clinicaltrials_api._prefetcher.drain()
+        calls = len(fake_ct.calls)
+        page, _, _ = await fetch_trials_with_filters_async(AUSTIN, 10, 10)
+        return page, calls
+
+    page, calls = asyncio.run(scenario())
+    assert len(fake_ct.calls) == calls
+    assert [t["nctId"] for t in page][0] == "NCT00000070"
+
+
+def test_prefetch_is_opt_in_and_skips_the_last_page(fake_ct, monkeypatch):
+    assert not prefetch_next_page(AUSTIN, 10, 0, 100)
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_PREFETCH", True)
+    assert not prefetch_next_page(AUSTIN, 10, 90, 100)
+
+
+def test_caps_drop_work_instead_of_queueing():
+    async def slow(_):
+        await asyncio.sleep(0.05)
+
+    async def scenario():
+        busy = PagePrefetcher("busy", concurrency=1, per_minute=100)
+        assert busy.schedule("a", slow, 1)
+        assert not busy.schedule("b", slow, 2)
+        broke = PagePrefetcher("budget", concurrency=10, per_minute=1)
+        assert broke.schedule("a", slow, 1)
+        assert not broke.schedule("b", slow, 2)
+        await asyncio.gather(busy.drain(), broke.drain())
+        return busy.stats, broke.stats
+
+    busy, broke = asyncio.run(scenario())
+    assert busy["skipped_busy"] == 1 and broke["skipped_budget"] == 1
+
+
+def test_unclaimed_prefetch_is_cancelled_after_its_timeout():
+    finished = []
+
+    async def slow(_):
+        await asyncio.sleep(1)
+        finished.append(1)
+
+    async def scenario():
+        prefetcher = PagePrefetcher("timeout", timeout=0.02)
+        prefetcher.schedule("a", slow, 1)
+        await prefetcher.drain()
+        return prefetcher
+
+    prefetcher = asyncio.run(scenario())
+    assert finished == [] and len(prefetcher) == 0 and prefetcher.stats["timed_out"] == 1
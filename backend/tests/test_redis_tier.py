@@ -0,0 +1,71 @@
+"""Shared Redis tier behind the in-process cache (fakeredis stands in for Redis)."""
+import asyncio
+
+import pytest
+import redis.asyncio as redis
+
+from app.db import redis_client
+from app.utils.caching import TTLCache, cache_response
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def shared_redis(monkeypatch):
+    client = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(redis_client, "_redis", client)
+    return client
+
+
+def test_payloads_round_trip_and_large_ones_are_compressed():
+    small = {"lat": 30.27, "lon": -97.74}
+    large = [{"nctId": f"NCT{i:08d}", "title": "Asthma study"} for i in range(200)]
+    assert redis_client.loads(redis_client.dumps(small)) == small
+    packed = redis_client.dumps(large)
+    assert packed[:1] == b"z" and len(packed) < len(str(large)) / 4
+    assert redis_client.loads(packed) == large
+
+
+def test_many_keys_read_and_write_in_one_round_trip(shared_redis):
+    async def scenario():
+        await redis_client.cache_set_many({"a": 1, "b": [2, 3]}, ttl=60)
+        return await redis_client.cache_get_many(["a", "b", "missing"])
+
+    assert asyncio.run(scenario()) == {"a": 1, "b": [2, 3]}
+
+
+def test_only_one_worker_fills_a_missing_key(shared_redis):
+    loads = []
+
+    async def upstream(query):
+        loads.append(query)
+        await asyncio.sleep(0.1)
+        return [query, len(loads)]
+
+    # Two workers: separate in-process caches, one Redis
+    workers = [
+        cache_response(cache=TTLCache(f"worker-{i}", ttl=60), key=lambda q: q, redis_tier=True)(upstream)
+        for i in range(2)
+    ]
+
+    async def scenario():
+        return await asyncio.gather(*(workers[i % 2]("asthma|tx") for i in range(6)))
+
+    results = asyncio.run(scenario())
+    assert loads == ["asthma|tx"]
+    assert all(r == ["asthma|tx", 1] for r in results)
+
+
+def test_unreachable_redis_degrades_to_a_plain_call(monkeypatch):
+    monkeypatch.setattr(redis_client, "_redis", redis.from_url("redis://127.0.0.1:1", socket_connect_timeout=0.2))
+
+    async def load():
+        return {"ok": True}
+
+    async def scenario():
+        try:
+            return await redis_client.fill_once("k", 60, load)
+        finally:
+            await redis_client.close_redis()
+
+    assert asyncio.run(scenario()) == {"ok": True}
@@ -0,0 +1,86 @@
+"""Coalescing identical in-flight upstream calls."""
+import asyncio
+
+import pytest
+
+from app.services.clinicaltrials_api import fetch_trials_async
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("k", upstream) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [{"ok": True}] * 5
+    assert len(calls) == 1 and flight.coalesced == 4 and len(flight) == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight("test")
+
+    async def upstream():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        leaver = asyncio.create_task(flight.do("k", upstream))
+        stayer = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaver
+        return await stayer
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_shared_call_stops_when_every_caller_leaves():
+    flight = SingleFlight("test")
+    finished = []
+
+    async def upstream():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def scenario():
+        waiters = [asyncio.create_task(flight.do("k", upstream)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for w in waiters:
+            w.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0.08)
+
+    asyncio.run(scenario())
+    assert finished == [] and len(flight) == 0
+
+
+def test_errors_reach_every_caller_and_are_not_remembered():
+    flight = SingleFlight("test")
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        return await flight.do("k", lambda: asyncio.sleep(0, result="recovered"))
+
+    assert asyncio.run(scenario()) == "recovered"
+
+
+def test_identical_trial_fetches_hit_upstream_once(fake_ct):
+    async def scenario():
+        return await asyncio.gather(*(fetch_trials_async("asthma", limit=10) for _ in range(4)))
+
+    results = asyncio.run(scenario())
+    assert len(fake_ct.calls) == 1
+    assert all(r == results[0] for r in results)
@@ -0,0 +1,40 @@
+"""Summary list results and the lazy per-trial detail endpoint."""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import clinicaltrials_api
+from app.services.clinicaltrials_api import fetch_trials_with_filters_async, summarize_trial
+
+client = TestClient(app)
+
+
+def test_search_results_are_summaries(fake_ct):
+    trials, _, _ = asyncio.run(fetch_trials_with_filters_async({"condition": "asthma"}, 3, 0))
+    assert set(trials[0]) == {*clinicaltrials_api.SUMMARY_KEYS, "locations", "locationCount"}
+    assert "BriefSummary" not in fake_ct.calls[0]["fields"]
+
+
+def test_summary_drops_foreign_sites_but_counts_them():
+    trial = {
+        "nctId": "NCT00000001", "title": "t", "description": "long text " * 500,
+        "locations": [{"city": "Boston", "country": "United States"}, {"city": "Lyon", "country": "France"}],
+    }
+    summary = summarize_trial(trial)
+    assert [loc["city"] for loc in summary["locations"]] == ["Boston"]
+    assert summary["locationCount"] == 2 and "description" not in summary
+
+
+def test_detail_endpoint_fetches_once_and_caches(fake_ct):
+    first = client.get("/api/trials/nct00000007")
+    assert first.status_code == 200
+    assert first.json()["description"] == "A study of asthma number 7."
+    assert client.get("/api/trials/NCT00000007").json() == first.json()
+    detail_calls = [c for c in fake_ct.calls if "BriefSummary" in c.get("fields", "")]
+    assert len(detail_calls) == 1
+
+
+def test_detail_endpoint_rejects_bad_ids_and_reports_missing(fake_ct):
+    assert client.get("/api/trials/12345").status_code == 400
+    assert client.get("/api/trials/NCT99999999").status_code == 404
@@ -0,0 +1,85 @@
+"""Facet counts from one pass over a condition's trials."""
+import asyncio
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import duckdb_client, trial_mirror
+from app.main import app
+from app.services import clinicaltrials_api
+from app.services.trial_facets import fetch_trial_facets
+from app.services.trial_sync import sync_mirror
+
+DUMP = os.path.join(os.path.dirname(__file__), "fixtures", "ctgov_studies.json")
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def no_saved_trials(tmp_path, monkeypatch):
+    monkeypatch.setattr(duckdb_client, "DB_PATH", str(tmp_path / "saved.duckdb"))
+    fetch_trial_facets.cache.clear()
+
+
+def _counts(result, facet):
+    return {f["value"]: f["count"] for f in result["facets"][facet]}
+
+
+def test_live_scan_counts_every_facet_in_one_page(fake_ct):
+    result = client.get("/api/trials/facets", params={"condition": "asthma"}).json()
+    assert result["source"] == "live" and result["complete"]
+    assert result["matched"] == 400
+    assert _counts(result, "state") == {"Massachusetts": 342, "Texas": 58}
+    assert _counts(result, "status") == {"RECRUITING": 400}
+    assert _counts(result, "sponsor") == {"Sponsor 0": 134, "Sponsor 1": 133, "Sponsor 2": 133}
+    assert len(fake_ct.calls) == 1
+
+    # Repeated facet requests are served from the cache
+    assert client.get("/api/trials/facets", params={"condition": " Asthma "}).json() == result
+    assert len(fake_ct.calls) == 1
+
+
+def test_mirror_counts_a_trial_once_per_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(trial_mirror, "MIRROR_DB_PATH", str(tmp_path / "mirror.duckdb"))
+    sync_mirror(dump_path=DUMP)
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_SOURCE", "mirror")
+
+    result = asyncio.run(fetch_trial_facets("asthma"))
+    assert result["source"] == "mirror"
+    assert result["matched"] == 3
+    assert _counts(result, "state") == {"Texas": 2, "Massachusetts": 2}
+    assert _counts(result, "status") == {"RECRUITING": 2, "COMPLETED": 1}
+
+
+def test_rejects_unknown_source():
+    assert client.get("/api/trials/facets", params={"source": "cache"}).status_code == 400
+
+
+def _save(trials):
+    conn = duckdb_client.get_duckdb()
+    try:
+        duckdb_client.insert_trials(conn, trials, search_condition="asthma")
+    finally:
+        duckdb_client.close_connection(conn)
+
+
+def test_a_few_saved_trials_do_not_stand_in_for_the_search(fake_ct):
+    _save([clinicaltrials_api.parse_study(s) for s in fake_ct.studies[:3]])
+
+    auto = asyncio.run(fetch_trial_facets("asthma"))
+    assert auto["source"] == "live" and auto["matched"] == 400 and auto["complete"]
+
+    saved = asyncio.run(fetch_trial_facets("asthma", source="saved"))
+    assert saved["source"] == "saved" and saved["matched"] == 3
+    assert saved["complete"] is False
+
+
+def test_saved_trials_are_used_when_they_are_the_whole_set(fake_ct):
+    del fake_ct.studies[5:]
+    _save([clinicaltrials_api.parse_study(s) for s in fake_ct.studies])
+
+    result = asyncio.run(fetch_trial_facets("asthma"))
+    assert result["source"] == "saved" and result["matched"] == 5 and result["complete"]
+    # Only the single-record total request went upstream
+    assert [c["pageSize"] for c in fake_ct.calls] == ["1"]
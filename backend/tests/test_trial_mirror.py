@@ -0,0 +1,142 @@
+"""Mirror sync from a recorded dump, and serving searches from the mirror."""
+import asyncio
+import json
+import os
+
+import duckdb
+import httpx
+import pytest
+
+from app.db import trial_mirror
+from app.services import clinicaltrials_api
+from app.services.clinicaltrials_api import fetch_trials_with_filters, fetch_trials_with_filters_async
+from app.services.trial_sync import sync_mirror
+from app.utils import http_clients
+from conftest import FakeClinicalTrials
+
+DUMP = os.path.join(os.path.dirname(__file__), "fixtures", "ctgov_studies.json")
+
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    path = str(tmp_path / "mirror.duckdb")
+    monkeypatch.setattr(trial_mirror, "MIRROR_DB_PATH", path)
+    clinicaltrials_api._trial_cache.clear()
+    return path
+
+
+def _ids(trials):
+    return [t["nctId"] for t in trials]
+
+
+def test_dump_load_uses_its_own_scope(mirror):
+    result = sync_mirror(dump_path=DUMP)
+    assert result == {"scope": "dump:ctgov_studies.json", "seen": 5, "written": 5, "watermark": "2024-05-02"}
+
+    conn = trial_mirror.get_mirror_db(read_only=True)
+    try:
+        assert trial_mirror.get_mirror_count(conn) == 5
+        assert trial_mirror.get_sync_watermark(conn, "*") is None
+        assert trial_mirror.get_mirror_trial(conn, "NCT05000001")["locations"][0]["city"] == "Austin"
+    finally:
+        conn.close()
+
+
+def test_resync_only_writes_studies_whose_date_moved(mirror, tmp_path):
+    sync_mirror(dump_path=DUMP)
+
+    # A reader holding the served file must not block the next sync
+    reader = trial_mirror.get_mirror_db(read_only=True)
+    try:
+        assert sync_mirror(dump_path=DUMP)["written"] == 0
+    finally:
+        reader.close()
+
+    with open(DUMP) as f:
+        data = json.load(f)
+    status = data["studies"][1]["protocolSection"]["statusModule"]
+    status["lastUpdatePostDateStruct"]["date"] = "2024-06-01"
+    status["overallStatus"] = "ACTIVE_NOT_RECRUITING"
+    moved = tmp_path / "ctgov_studies.json"
+    moved.write_text(json.dumps(data))
+
+    assert sync_mirror(dump_path=str(moved))["written"] == 1
+    conn = trial_mirror.get_mirror_db(read_only=True)
+    try:
+        assert trial_mirror.get_mirror_trial(conn, "NCT05000002")["status"] == "ACTIVE_NOT_RECRUITING"
+    finally:
+        conn.close()
+
+
+def test_mirror_source_filters_by_condition_and_state(mirror, monkeypatch):
+    sync_mirror(dump_path=DUMP)
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_SOURCE", "mirror")
+
+    trials, total, _ = fetch_trials_with_filters({"condition": "asthma", "state": "TX"}, limit=10)
+    assert _ids(trials) == ["NCT05000001", "NCT05000003"]
+    assert total == 2
+
+    trials, _, _ = fetch_trials_with_filters({"condition": "diabetes", "city": "Austin", "state": "TX"}, limit=10)
+    assert _ids(trials) == ["NCT05000004"]
+
+    trials, _, _ = fetch_trials_with_filters({"condition": "asthma", "state": "TX"}, limit=1, offset=1)
+    assert _ids(trials) == ["NCT05000003"]
+
+
+def test_unreadable_mirror_falls_back_to_live(mirror, fake_ct, monkeypatch):
+    sync_mirror(dump_path=DUMP)
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_SOURCE", "mirror")
+
+    writer = duckdb.connect(mirror)
+    try:
+        trials, total, _ = asyncio.run(fetch_trials_with_filters_async({"condition": "asthma"}, 5, 0))
+    finally:
+        writer.close()
+    assert total == 400 and _ids(trials)[0] == "NCT00000000"
+
+
+def test_mirror_radius_search_ranks_by_nearest_site(mirror, monkeypatch):
+    sync_mirror(dump_path=DUMP)
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_SOURCE", "mirror")
+    austin = {"lat": 30.27, "lon": -97.74}
+
+    trials, total, _ = fetch_trials_with_filters({**austin, "radius_km": 50}, limit=10)
+    assert _ids(trials) == ["NCT05000001", "NCT05000004"] and total == 2
+    assert trials[0]["distanceKm"] < 1
+
+    trials, _, _ = fetch_trials_with_filters({**austin, "radius_km": 300, "condition": "asthma"}, limit=10)
+    assert _ids(trials) == ["NCT05000001", "NCT05000003"]
+    assert 200 < trials[1]["distanceKm"] < 250
+
+
+class TermFilteringUpstream(FakeClinicalTrials):
+    """Serves the dump, keeping only studies whose text contains every query.term word."""
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        words = request.url.params.get("query.term", "").lower().split()
+        every = self.studies
+        self.studies = [s for s in every if all(w in json.dumps(s).lower() for w in words)]
+        try:
+            return super().handler(request)
+        finally:
+            self.studies = every
+
+
+@pytest.mark.parametrize("filters", [
+    {"condition": "asthma", "specialty": "pediatric"},
+    {"specialty": "insulin", "state": "TX"},
+    {"condition": "diabetes", "specialty": "exercise"},
+])
+def test_specialty_filter_matches_between_mirror_and_live(mirror, monkeypatch, filters):
+    sync_mirror(dump_path=DUMP)
+    with open(DUMP) as f:
+        studies = json.load(f)["studies"]
+    monkeypatch.setitem(http_clients._clients, "clinicaltrials",
+                        httpx.AsyncClient(transport=httpx.MockTransport(TermFilteringUpstream(studies).handler)))
+
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_SOURCE", "live")
+    live, _, _ = asyncio.run(clinicaltrials_api._run_async(clinicaltrials_api._search_plan(filters, 10, 0)))
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_SOURCE", "mirror")
+    mirrored, _, _ = clinicaltrials_api.fetch_trials_from_mirror(filters, 10, 0)
+
+    assert live and sorted(_ids(mirrored)) == sorted(_ids(live))
@@ -0,0 +1,98 @@
+"""One-call physician lookup across a trial's sites."""
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import clinicaltrials_api, trial_physicians
+from app.utils import http_clients
+from conftest import FakeClinicalTrials, make_study
+
+client = TestClient(app)
+
+SITES = [
+    {"facility": "MGH", "city": "Boston", "state": "Massachusetts", "country": "United States",
+     "geoPoint": {"lat": 42.3626, "lon": -71.0695}},
+    {"facility": "Dana-Farber", "city": "boston", "state": "Massachusetts", "country": "United States",
+     "geoPoint": {"lat": 42.3376, "lon": -71.1080}},
+    {"facility": "Dell Med", "city": "Austin", "state": "Texas", "country": "United States",
+     "geoPoint": {"lat": 30.2766, "lon": -97.7335}},
+    {"facility": "Centre Léon Bérard", "city": "Lyon", "state": "Rhône", "country": "France",
+     "geoPoint": {"lat": 45.7378, "lon": 4.8855}},
+]
+
+PHYSICIANS = {
+    "Boston": [
+        {"npi": "1", "name": "Near MGH", "lat": 42.3630, "lon": -71.0690},
+        {"npi": "2", "name": "Shared", "lat": 42.30, "lon": -71.20},
+        {"npi": "3", "name": "No coordinates", "lat": None, "lon": None},
+    ],
+    "Austin": [
+        {"npi": "2", "name": "Shared", "lat": 42.30, "lon": -71.20},
+        {"npi": "4", "name": "Near Dell", "lat": 30.2800, "lon": -97.7400},
+    ],
+}
+
+
+@pytest.fixture
+def trial(monkeypatch):
+    studies = [make_study(1, condition="Breast Cancer"), make_study(2)]
+    studies[0]["protocolSection"]["contactsLocationsModule"]["locations"] = SITES
+    studies[1]["protocolSection"]["contactsLocationsModule"]["locations"] = [SITES[3]]
+    fake = FakeClinicalTrials(studies)
+    monkeypatch.setitem(http_clients._clients, "clinicaltrials",
+                        httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)))
+    monkeypatch.setattr(clinicaltrials_api, "TRIAL_SOURCE", "live")
+    clinicaltrials_api._trial_cache.clear()
+
+    searches = []
+
+    async def physicians_near(city, state, condition, limit=10, precise=False):
+        searches.append((city, state, condition))
+        await asyncio.sleep(0)
+        if state == "broken":
+            raise RuntimeError("NPPES timed out")
+        return PHYSICIANS.get(city, [{"npi": "9", "name": "National", "lat": 40.0, "lon": -100.0}])
+
+    monkeypatch.setattr(trial_physicians, "fetch_physicians_near", physicians_near)
+    return searches
+
+
+def test_sites_are_searched_once_per_city_and_ranked_by_nearest_site(trial):
+    response = client.get("/api/trials/NCT00000001/physicians")
+    assert response.status_code == 200
+    body = response.json()
+
+    assert sorted(trial) == [("Austin", "Texas", "Breast Cancer"), ("Boston", "Massachusetts", "Breast Cancer")]
+    assert body["siteCities"] == [{"city": "Boston", "state": "Massachusetts"}, {"city": "Austin", "state": "Texas"}]
+    assert [p["npi"] for p in body["results"]] == ["1", "4", "2", "3"]
+    assert body["results"][0]["nearestSite"] == {"facility": "MGH", "city": "Boston", "state": "Massachusetts"}
+    assert body["results"][1]["nearestSite"]["facility"] == "Dell Med"
+    assert body["results"][0]["distance_km"] < 0.1
+    assert "distance_km" not in body["results"][3]
+
+
+def test_radius_and_limit(trial):
+    body = client.get("/api/trials/NCT00000001/physicians?max_km=5&limit=1").json()
+    assert [p["npi"] for p in body["results"]] == ["1"]
+    body = client.get("/api/trials/NCT00000001/physicians?max_km=5").json()
+    assert [p["npi"] for p in body["results"]] == ["1", "4"]
+
+
+def test_trial_without_us_sites_falls_back_to_a_national_search(trial):
+    body = client.get("/api/trials/NCT00000002/physicians").json()
+    assert trial == [(None, None, "Asthma")]
+    assert body["siteCities"] == [] and [p["npi"] for p in body["results"]] == ["9"]
+
+
+def test_one_failed_city_does_not_fail_the_trial(trial, monkeypatch):
+    monkeypatch.setattr(trial_physicians, "_site_cities", lambda _: [("Boston", "Massachusetts"), ("Austin", "broken")])
+    body = client.get("/api/trials/NCT00000001/physicians").json()
+    assert {p["npi"] for p in body["results"]} == {"1", "2", "3"}
+
+
+def test_bad_and_unknown_ids(trial):
+    assert client.get("/api/trials/12345/physicians").status_code == 400
+    assert client.get("/api/trials/NCT99999999/physicians").status_code == 404
@@ -0,0 +1,56 @@
+"""Full-text search over saved trials (app/db/duckdb_client.py)."""
+import pytest
+
+from app.db import duckdb_client
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(duckdb_client, "DB_PATH", str(tmp_path / "trials.duckdb"))
+    conn = duckdb_client.get_duckdb()
+    duckdb_client.insert_trials(conn, [
+        {"nctId": "NCT1", "title": "Breast cancer vaccine", "conditions": ["Breast Cancer"],
+         "description": "A study of breast cancer in women with breast tumors."},
+        {"nctId": "NCT2", "title": "Lung cancer immunotherapy", "conditions": ["Lung Cancer"],
+         "description": "Patients with a history of breast cancer are excluded."},
+        {"nctId": "NCT3", "title": "Asthma inhaler", "conditions": ["Asthma"],
+         "description": "Inhaled steroids for adults."},
+        {"nctId": "NCT4", "title": "Cancer survivorship", "conditions": ["Cancer"],
+         "description": "Follow-up care."},
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_tokenize_folds_case_plurals_and_stopwords():
+    assert duckdb_client.tokenize("The Tumors of the Breast") == ["tumor", "breast"]
+    assert duckdb_client.tokenize("of the and") == []
+
+
+def test_condition_search_ranks_best_match_first(conn):
+    rows = duckdb_client.get_trials_by_condition(conn, "breast cancer")
+    assert [r["nct_id"] for r in rows] == ["NCT1", "NCT2"]
+    assert rows[0]["score"] > rows[1]["score"]
+
+
+def test_condition_search_requires_all_terms(conn):
+    ids = {r["nct_id"] for r in duckdb_client.get_trials_by_condition(conn, "cancer")}
+    assert ids == {"NCT1", "NCT2", "NCT4"}
+    assert duckdb_client.get_trial_count(conn, "breast cancer") == 2
+    assert duckdb_client.get_trial_count(conn, "asthma cancer") == 0
+
+
+def test_stopword_only_condition_does_not_match_everything(conn):
+    assert duckdb_client.get_trials_by_condition(conn, "the") == []
+    assert duckdb_client.get_trial_count(conn, "the") == 0
+    assert duckdb_client.get_trial_count(conn, "") == 4
+
+
+def test_resaving_a_trial_reindexes_it(conn):
+    duckdb_client.insert_trials(conn, [
+        {"nctId": "NCT3", "title": "Asthma and breast cancer registry",
+         "conditions": ["Asthma"], "description": ""},
+    ])
+    ids = {r["nct_id"] for r in duckdb_client.get_trials_by_condition(conn, "breast cancer")}
+    assert ids == {"NCT1", "NCT2", "NCT3"}
@@ -0,0 +1,88 @@
+"""Offline ZIP-centroid geocoding from the Census ZCTA gazetteer."""
+import asyncio
+import io
+import os
+import zipfile
+
+import httpx
+import pytest
+
+from app.services import geocoding, nppes_api, zcta_geocoder
+from app.services.nppes_api import fetch_physicians_near
+from app.services.zcta_geocoder import ZctaIndex, download_gazetteer, zip_centroid
+
+GAZETTEER = os.path.join(os.path.dirname(__file__), "fixtures", "zcta_sample.txt")
+
+
+@pytest.fixture
+def gazetteer(monkeypatch):
+    monkeypatch.setattr(zcta_geocoder, "ZCTA_GAZETTEER_PATH", GAZETTEER)
+    monkeypatch.setattr(zcta_geocoder, "_index", None)
+
+
+def test_lookup_by_zip_and_zip4():
+    index = ZctaIndex.from_gazetteer(GAZETTEER)
+    assert len(index) == 4
+    assert index.lookup("02110") == pytest.approx((42.357814, -71.052158), abs=1e-4)
+    assert index.lookup("021101234") == index.lookup("02110-1234") == index.lookup("02110")
+    assert index.lookup("00601") == pytest.approx((18.180555, -66.749961), abs=1e-4)
+    assert index.lookup("99999") is None
+    assert index.lookup("") is None and index.lookup(None) is None
+
+
+def test_missing_gazetteer_disables_zip_lookups(monkeypatch):
+    monkeypatch.setattr(zcta_geocoder, "ZCTA_GAZETTEER_PATH", "/nonexistent/zcta.txt")
+    monkeypatch.setattr(zcta_geocoder, "_index", None)
+    assert zip_centroid("02110") is None
+
+
+def _census(txt: bytes) -> httpx.Client:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        z.writestr("2023_Gaz_zcta_national.txt", txt)
+    return httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=archive.getvalue())))
+
+
+def test_download_unpacks_and_validates_the_gazetteer(tmp_path):
+    with open(GAZETTEER, "rb") as f:
+        sample = f.read()
+    path = str(tmp_path / "data" / "zcta.txt")
+
+    assert download_gazetteer(path, client=_census(sample)) == 4
+    assert ZctaIndex.from_gazetteer(path).lookup("02110") is not None
+
+    # A broken download leaves the good file in place
+    with pytest.raises(ValueError):
+        download_gazetteer(path, client=_census(b"not a gazetteer\n"))
+    assert len(ZctaIndex.from_gazetteer(path)) == 4
+    assert os.listdir(tmp_path / "data") == ["zcta.txt"]
+
+
+def test_physicians_get_zip_coordinates_without_a_network_call(gazetteer, monkeypatch):
+    provider = {
+        "number": "1", "basic": {"first_name": "Pat", "last_name": "Doe"},
+        "taxonomies": [{"code": "207RH0003X", "primary": True}],
+        "addresses": [{"address_purpose": "LOCATION", "address_1": "1 Main St",
+                       "city": "Boston", "state": "MA", "postal_code": "021101234"}],
+    }
+    geocoded = []
+
+    async def fetch(params):
+        return [provider]
+
+    async def geocode(address):
+        geocoded.append(address)
+        return {"lat": 42.3601, "lon": -71.0589}
+
+    monkeypatch.setattr(nppes_api, "_fetch_nppes", fetch)
+    monkeypatch.setattr(geocoding, "geocode_address", geocode)
+    fetch_physicians_near.cache.clear()
+
+    approx = asyncio.run(fetch_physicians_near("Boston", "MA", "cancer"))
+    assert approx[0]["geoPrecision"] == "zip"
+    assert approx[0]["lat"] == pytest.approx(42.357814, abs=1e-4)
+    assert geocoded == []
+
+    exact = asyncio.run(fetch_physicians_near("Boston", "MA", "cancer", precise=True))
+    assert (exact[0]["lat"], exact[0]["geoPrecision"]) == (42.3601, "rooftop")
+    assert len(geocoded) == 1
@@ -1,8 +1,8 @@
 "use client";
 
-import { useState, useMemo } from "react";
+import { useState, useMemo, useEffect } from "react";
 import { Trial, Physician } from "../types";
-import { fetchPhysicians } from "../utils/api";
+import { fetchPhysicians, fetchTrialDetail, fetchTrialPhysicians } from "../utils/api";
 import PhysicianCard from "./PhysicianCard";
 import { TrialSaveButton } from "./SaveButton";   // ← NEW
 import dynamic from "next/dynamic";
@@ -19,8 +19,6 @@ type TrialCardProps = {
   onPhysiciansLoaded?: (nctId: string, physicians: Physician[]) => void;
 };
 
-const NON_US = ["Israel","Germany","India","Spain","Italy","Australia","Finland","Poland","Netherlands","Sweden","United Kingdom","Canada","France","Taiwan","South Korea","Greece"];
-
 const STATUS_CONFIG: Record<string, { bg: string; color: string; dot: string; border: string }> = {
   "RECRUITING":             { bg: "#f0fdf4", color: "#16a34a", dot: "#22c55e", border: "#bbf7d0" },
   "COMPLETED":              { bg: "#f8fafc", color: "#64748b", dot: "#94a3b8", border: "#e2e8f0" },
@@ -60,7 +58,10 @@ function PhaseBadge({ phase }: { phase: string }) {
   );
 }
 
-export default function TrialCard({ trial, searchCity, searchState, searchCondition, searchFilters, onPhysiciansLoaded }: TrialCardProps) {
+export default function TrialCard({ trial: summary, searchCity, searchState, searchCondition, searchFilters, onPhysiciansLoaded }: TrialCardProps) {
+  // List results are summaries — load the full record the first time the card opens
+  const [detail, setDetail] = useState<Trial | null>(null);
+  const trial: Trial = detail ? { ...summary, ...detail } : summary;
   const [physicians, setPhysicians] = useState<Physician[]>([]);
   const [loading, setLoading] = useState(false);
   const [fetched, setFetched] = useState(false);
@@ -73,6 +74,15 @@ export default function TrialCard({ trial, searchCity, searchState, searchCondit
   const [specialtySearch, setSpecialtySearch] = useState("");
   const [specialtyOpen, setSpecialtyOpen] = useState(false);
 
+  useEffect(() => {
+    if (!expanded || detail || summary.description !== undefined) return;
+    let cancelled = false;
+    fetchTrialDetail(summary.nctId)
+      .then(full => { if (!cancelled && full) setDetail(full); })
+      .catch(() => {});
+    return () => { cancelled = true; };
+  }, [expanded, detail, summary.nctId, summary.description]);
+
   const usLocations = (trial.locations ?? []).filter(l => l.country === "United States");
   const LOCATIONS_PREVIEW = 8;
   const visibleLocations = showAllLocations ? usLocations : usLocations.slice(0, LOCATIONS_PREVIEW);
@@ -108,30 +118,9 @@ export default function TrialCard({ trial, searchCity, searchState, searchCondit
       if (searchCity || searchState) {
         results = await fetchPhysicians(searchCity || undefined, searchState || undefined, condition);
       } else {
-        // Original behavior: query up to 3 unique US trial site locations
-        const usLocs: Array<{ city: string; state: string }> = [];
-        const seen = new Set<string>();
-        for (const loc of trial.locations ?? []) {
-          if (NON_US.some(c => (loc.country ?? "").includes(c))) continue;
-          const city = loc.city ?? ""; const state = loc.state ?? "";
-          if (!city || !state) continue;
-          const key = city.toLowerCase() + "," + state.toLowerCase();
-          if (!seen.has(key)) { seen.add(key); usLocs.push({ city, state }); }
-        }
-        const locationsToQuery = usLocs.slice(0, 3);
-        if (locationsToQuery.length > 0) {
-          const allResults = await Promise.all(
-            locationsToQuery.map(({ city, state }) => fetchPhysicians(city, state, condition))
-          );
-          const npiSeen = new Set<string>();
-          for (const batch of allResults) {
-            for (const doc of batch) {
-              if (!npiSeen.has(doc.npi)) { npiSeen.add(doc.npi); results.push(doc); }
-            }
-          }
-        } else {
-          results = await fetchPhysicians(undefined, undefined, condition);
-        }
+        // Every US trial site in one backend call: searched per city,
+        // deduped by NPI, nearest site first
+        results = await fetchTrialPhysicians(trial.nctId);
       }
 
       setPhysicians(results);
@@ -1,14 +1,18 @@
+// Search results carry the summary fields only; description, criteria and
+// contact are loaded from /api/trials/{nctId} when a card is expanded.
 export interface Trial {
   nctId: string;
   title: string;
   status: string;
-  description: string;
+  description?: string;
   conditions: string[];
   sponsor: string;
   phases: string[];
   locations: TrialLocation[];
-  inclusionCriteria: string;
-  exclusionCriteria: string;
+  locationCount?: number;
+  distanceKm?: number;
+  inclusionCriteria?: string;
+  exclusionCriteria?: string;
   pointOfContact?: {
     name: string;
     role: string;
@@ -42,6 +46,11 @@ export interface Physician {
   distance?: number;
   lat?: number;
   lon?: number;
+  // "zip": ZIP-centroid approximation, "rooftop": geocoded address
+  geoPrecision?: "zip" | "rooftop" | null;
+  // Set by /api/trials/{nctId}/physicians: distance to the trial's closest site
+  distance_km?: number;
+  nearestSite?: { facility: string | null; city: string | null; state: string | null };
 }
 
 export interface FilterState {
@@ -46,6 +46,19 @@ export async function fetchTrials(
   return { trials: data.trials ?? [], total: data.pagination?.total ?? 0 };
 }
 
+/**
+ * Fetch one trial's full record (description, criteria, contact, all sites).
+ * Search results only carry the summary fields.
+ */
+export async function fetchTrialDetail(nctId: string) {
+  const res = await fetch(`${baseUrl}/api/trials/${encodeURIComponent(nctId)}`);
+  if (!res.ok) {
+    console.error(`Trial detail API error: ${res.status}`);
+    return null;
+  }
+  return res.json();
+}
+
 /**
  * Fetch physicians near a city/state for a given condition.
  * Omit city + state to get national results.
@@ -68,4 +81,18 @@ export async function fetchPhysicians(
   }
   const data = await res.json();
   return data.results ?? [];
-}
\ No newline at end of file
+}
+/**
+ * Fetch physicians near every US site of a trial in one call. The backend
+ * searches each site city, dedupes by NPI and ranks by distance to the
+ * nearest site (falling back to a national search when no site is usable).
+ */
+export async function fetchTrialPhysicians(nctId: string) {
+  const res = await fetch(`${baseUrl}/api/trials/${encodeURIComponent(nctId)}/physicians`);
+  if (!res.ok) {
+    console.error(`Trial physicians API error: ${res.status}`);
+    return [];
+  }
+  const data = await res.json();
+  return data.results ?? [];
+}